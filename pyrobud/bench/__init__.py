@@ -0,0 +1,36 @@
+import argparse
+import logging
+import sys
+from typing import Optional, Sequence
+
+from .. import logs
+from . import evaluate, firehose, normalize, upload
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Main entry point for the offline benchmark command."""
+
+    parser = argparse.ArgumentParser(
+        description="Offline performance benchmarks for Pyrobud."
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="show the bot's own logs"
+    )
+    subparsers = parser.add_subparsers(dest="benchmark", metavar="BENCHMARK")
+    subparsers.required = True
+    evaluate.add_parser(subparsers)
+    firehose.add_parser(subparsers)
+    normalize.add_parser(subparsers)
+    upload.add_parser(subparsers)
+
+    args = parser.parse_args(argv)
+
+    logs.setup_logging()
+    if not args.verbose:
+        logging.root.setLevel(logging.WARNING)
+
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
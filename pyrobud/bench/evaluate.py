@@ -0,0 +1,375 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Mapping, MutableMapping, Optional, Sequence, Tuple, cast
+
+import telethon as tg
+
+from .. import launch, util
+from ..core import Bot
+from ..modules import antibot
+from ..util.fake_tg import FAKE_DC_ID, FakeTelegramClient
+from . import stats
+from .firehose import load_config
+
+DEFAULT_CORPUS = os.path.join(
+    os.path.dirname(__file__), "corpus", "antibot_labeled.jsonl"
+)
+# Senders joined this many seconds before their message, unless specified
+DEFAULT_JOIN_AGE = 24 * 60 * 60
+
+ENTITY_TYPES = {
+    "url": tg.types.MessageEntityUrl,
+    "email": tg.types.MessageEntityEmail,
+    "phone": tg.types.MessageEntityPhone,
+    "cashtag": tg.types.MessageEntityCashtag,
+    "mention": tg.types.MessageEntityMention,
+    "bold": tg.types.MessageEntityBold,
+}
+
+Entry = Mapping[str, Any]
+
+
+def load_corpus(path: str) -> List[Entry]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def make_media(kind: Optional[str], media_id: int) -> Any:
+    if kind is None:
+        return None
+    elif kind == "photo":
+        photo = tg.types.Photo(media_id, media_id, b"", None, [], 1)
+        return tg.types.MessageMediaPhoto(photo=photo)
+    elif kind == "contact":
+        return tg.types.MessageMediaContact("+15550100", "Support", "", "", 0)
+    elif kind == "geo":
+        return tg.types.MessageMediaGeo(tg.types.GeoPoint(0, 0, 0))
+
+    raise ValueError(f"Unknown media type '{kind}'")
+
+
+def describe_profile(profile: Mapping[str, Any]) -> str:
+    traits = [profile.get("name", "")]
+    if profile.get("bio"):
+        traits.append(f"bio: {profile['bio']}")
+    if not profile.get("photo"):
+        traits.append("no photo")
+
+    return ", ".join(traits)
+
+
+class Evaluation:
+    """Antibot's checks run on a labeled corpus, with a bot on a fake client."""
+
+    bot: Bot
+    client: FakeTelegramClient
+    module: antibot.AntibotModule
+    chat: tg.types.Channel
+    source: tg.types.Channel
+    messages: List[Tuple[Entry, tg.custom.Message]]
+    joins: List[Tuple[Entry, tg.types.User]]
+
+    async def setup(self, config: util.config.Config) -> None:
+        self.client = FakeTelegramClient(history_limit=None)
+        self.bot = Bot(config, client_factory=lambda: self.client)
+
+        # Skip the first start greeting
+        await self.bot.get_db("core").put("first_start", False)
+        await self.bot.start()
+
+        self.chat = self.client.add_channel(title="Evaluation group")
+        self.source = self.client.add_channel(title="Forward source", admin=False)
+        await self.client.receive(
+            self.chat, self.client.me, self.bot.prefix + "antibot on", out=True
+        )
+        await self.client.wait_idle()
+
+        self.module = cast(antibot.AntibotModule, self.bot.modules["Antibot"])
+        # Pretend antibot was enabled before any of the senders joined, so that
+        # every entry is eligible for first message checks
+        self.module.enabled_groups[tg.utils.get_peer_id(self.chat)] = 0
+
+    def add_joining_user(self, idx: int, profile: Mapping[str, Any]) -> tg.types.User:
+        photo = (
+            tg.types.UserProfilePhoto(idx + 1, FAKE_DC_ID)
+            if profile.get("photo")
+            else None
+        )
+        return self.client.add_user(
+            first_name=profile.get("name", f"Joiner {idx}"),
+            about=profile.get("bio"),
+            photo=photo,
+            scam=profile.get("scam", False),
+            fake=profile.get("fake", False),
+        )
+
+    async def prepare(self, corpus: Sequence[Entry]) -> None:
+        """Creates a message from a new sender or a joining user for each entry."""
+
+        chat_id = tg.utils.get_peer_id(self.chat)
+        now = datetime.now(timezone.utc)
+        self.messages = []
+        self.joins = []
+
+        for idx, entry in enumerate(corpus):
+            profile = entry.get("join")
+            if profile is not None:
+                self.joins.append((entry, self.add_joining_user(idx, profile)))
+                continue
+
+            user = self.client.add_user(first_name=f"Sender {idx}")
+            join_age = timedelta(seconds=entry.get("joined", DEFAULT_JOIN_AGE))
+            self.client.add_participant(self.chat, user, date=now - join_age)
+            if entry.get("spoken"):
+                await self.module.mark_spoken(chat_id, user.id)
+
+            text = entry["text"]
+            entities = [
+                ENTITY_TYPES[name](0, len(text)) for name in entry.get("entities", ())
+            ]
+            msg = self.client.add_message(
+                self.chat,
+                user,
+                text,
+                entities=entities or None,
+                media=make_media(entry.get("media"), idx + 1),
+                forward_from=self.source if entry.get("forward") else None,
+                date=now,
+            )
+            self.messages.append((entry, msg))
+
+    async def classify(self) -> stats.Results:
+        """Checks every message and joining user, and compares verdicts to labels."""
+
+        confusion = {"tp": 0, "fp": 0, "fn": 0, "tn": 0}
+        contributions: MutableMapping[str, MutableMapping[str, int]] = {
+            rule.name: {"spam": 0, "ham": 0} for rule in self.module.rules.rules
+        }
+        categories: MutableMapping[str, MutableMapping[str, int]] = {}
+        misclassified = []
+
+        def record(
+            entry: Entry,
+            text: str,
+            triggered: bool,
+            score: float,
+            hits: Sequence[str] = (),
+            vetoes: Sequence[str] = (),
+        ) -> None:
+            spam = entry["spam"]
+            label = "spam" if spam else "ham"
+            correct = triggered == spam
+            outcome = ("t" if correct else "f") + ("p" if triggered else "n")
+            confusion[outcome] += 1
+
+            category = categories.setdefault(
+                entry.get("category", label), {"correct": 0, "total": 0}
+            )
+            category["total"] += 1
+            if correct:
+                category["correct"] += 1
+            else:
+                misclassified.append(
+                    {
+                        "text": text,
+                        "category": entry.get("category"),
+                        "spam": spam,
+                        "score": score,
+                        "hits": list(hits),
+                        "vetoes": list(vetoes),
+                    }
+                )
+
+        for entry, msg in self.messages:
+            # Run every rule to see what each one contributes; the verdict is the
+            # same as with early exits
+            verdict = await self.module.check_msg(msg, exhaustive=True)
+            label = "spam" if entry["spam"] else "ham"
+            for name in (*verdict.hits, *verdict.vetoes):
+                contributions[name][label] += 1
+
+            record(
+                entry,
+                entry["text"],
+                verdict.triggered,
+                verdict.score,
+                verdict.hits,
+                verdict.vetoes,
+            )
+
+        # Joining users are screened in one batch, like a wave of joins
+        if self.joins:
+            scores = await self.module.screen_profiles(
+                tg.utils.get_peer_id(self.chat), [user for _, user in self.joins]
+            )
+            for (entry, _), score in zip(self.joins, scores):
+                record(
+                    entry,
+                    describe_profile(entry["join"]),
+                    score >= antibot.PROFILE_SCORE_THRESHOLD,
+                    score,
+                    ["profile"] if score else [],
+                )
+
+        tp, fp, fn = confusion["tp"], confusion["fp"], confusion["fn"]
+        precision = tp / (tp + fp) if tp + fp else 0
+        recall = tp / (tp + fn) if tp + fn else 0
+        total = len(self.messages) + len(self.joins)
+        return {
+            "messages": len(self.messages),
+            "joins": len(self.joins),
+            "confusion": confusion,
+            "precision": precision,
+            "recall": recall,
+            "f1": (
+                2 * precision * recall / (precision + recall)
+                if precision + recall
+                else 0
+            ),
+            "accuracy": (tp + confusion["tn"]) / total,
+            "categories": categories,
+            "contributions": contributions,
+            "misclassified": misclassified,
+        }
+
+    async def measure(self, rounds: int) -> stats.Results:
+        """Times the regular, early-exiting checks over the corpus."""
+
+        # Start with fresh rule metrics
+        mod = self.module
+        mod.rules = util.rules.RuleEngine.from_object(mod, mod.rules.threshold)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for _, msg in self.messages:
+                await mod.check_msg(msg)
+
+        elapsed = time.perf_counter() - start
+        count = rounds * len(self.messages)
+        return {
+            "throughput": count / elapsed,
+            "rules": {
+                rule.name: {
+                    "run_share": rule.runs / count,
+                    "hit_rate": rule.hit_rate,
+                    "avg_time_us": rule.avg_time * 1e6,
+                    "time_share": time_share,
+                }
+                for rule, time_share in mod.rules.stats()
+            },
+        }
+
+
+async def _run(args: argparse.Namespace, config: util.config.Config) -> stats.Results:
+    evaluation = Evaluation()
+    await evaluation.setup(config)
+
+    try:
+        await evaluation.prepare(load_corpus(args.corpus))
+        results = await evaluation.classify()
+        results.update(await evaluation.measure(args.rounds))
+        return results
+    finally:
+        await evaluation.bot.stop()
+
+
+def _print_results(results: stats.Results, show: int) -> None:
+    c = results["confusion"]
+    print(
+        f"""Evaluated {results['messages']} messages and {results['joins']} joining users
+
+                 flagged   allowed
+  actual spam    {c['tp']:>7}   {c['fn']:>7}
+  actual ham     {c['fp']:>7}   {c['tn']:>7}
+
+Precision {results['precision']:.1%}, recall {results['recall']:.1%}, F1 {results['f1']:.3f}, accuracy {results['accuracy']:.1%}
+Throughput: {results['throughput']:.0f} msg/s"""
+    )
+
+    print("\nBy category:")
+    for name, category in sorted(results["categories"].items()):
+        print(f"  {name:<32} {category['correct']:>4}/{category['total']} correct")
+
+    print("\nRules (matches in spam/ham with all rules run, per-message cost):")
+    width = max(len(name) for name in results["rules"])
+    for name, rule in results["rules"].items():
+        contrib = results["contributions"][name]
+        print(
+            f"  {name:<{width}}  spam {contrib['spam']:>4}  ham {contrib['ham']:>4}  run for {rule['run_share']:6.1%}  {rule['avg_time_us']:7.1f} µs avg  {rule['time_share']:6.1%} of time"
+        )
+
+    misclassified = results["misclassified"]
+    if misclassified and show:
+        print(f"\nMisclassified ({len(misclassified)}):")
+        for entry in misclassified[:show]:
+            kind = "missed spam" if entry["spam"] else "false positive"
+            rules = ", ".join(entry["hits"] + [f"veto {v}" for v in entry["vetoes"]])
+            text = entry["text"][:60] or "<no text>"
+            print(
+                f"  {kind} [{entry['category']}] {text!r}: score {entry['score']:g} ({rules or 'no rules'})"
+            )
+
+
+def run(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory(prefix="pyrobud-bench-") as tmp_dir:
+        config = load_config(args.config_path, f"{tmp_dir}/bench.db")
+        loop = launch.setup_asyncio(config)
+        try:
+            results = loop.run_until_complete(_run(args, config))
+        finally:
+            loop.close()
+
+    _print_results(results, args.show)
+    if args.output:
+        stats.save(results, args.output)
+
+    if args.baseline:
+        regressions = stats.compare(results, stats.load(args.baseline), args.tolerance)
+        if regressions:
+            print("\nRegressions compared to baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+
+            return 1
+
+    return 0
+
+
+def add_parser(subparsers: Any) -> None:
+    parser = subparsers.add_parser(
+        "evaluate",
+        help="measure antibot's accuracy on a labeled corpus",
+        description="Run antibot's message rules on a labeled corpus of messages and report the confusion matrix, each rule's contributions, and throughput.",
+    )
+    parser.add_argument(
+        "--corpus",
+        metavar="PATH",
+        default=DEFAULT_CORPUS,
+        help="JSONL corpus of messages, each labeled as spam or not",
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=20, help="passes over the corpus to time"
+    )
+    parser.add_argument(
+        "--show", type=int, default=10, help="misclassified messages to show"
+    )
+    parser.add_argument("-c", "--config-path", metavar="PATH", help="bot config to use")
+    parser.add_argument("-o", "--output", metavar="PATH", help="save results as JSON")
+    parser.add_argument(
+        "-b",
+        "--baseline",
+        metavar="PATH",
+        help="fail if results regressed from the given saved results",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=stats.DEFAULT_TOLERANCE,
+        metavar="FRAC",
+        help="relative regression tolerated when comparing to a baseline",
+    )
+    parser.set_defaults(func=run)
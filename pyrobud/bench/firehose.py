@@ -0,0 +1,466 @@
+import argparse
+import asyncio
+import gc
+import itertools
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, MutableMapping, Optional
+
+import telethon as tg
+import tomlkit
+
+from .. import launch, util
+from ..core import Bot
+from ..modules import antibot
+from ..util.fake_tg import FakeTelegramClient
+from . import stats
+
+# Fraction of messages of each kind that isn't plain group chatter
+DEFAULT_COMMAND_SHARE = 0.02
+DEFAULT_SPAM_SHARE = 0.005
+DEFAULT_MEDIA_SHARE = 0.05
+DEFAULT_EDIT_SHARE = 0.05
+# Edits target one of this many recent messages
+EDITABLE_MESSAGES = 256
+# Messages kept by the fake client, bounding its own memory usage
+FAKE_HISTORY_LIMIT = 1000
+# Spam sent to each group per raid window, kept below antibot's raid threshold
+# so the benchmark measures regular screening rather than raid handling
+SPAM_PER_CHAT = antibot.RAID_SPAM_THRESHOLD - 1
+# Large enough to never throttle requests to the fake client
+UNLIMITED_RATE = 1e9
+
+MESSAGE_KINDS = ["command", "spam", "media", "edit", "text"]
+
+CHATTER = [
+    "hey, has anyone tried the new release yet?",
+    "lol same",
+    "I think the docs cover that, check the FAQ",
+    "thanks, that fixed it!",
+    "can someone review my PR when they have time?",
+    "good morning everyone",
+    "what's the recommended way to run this on a Raspberry Pi?",
+    "it crashes on startup for me, here's the traceback",
+    "👍",
+    "does this work on Windows?",
+]
+SPAM = [
+    "Great profit with binance, invest now and withdraw daily",
+    "I made $5000 trading bitcoin this week, no scam! Talk with you in private",
+    "Join our testnet and cash out your free mytoken airdrop",
+]
+COMMANDS = ["ping", "id", "uptime", "echo benchmark"]
+MEDIA_PAYLOAD = bytes(range(256)) * 16
+
+# Default config, mirroring config.example.toml
+BENCH_CONFIG = """
+version = 14
+
+[telegram]
+api_id = 123456
+api_hash = "0123456789abcdef0123456789abcdef"
+session_name = "bench"
+
+[bot]
+default_prefix = "."
+db_path = "bench.db"
+report_errors = false
+report_username = false
+sentry_dsn = ""
+response_mode = "edit"
+overflow_mode = "truncate"
+overflow_page_limit = 4
+overflow_file = false
+redact_responses = true
+redact_patterns = []
+catch_up_max_age = 21600
+catch_up_concurrency = 8
+
+[asyncio]
+disable_uvloop = false
+debug = false
+"""
+
+
+class Firehose:
+    """Synthetic group traffic driven through a bot running on a fake client."""
+
+    args: argparse.Namespace
+    rng: random.Random
+    bot: Bot
+    client: FakeTelegramClient
+    chats: List[tg.types.Channel]
+    users: List[tg.types.User]
+    spammers: "itertools.cycle[tg.types.User]"
+    spam_chats: "itertools.cycle[int]"
+    spam_rates: List[util.rate.EventRate]
+    recent: List[tg.custom.Message]
+    latencies: MutableMapping[str, List[float]]
+    listener_latencies: MutableMapping[str, List[float]]
+    recording: bool
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.recent = []
+        self.latencies = {kind: [] for kind in MESSAGE_KINDS}
+        self.listener_latencies = {}
+        self.recording = False
+
+    async def setup(self, config: util.config.Config) -> None:
+        self.client = FakeTelegramClient(history_limit=FAKE_HISTORY_LIMIT)
+        self.bot = Bot(config, client_factory=lambda: self.client)
+
+        # Telegram's rate limits don't apply to the fake client
+        self.bot.outbound = util.flood.OutboundScheduler(
+            rate=UNLIMITED_RATE,
+            burst=UNLIMITED_RATE,
+            chat_rate=UNLIMITED_RATE,
+            chat_burst=UNLIMITED_RATE,
+            on_flood=self.bot.on_flood_wait,
+        )
+
+        # Skip the first start greeting
+        await self.bot.get_db("core").put("first_start", False)
+        await self.bot.start()
+        self.instrument_listeners()
+
+        # Regular members joined long ago and aren't screened by antibot
+        join_date = datetime.now(timezone.utc) - timedelta(days=30)
+        self.chats = [
+            self.client.add_channel(title=f"Benchmark group {i}")
+            for i in range(self.args.chats)
+        ]
+        self.users = [
+            self.client.add_user(first_name=f"Member {i}")
+            for i in range(self.args.users)
+        ]
+        for chat in self.chats:
+            for user in self.users:
+                self.client.add_participant(chat, user, date=join_date)
+
+        self.spammers = itertools.cycle(
+            [self.client.add_user(first_name=f"Spammer {i}") for i in range(64)]
+        )
+        self.spam_chats = itertools.cycle(range(len(self.chats)))
+        self.spam_rates = [util.rate.EventRate(antibot.RAID_WINDOW) for _ in self.chats]
+
+        for chat in self.chats:
+            await self.command(chat, "antibot on")
+        await self.client.wait_idle()
+
+        # Antibot only screens users who joined after it was enabled, with
+        # one-second resolution
+        await asyncio.sleep(1)
+
+    def instrument_listeners(self) -> None:
+        for event, listeners in self.bot.listeners.items():
+            for lst in listeners:
+                samples = self.listener_latencies.setdefault(
+                    f"{lst.module.name}.on_{event}", []
+                )
+                lst.func = stats.timed(lst.func, samples)
+
+    async def command(self, chat: tg.types.Channel, cmd: str) -> None:
+        await self.client.receive(chat, self.client.me, self.bot.prefix + cmd, out=True)
+
+    def pick_kind(self) -> str:
+        args = self.args
+        shares = [
+            args.command_share,
+            args.spam_share,
+            args.media_share,
+            args.edit_share,
+        ]
+
+        roll = self.rng.random()
+        for kind, share in zip(MESSAGE_KINDS, shares):
+            if roll < share:
+                return kind
+
+            roll -= share
+
+        return "text"
+
+    def pick_spam_chat(self) -> Optional[tg.types.Channel]:
+        """Returns the next group that can take more spam without being raided."""
+
+        for _ in self.chats:
+            idx = next(self.spam_chats)
+            if self.spam_rates[idx].count() < SPAM_PER_CHAT:
+                self.spam_rates[idx].hit()
+                return self.chats[idx]
+
+        return None
+
+    async def send(self, kind: str) -> str:
+        """Sends a message of the given kind and returns the kind actually sent."""
+
+        chat = self.rng.choice(self.chats)
+        user = self.rng.choice(self.users)
+
+        if kind == "spam":
+            spam_chat = self.pick_spam_chat()
+            if spam_chat is None:
+                # Every group has had as much spam as it can take for now
+                kind = "text"
+            else:
+                chat = spam_chat
+
+        if kind == "command":
+            await self.command(chat, self.rng.choice(COMMANDS))
+        elif kind == "spam":
+            spammer = next(self.spammers)
+            await self.client.join_chat(chat, spammer)
+            await self.client.receive(chat, spammer, self.rng.choice(SPAM))
+        elif kind == "edit" and self.recent:
+            msg = self.rng.choice(self.recent)
+            await self.client.receive_edit(msg, msg.raw_text + " (edited)")
+        else:
+            file = MEDIA_PAYLOAD if kind == "media" else None
+            msg = await self.client.receive(
+                chat, user, self.rng.choice(CHATTER), file=file
+            )
+
+            if len(self.recent) < EDITABLE_MESSAGES:
+                self.recent.append(msg)
+            else:
+                self.recent[self.rng.randrange(EDITABLE_MESSAGES)] = msg
+
+        return kind
+
+    async def _send_timed(self, kind: str, arrival: float) -> None:
+        kind = await self.send(kind)
+
+        if self.recording:
+            latency = time.perf_counter() - arrival
+            self.latencies[kind].append(latency)
+
+    async def drive(self, count: int) -> float:
+        """Sends the given number of messages and returns the time taken."""
+
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.args.concurrency)
+        tasks = set()
+
+        start = time.perf_counter()
+        for i in range(count):
+            if self.args.rate:
+                # Measure latency from the scheduled arrival time, so time spent
+                # waiting for a slot while overloaded is counted as well
+                arrival = start + i / self.args.rate
+                delay = arrival - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                await slots.acquire()
+            else:
+                await slots.acquire()
+                arrival = time.perf_counter()
+
+            task = loop.create_task(self._send_timed(self.pick_kind(), arrival))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+        while tasks:
+            await asyncio.gather(*tasks)
+        await self.client.wait_idle()
+
+        return time.perf_counter() - start
+
+    def reset(self) -> None:
+        for samples in itertools.chain(
+            self.latencies.values(), self.listener_latencies.values()
+        ):
+            samples.clear()
+
+    def results(self, elapsed: float) -> stats.Results:
+        count = self.args.messages
+        all_latencies = list(itertools.chain.from_iterable(self.latencies.values()))
+
+        return {
+            "messages": count,
+            "elapsed": elapsed,
+            "throughput": count / elapsed,
+            "latency": {
+                "all": stats.summarize(all_latencies),
+                **{
+                    kind: stats.summarize(samples)
+                    for kind, samples in self.latencies.items()
+                    if samples
+                },
+            },
+            "listeners": {
+                name: stats.summarize(samples)
+                for name, samples in sorted(self.listener_latencies.items())
+                if samples
+            },
+        }
+
+
+def load_config(path: Optional[str], db_path: str) -> util.config.Config:
+    if path is None:
+        config: util.config.Config = tomlkit.loads(BENCH_CONFIG)
+    else:
+        with open(path, "r") as f:
+            config = tomlkit.loads(f.read())
+
+    # Never touch a real database
+    config["bot"]["db_path"] = db_path
+    config["bot"]["report_errors"] = False
+    util.config.validate(config)
+    return config
+
+
+async def _run(args: argparse.Namespace, config: util.config.Config) -> stats.Results:
+    memory = stats.MemoryTracker(enabled=args.tracemalloc)
+    memory.start()
+
+    firehose = Firehose(args)
+    await firehose.setup(config)
+
+    try:
+        # Let caches and lazily initialized state settle before measuring
+        await firehose.drive(args.warmup)
+        firehose.reset()
+        gc.collect()
+        memory.mark()
+
+        lag = stats.LoopLagMonitor()
+        lag.start()
+        firehose.recording = True
+        try:
+            elapsed = await firehose.drive(args.messages)
+        finally:
+            lag.stop()
+
+        gc.collect()
+        results = firehose.results(elapsed)
+        results["loop_lag"] = stats.summarize(lag.samples)
+
+        memory_results = memory.finish()
+        if memory_results is not None:
+            results["memory"] = memory_results
+
+        return results
+    finally:
+        await firehose.bot.stop()
+
+
+def _print_latencies(title: str, latencies: stats.Results) -> None:
+    print(f"\n{title}:")
+    width = max(len(name) for name in latencies)
+    for name, lat in latencies.items():
+        print(
+            f"  {name:<{width}}  n={lat['count']:<7} p50={lat['p50']:8.2f} ms  p99={lat['p99']:8.2f} ms  max={lat['max']:8.2f} ms"
+        )
+
+
+def _print_results(results: stats.Results) -> None:
+    print(
+        f"Processed {results['messages']} messages in {results['elapsed']:.2f} s: {results['throughput']:.1f} msg/s"
+    )
+
+    lag = results["loop_lag"]
+    print(f"Event loop lag: p99 {lag['p99']:.2f} ms, max {lag['max']:.2f} ms")
+
+    memory = results.get("memory")
+    if memory is not None:
+        print(
+            f"Memory growth: {stats.format_size(memory['growth'])}, peak {stats.format_size(memory['peak'])}"
+        )
+        for site in memory["top"]:
+            print(f"  {stats.format_size(site['size']):>10}  {site['site']}")
+
+    _print_latencies("Latency by message kind", results["latency"])
+    _print_latencies("Latency by listener", results["listeners"])
+
+
+def run(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory(prefix="pyrobud-bench-") as tmp_dir:
+        config = load_config(args.config_path, f"{tmp_dir}/bench.db")
+        loop = launch.setup_asyncio(config)
+        try:
+            results = loop.run_until_complete(_run(args, config))
+        finally:
+            loop.close()
+
+    _print_results(results)
+    if args.output:
+        stats.save(results, args.output)
+
+    if args.baseline:
+        regressions = stats.compare(results, stats.load(args.baseline), args.tolerance)
+        if regressions:
+            print("\nRegressions compared to baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+
+            return 1
+
+    return 0
+
+
+def add_parser(subparsers: Any) -> None:
+    parser = subparsers.add_parser(
+        "firehose",
+        help="drive synthetic group traffic through the bot",
+        description="Drive a stream of synthetic group messages through the bot on an offline fake client and report throughput, latency and memory growth.",
+    )
+    parser.add_argument(
+        "-n", "--messages", type=int, default=20000, help="messages to measure"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=1000, help="unmeasured messages sent first"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="target arrival rate in msg/s (default: as fast as possible)",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=64, help="maximum messages in flight"
+    )
+    parser.add_argument("--chats", type=int, default=20, help="number of groups")
+    parser.add_argument(
+        "--users", type=int, default=200, help="regular members per group"
+    )
+    parser.add_argument(
+        "--command-share", type=float, default=DEFAULT_COMMAND_SHARE, metavar="FRAC"
+    )
+    parser.add_argument(
+        "--spam-share", type=float, default=DEFAULT_SPAM_SHARE, metavar="FRAC"
+    )
+    parser.add_argument(
+        "--media-share", type=float, default=DEFAULT_MEDIA_SHARE, metavar="FRAC"
+    )
+    parser.add_argument(
+        "--edit-share", type=float, default=DEFAULT_EDIT_SHARE, metavar="FRAC"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument(
+        "--no-tracemalloc",
+        dest="tracemalloc",
+        action="store_false",
+        help="skip memory tracking, which slows everything down",
+    )
+    parser.add_argument("-c", "--config-path", metavar="PATH", help="bot config to use")
+    parser.add_argument("-o", "--output", metavar="PATH", help="save results as JSON")
+    parser.add_argument(
+        "-b",
+        "--baseline",
+        metavar="PATH",
+        help="fail if results regressed from the given saved results",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=stats.DEFAULT_TOLERANCE,
+        metavar="FRAC",
+        help="relative regression tolerated when comparing to a baseline",
+    )
+    parser.set_defaults(func=run)
@@ -0,0 +1,199 @@
+import asyncio
+import functools
+import json
+import math
+import os
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, List, Mapping, MutableMapping, Optional
+
+Results = MutableMapping[str, Any]
+
+# Relative change in a metric tolerated before it's reported as a regression
+DEFAULT_TOLERANCE = 0.15
+# Memory growth below this many bytes is considered noise
+MEMORY_NOISE_FLOOR = 1024 * 1024
+
+# (path in results, whether higher values are better)
+TRACKED_METRICS = [
+    (("throughput",), True),
+    (("latency", "all", "p99"), False),
+    (("loop_lag", "p99"), False),
+    (("memory", "growth"), False),
+    (("precision",), True),
+    (("recall",), True),
+]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Returns the given nearest-rank percentile of the given samples."""
+
+    if not samples:
+        return 0
+
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def format_size(size: float) -> str:
+    """Formats the given number of bytes in binary units."""
+
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+
+        size /= 1024
+
+    return f"{size:.1f} GiB"
+
+
+def summarize(samples: List[float]) -> MutableMapping[str, float]:
+    """Summarizes the given latency samples, in milliseconds."""
+
+    return {
+        "count": len(samples),
+        "p50": percentile(samples, 50) * 1000,
+        "p99": percentile(samples, 99) * 1000,
+        "max": max(samples, default=0) * 1000,
+    }
+
+
+def timed(
+    func: Callable[..., Awaitable[Any]], samples: List[float]
+) -> Callable[..., Awaitable[Any]]:
+    """Wraps the given coroutine function to record how long each call takes."""
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+
+    return wrapper
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from short sleeps."""
+
+    interval: float
+    samples: List[float]
+    _task: Optional["asyncio.Task[None]"]
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+            self.samples.append(max(0, lag))
+
+    def start(self) -> None:
+        self.samples.clear()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+class MemoryTracker:
+    """Tracks memory growth between two points using tracemalloc."""
+
+    enabled: bool
+    _baseline: Optional[tracemalloc.Snapshot]
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._baseline = None
+
+    def start(self) -> None:
+        if self.enabled:
+            tracemalloc.start()
+
+    def mark(self) -> None:
+        """Sets the current usage as the baseline for growth measurements."""
+
+        if self.enabled:
+            tracemalloc.reset_peak()
+            self._baseline = tracemalloc.take_snapshot()
+
+    def finish(self, top: int = 5) -> Optional[Results]:
+        if not self.enabled or self._baseline is None:
+            return None
+
+        # Don't count the benchmark's own bookkeeping
+        own_files = tracemalloc.Filter(
+            False, os.path.join(os.path.dirname(__file__), "*")
+        )
+        snapshot = tracemalloc.take_snapshot().filter_traces([own_files])
+        baseline = self._baseline.filter_traces([own_files])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        diff = snapshot.compare_to(baseline, "lineno")
+        growth = sum(stat.size_diff for stat in diff)
+        sites = [
+            {"site": str(stat.traceback), "size": stat.size_diff}
+            for stat in diff[:top]
+            if stat.size_diff > 0
+        ]
+        return {"growth": growth, "peak": peak, "top": sites}
+
+
+def _lookup(results: Mapping[str, Any], path: Any) -> Optional[float]:
+    value: Any = results
+    for key in path:
+        if not isinstance(value, Mapping) or key not in value:
+            return None
+
+        value = value[key]
+
+    return value
+
+
+def compare(
+    results: Mapping[str, Any],
+    baseline: Mapping[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[str]:
+    """Returns descriptions of tracked metrics that regressed from the baseline."""
+
+    regressions = []
+    for path, higher_is_better in TRACKED_METRICS:
+        new = _lookup(results, path)
+        old = _lookup(baseline, path)
+        if new is None or old is None:
+            continue
+
+        name = ".".join(path)
+        if higher_is_better:
+            if new < old * (1 - tolerance):
+                regressions.append(f"{name}: {new:.2f} < {old:.2f}")
+        else:
+            limit = old * (1 + tolerance)
+            if path[0] == "memory":
+                limit = max(limit, old + MEMORY_NOISE_FLOOR)
+
+            if new > limit:
+                regressions.append(f"{name}: {new:.2f} > {old:.2f}")
+
+    return regressions
+
+
+def load(path: str) -> Results:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save(results: Mapping[str, Any], path: str) -> None:
+    with open(path, "w+") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
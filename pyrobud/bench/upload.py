@@ -0,0 +1,158 @@
+import argparse
+import asyncio
+import hashlib
+import os
+import time
+from typing import Any, AsyncIterator, MutableMapping, Optional
+
+import aiohttp
+from aiohttp import web
+
+from ..util import fake_tg, tg, upload
+from . import stats
+
+MiB = 1024 * 1024
+
+
+class FileIOServer:
+    """Local stand-in for file.io that accepts uploads at a limited rate."""
+
+    rate: float
+    host: str
+    received: MutableMapping[str, str]
+    runner: Optional[web.AppRunner]
+    url: str
+
+    def __init__(self, rate: float, host: str = "127.0.0.1") -> None:
+        self.rate = rate
+        self.host = host
+        self.received = {}
+        self.runner = None
+        self.url = ""
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post("/", self.handle_upload)
+
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, 0)
+        await site.start()
+
+        port = self.runner.addresses[0][1]
+        self.url = f"http://{self.host}:{port}/"
+
+    async def stop(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def handle_upload(self, request: web.Request) -> web.Response:
+        reader = await request.multipart()
+        field = await reader.next()
+        if not isinstance(field, aiohttp.BodyPartReader) or field.name != "file":
+            return web.json_response({"success": False}, status=400)
+
+        digest = hashlib.sha256()
+        while True:
+            chunk = await field.read_chunk()
+            if not chunk:
+                break
+
+            digest.update(chunk)
+            # Simulate the time taken to send each chunk to the real service
+            await asyncio.sleep(len(chunk) / self.rate)
+
+        key = str(len(self.received))
+        self.received[key] = digest.hexdigest()
+        return web.json_response({"success": True, "link": f"{self.url}{key}"})
+
+
+async def _buffered_stream(msg: Any) -> AsyncIterator[bytes]:
+    # The previous implementation, which downloaded the whole file before uploading
+    yield await tg.download_file(None, msg)
+
+
+async def _transfer(
+    http: aiohttp.ClientSession,
+    target: upload.UploadTarget,
+    stream: AsyncIterator[bytes],
+) -> float:
+    start = time.perf_counter()
+    await target.upload(http, stream, "bench.bin")
+    return time.perf_counter() - start
+
+
+async def _run(args: argparse.Namespace) -> MutableMapping[str, Any]:
+    client = fake_tg.FakeTelegramClient(download_rate=args.download_rate * MiB)
+    server = FileIOServer(args.upload_rate * MiB)
+    await server.start()
+
+    data = os.urandom(int(args.size * MiB))
+    expected = hashlib.sha256(data).hexdigest()
+    chat = client.add_channel(title="Uploads", megagroup=True)
+    msg = client.add_message(chat, client.me, file=data)
+    target = upload.FileIOTarget(server.url)
+
+    results: MutableMapping[str, Any] = {"size": len(data)}
+    try:
+        async with aiohttp.ClientSession() as http:
+            results["buffered"] = await _transfer(http, target, _buffered_stream(msg))
+            results["pipelined"] = await _transfer(
+                http, target, tg.stream_download(None, msg)
+            )
+    finally:
+        await server.stop()
+
+    results["verified"] = all(h == expected for h in server.received.values())
+    return results
+
+
+def run(args: argparse.Namespace) -> int:
+    results = asyncio.run(_run(args))
+
+    size = stats.format_size(results["size"])
+    print(
+        f"Transferred {size} at {args.download_rate} MiB/s per download request and {args.upload_rate} MiB/s up"
+    )
+    for name in ("buffered", "pipelined"):
+        print(f"  {name}: {results[name]:.2f} s")
+
+    speedup = results["buffered"] / results["pipelined"]
+    print(f"Pipelined speedup: {speedup:.1f}x")
+
+    if args.output:
+        stats.save(results, args.output)
+
+    if not results["verified"]:
+        print("Uploaded data doesn't match the original file")
+        return 1
+
+    return 0
+
+
+def add_parser(subparsers: Any) -> None:
+    parser = subparsers.add_parser(
+        "upload",
+        help="measure download-to-upload streaming",
+        description="Transfer a file from the offline fake client to a local stand-in for file.io, with and without pipelining the download and upload.",
+    )
+    parser.add_argument(
+        "--size", type=float, default=32, help="file size in MiB (default: 32)"
+    )
+    parser.add_argument(
+        "--download-rate",
+        type=float,
+        default=2,
+        metavar="MIB_S",
+        help="simulated Telegram download speed per request; large files are fetched with several requests in flight",
+    )
+    parser.add_argument(
+        "--upload-rate",
+        type=float,
+        default=8,
+        metavar="MIB_S",
+        help="simulated upload speed of the stand-in server",
+    )
+    parser.add_argument("-o", "--output", metavar="PATH", help="save results as JSON")
+    parser.set_defaults(func=run)
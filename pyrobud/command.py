@@ -1,4 +1,17 @@
-from typing import TYPE_CHECKING, Any, Callable, Coroutine, Optional, Sequence, Union
+import asyncio
+import io
+import time
+from types import TracebackType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Coroutine,
+    Optional,
+    Sequence,
+    Type,
+    Union,
+)
 
 import telethon as tg
 
@@ -13,6 +26,9 @@ CommandFunc = Union[
 ]
 Decorator = Callable[[CommandFunc], CommandFunc]
 
+# Minimum number of seconds between progress edits
+PROGRESS_INTERVAL = 5
+
 
 def desc(_desc: str) -> Decorator:
     """Sets description on a command function."""
@@ -119,6 +135,13 @@ class Context:
         self.args = self.segments[1:]
         return self.args
 
+    def progress(
+        self, interval: float = PROGRESS_INTERVAL, **kwargs: Any
+    ) -> "ProgressChannel":
+        """Returns a channel for rate-limited progress updates in the response."""
+
+        return ProgressChannel(self, interval, **kwargs)
+
     # Wrapper for Bot.respond()
     async def respond(
         self,
@@ -127,6 +150,7 @@ class Context:
         mode: Optional[str] = None,
         overflow: Optional[str] = None,
         max_pages: Optional[int] = None,
+        overflow_file: Optional[bool] = None,
         redact: Optional[bool] = None,
         msg: Optional[tg.custom.Message] = None,
         reuse_response: bool = False,
@@ -141,6 +165,7 @@ class Context:
                 text,
                 mode=mode,
                 max_pages=max_pages,
+                overflow_file=overflow_file,
                 redact=redact,
                 msg=msg,
                 reuse_response=reuse_response,
@@ -166,6 +191,7 @@ class Context:
         *,
         max_pages: Optional[int] = None,
         redact: Optional[bool] = None,
+        overflow_file: Optional[bool] = None,
         **kwargs: Any,
     ) -> tg.custom.Message:
         if redact is None:
@@ -174,44 +200,37 @@ class Context:
         if max_pages is None:
             max_pages = self.bot.config["bot"]["overflow_page_limit"]
 
+        if overflow_file is None:
+            overflow_file = self.bot.config["bot"]["overflow_file"]
+
         if redact:
             # Redact before splitting in case the sensitive content is on a message boundary
             text = self.bot.redact_message(text)
 
-        pages_sent = 0
-        last_msg = None
-        while text and pages_sent < max_pages:
-            # Make sure that there's an ellipsis placed at both the beginning and end,
-            # depending on whether there's more content to be shown
-            # The conditions are a bit complex, so just use a primitive LUT for now
-            if len(text) <= 4096:
-                # Low remaining content might require no ellipses
-                if pages_sent == 0:
-                    page = text[: util.tg.MESSAGE_CHAR_LIMIT]
-                    ellipsis_chars = 0
-                else:
-                    page = "..." + text[: util.tg.MESSAGE_CHAR_LIMIT - 3]
-                    ellipsis_chars = 3
-            elif pages_sent == max_pages - 1:
-                # Last page should use the standard truncation path if it's too large
-                if pages_sent == 0:
-                    page = text
-                    ellipsis_chars = 0
-                else:
-                    page = "..." + text
-                    ellipsis_chars = 3
-            else:
-                # Remaining content in other pages might need two ellipses
-                if pages_sent == 0:
-                    page = text[: util.tg.MESSAGE_CHAR_LIMIT - 3] + "..."
-                    ellipsis_chars = 3
-                else:
-                    page = "..." + text[: util.tg.MESSAGE_CHAR_LIMIT - 6] + "..."
-                    ellipsis_chars = 6
+        # Pages are already redacted and sized, so send them as-is
+        kwargs["overflow"] = "truncate"
+        kwargs["redact"] = False
 
+        last_msg = None
+        end = 0
+        # The rest is attached when overflowing to a file, so it isn't truncated
+        suffix = util.tg.CONTINUATION if overflow_file else util.tg.TRUNCATION_SUFFIX
+        for page, end in util.tg.paginate(text, max_pages, truncation_suffix=suffix):
             last_msg = await self.respond_multi(page, **kwargs)
-            text = text[util.tg.MESSAGE_CHAR_LIMIT - ellipsis_chars :]
-            pages_sent += 1
+
+        # Send the content that didn't fit in the allowed pages as a file
+        if overflow_file and end < len(text):
+            overflow = text[end:]
+            # Reopen the code block that the last page closed
+            if text.count(util.tg.CODE_FENCE, 0, end) % 2 == 1:
+                overflow = util.tg.CODE_FENCE + "\n" + overflow
+
+            overflow_buf = io.BytesIO(overflow.encode("utf-8"))
+            overflow_buf.name = "overflow.txt"
+
+            last_msg = await self.respond_multi(
+                "__Remaining output attached as a file.__", file=overflow_buf, **kwargs
+            )
 
         return last_msg
 
@@ -238,3 +257,98 @@ class Context:
         return await self.respond(
             *args, mode=mode, msg=msg, reuse_response=reuse_response, **kwargs
         )
+
+
+# Coalescing progress reporter for long-running commands
+class ProgressChannel:
+    ctx: Context
+    interval: float
+    respond_kwargs: Any
+
+    _pending: Optional[str]
+    _last_text: Optional[str]
+    _last_time: Optional[float]
+    _sending: bool
+    _closed: bool
+    _task: Optional["asyncio.Task[None]"]
+
+    def __init__(self, ctx: Context, interval: float, **kwargs: Any) -> None:
+        self.ctx = ctx
+        self.interval = interval
+        self.respond_kwargs = kwargs
+
+        self._pending = None
+        self._last_text = None
+        self._last_time = None
+        self._sending = False
+        self._closed = False
+        self._task = None
+
+    def update(self, text: str) -> None:
+        """Queues the given text, replacing any queued text that hasn't been sent."""
+
+        if self._closed:
+            return
+
+        # Only the latest text matters, so older unsent updates are simply dropped
+        self._pending = text
+        if self._task is None or self._task.done():
+            self._task = self.ctx.bot.loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._pending is not None:
+            # Wait out the remainder of the interval since the last edit
+            if self._last_time is not None:
+                delay = self._last_time + self.interval - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            text = self._pending
+            self._pending = None
+            if text is None or text == self._last_text:
+                continue
+
+            self._last_time = time.monotonic()
+            self._last_text = text
+            self._sending = True
+            try:
+                await self.ctx.respond(text, **self.respond_kwargs)
+            except Exception as e:
+                # Progress is best-effort, so don't let it break the command
+                self.ctx.bot.log.warning("Error sending progress update", exc_info=e)
+            finally:
+                self._sending = False
+
+    async def close(self, *, flush: bool = False) -> None:
+        """Stops accepting updates and waits for any in-flight edit to finish."""
+
+        self._closed = True
+        pending = self._pending
+        self._pending = None
+
+        task = self._task
+        if task is not None and not task.done():
+            if self._sending:
+                # The loop exits after the current edit because nothing is pending
+                await task
+            else:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+        if flush and pending is not None and pending != self._last_text:
+            self._last_text = pending
+            await self.ctx.respond(pending, **self.respond_kwargs)
+
+    async def __aenter__(self) -> "ProgressChannel":
+        return self
+
+    async def __aexit__(
+        self,
+        typ: Optional[Type[BaseException]],
+        value: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.close()
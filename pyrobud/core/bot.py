@@ -1,21 +1,28 @@
 import asyncio
 import logging
-from typing import Optional
+from typing import Any, Callable, Optional
 
 import aiohttp
 
 import telethon as tg
 
+from ..util.async_helpers import shutdown_process_pool
 from ..util.config import Config
 from .command_dispatcher import CommandDispatcher
 from .database_provider import DatabaseProvider
+from .entity_cache import EntityCache
 from .event_dispatcher import EventDispatcher
 from .module_extender import ModuleExtender
 from .telegram_bot import TelegramBot
 
 
 class Bot(
-    TelegramBot, ModuleExtender, CommandDispatcher, DatabaseProvider, EventDispatcher
+    TelegramBot,
+    EntityCache,
+    ModuleExtender,
+    CommandDispatcher,
+    DatabaseProvider,
+    EventDispatcher,
 ):
     # Initialized during instantiation
     config: Config
@@ -24,9 +31,13 @@ class Bot(
     client: tg.TelegramClient
     loop: asyncio.AbstractEventLoop
     stopping: bool
+    client_factory: Optional[Callable[[], Any]]
 
-    def __init__(self, config: Config):
+    def __init__(
+        self, config: Config, *, client_factory: Optional[Callable[[], Any]] = None
+    ):
         self.config = config
+        self.client_factory = client_factory
         self.log = logging.getLogger("bot")
         # Python 3.14+: get the running loop (set by create_and_run)
         try:
@@ -66,6 +77,7 @@ class Bot(
         self.log.info("Stopping")
         if self.loaded:
             await self.dispatch_event("stop")
+        shutdown_process_pool()
         await self.http.close()
         await self._db.close()
 
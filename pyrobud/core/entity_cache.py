@@ -0,0 +1,128 @@
+from typing import TYPE_CHECKING, Any, Mapping, Optional, Union
+
+import telethon as tg
+
+from .. import util
+from .bot_mixin_base import MixinBase
+
+if TYPE_CHECKING:
+    from .bot import Bot
+
+Entity = Union[tg.types.User, tg.types.Chat, tg.types.Channel]
+
+ENTITY_CACHE_SIZE = 4096
+# Entities are refreshed from update payloads, so this only bounds staleness
+ENTITY_CACHE_TTL = 30 * 60
+
+# Raw updates that change user entities
+USER_CHANGE_UPDATES = (tg.types.UpdateUserName, tg.types.UpdateUser)
+
+
+class EntityCache(MixinBase):
+    # Initialized during instantiation
+    entity_cache: util.cache.TTLCache[Any, Entity]
+    _last_entity_map: Optional[Mapping[int, Entity]]
+
+    def __init__(self: "Bot", **kwargs: Any) -> None:
+        self.entity_cache = util.cache.TTLCache(ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL)
+        self._last_entity_map = None
+
+        # Propagate initialization to other mixins
+        super().__init__(**kwargs)
+
+    def cache_entity(self: "Bot", entity: Optional[Entity]) -> None:
+        # Minimal entities are missing information such as usernames
+        if entity is None or getattr(entity, "min", False):
+            return
+
+        self.entity_cache.put(tg.utils.get_peer_id(entity), entity)
+        username = getattr(entity, "username", None)
+        if username:
+            self.entity_cache.put(username.lower(), entity)
+
+    def invalidate_entity(self: "Bot", peer_id: int) -> None:
+        entity = self.entity_cache.get(peer_id)
+        self.entity_cache.pop(peer_id)
+
+        # Drop the username key as well, since it points to the same stale entity
+        username = getattr(entity, "username", None)
+        if username:
+            self.entity_cache.pop(username.lower())
+
+    async def on_raw_update(self: "Bot", update: tg.types.TypeUpdate) -> None:
+        # Updates carry the entities they reference, and all updates in a batch
+        # share the same map, so only process each map once
+        entities: Optional[Mapping[int, Entity]] = getattr(update, "_entities", None)
+        if entities and entities is not self._last_entity_map:
+            self._last_entity_map = entities
+            for entity in entities.values():
+                self.cache_entity(entity)
+
+        if isinstance(update, USER_CHANGE_UPDATES):
+            self.invalidate_entity(update.user_id)
+
+    async def on_entity_chat_action(
+        self: "Bot", event: tg.events.ChatAction.Event
+    ) -> None:
+        # Title and photo changes modify the chat entity itself
+        if event.new_title or event.new_photo:
+            self.invalidate_entity(event.chat_id)
+
+        # Membership changes can affect the user's relationship with the chat
+        if event.user_id is not None:
+            self.invalidate_entity(event.user_id)
+
+    async def get_entity(self: "Bot", ref: tg.hints.EntityLike) -> Entity:
+        """Resolves the given entity ID or username, using the cache if possible."""
+
+        key = ref.lower().lstrip("@") if isinstance(ref, str) else ref
+        if isinstance(key, (int, str)):
+            entity = self.entity_cache.get(key)
+            # Usernames only resolve to entities that are still cached by ID, in
+            # case the ID key was evicted or invalidated on its own
+            if isinstance(key, str) and entity is not None:
+                if self.entity_cache.get(tg.utils.get_peer_id(entity)) is not entity:
+                    entity = None
+
+            if entity is not None:
+                return entity
+
+        entity = await self.client.get_entity(ref)
+        self.cache_entity(entity)
+        return entity
+
+    async def get_chat(self: "Bot", obj: tg.custom.chatgetter.ChatGetter) -> Entity:
+        """Returns the chat of the given message or event, using the cache if possible."""
+
+        chat = obj.chat
+        if chat is not None and not getattr(chat, "min", False):
+            return chat
+
+        chat = self.entity_cache.get(obj.chat_id)
+        if chat is not None:
+            return chat
+
+        chat = await obj.get_chat()
+        self.cache_entity(chat)
+        return chat
+
+    async def get_sender(
+        self: "Bot", obj: tg.custom.sendergetter.SenderGetter
+    ) -> Optional[Entity]:
+        """Returns the sender of the given message or event, using the cache if possible."""
+
+        sender = obj.sender
+        if sender is not None and not getattr(sender, "min", False):
+            return sender
+
+        # Messages forwarded from linked channels have no sender
+        if obj.sender_id is None:
+            return None
+
+        sender = self.entity_cache.get(obj.sender_id)
+        if sender is not None:
+            return sender
+
+        sender = await obj.get_sender()
+        self.cache_entity(sender)
+        return sender
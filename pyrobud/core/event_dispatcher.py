@@ -1,6 +1,6 @@
 import asyncio
 import bisect
-from typing import TYPE_CHECKING, Any, MutableMapping, MutableSequence
+from typing import TYPE_CHECKING, Any, MutableMapping, MutableSequence, Optional
 
 from .. import module, util
 from ..listener import Listener, ListenerFunc
@@ -27,8 +27,9 @@ class EventDispatcher(MixinBase):
         event: str,
         func: ListenerFunc,
         priority: int = 100,
+        max_age: Optional[float] = None,
     ) -> None:
-        listener = Listener(event, func, mod, priority)
+        listener = Listener(event, func, mod, priority, max_age)
 
         if event in self.listeners:
             bisect.insort(self.listeners[event], listener)
@@ -50,7 +51,11 @@ class EventDispatcher(MixinBase):
             done = True
             try:
                 self.register_listener(
-                    mod, event, func, priority=getattr(func, "_listener_priority", 100)
+                    mod,
+                    event,
+                    func,
+                    priority=getattr(func, "_listener_priority", 100),
+                    max_age=getattr(func, "_listener_max_age", None),
                 )
                 done = True
             finally:
@@ -71,7 +76,12 @@ class EventDispatcher(MixinBase):
             self.unregister_listener(listener)
 
     async def dispatch_event(
-        self: "Bot", event: str, *args: Any, wait: bool = True, **kwargs: Any
+        self: "Bot",
+        event: str,
+        *args: Any,
+        wait: bool = True,
+        age: Optional[float] = None,
+        **kwargs: Any,
     ) -> None:
         tasks = set()
 
@@ -84,11 +94,15 @@ class EventDispatcher(MixinBase):
             return
 
         for lst in listeners:
+            # Skip listeners that opted out of events this old
+            if age is not None and lst.max_age is not None and age > lst.max_age:
+                continue
+
             task = self.loop.create_task(lst.func(*args, **kwargs))
             tasks.add(task)
 
         self.log.debug("Dispatching event '%s' with data %s", event, args)
-        if wait:
+        if wait and tasks:
             await asyncio.wait(tasks)
 
     async def log_stat(self: "Bot", stat: str) -> None:
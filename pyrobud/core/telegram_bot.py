@@ -1,3 +1,7 @@
+import asyncio
+import functools
+from collections import OrderedDict
+from datetime import datetime, timezone
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -7,7 +11,6 @@ from typing import (
     MutableMapping,
     Optional,
     Tuple,
-    Type,
     Union,
 )
 
@@ -23,6 +26,36 @@ if TYPE_CHECKING:
 TelegramConfig = Mapping[str, Union[int, str]]
 EventType: Any = tg.events.common.EventBuilder
 TgEventHandler = Callable[[EventType], Coroutine[Any, Any, None]]
+MessageKey = Tuple[int, int]
+
+# Number of response messages to remember the last sent content of
+MAX_TRACKED_RESPONSES = 1000
+# Events older than this many seconds are considered backlogged, e.g. from
+# catching up after downtime or a reconnect
+BACKLOG_THRESHOLD = 60
+# Number of backlogged events to process between progress logs
+CATCH_UP_LOG_INTERVAL = 500
+
+
+def _event_date(event: Any) -> Optional[datetime]:
+    msg = getattr(event, "message", None)
+    if isinstance(msg, tg.custom.Message):
+        return msg.edit_date or msg.date
+
+    action_msg = getattr(event, "action_message", None)
+    if action_msg is not None:
+        return action_msg.date
+
+    # Raw updates such as UpdateChannelParticipant
+    date = getattr(event, "date", None)
+    return date if isinstance(date, datetime) else None
+
+
+def _response_fingerprint(text: Optional[str], kwargs: Mapping[str, Any]) -> int:
+    # Includes formatting options and media; objects without a stable repr (such
+    # as file buffers) never compare equal, so they are always sent
+    options = tuple(sorted((key, repr(value)) for key, value in kwargs.items()))
+    return hash((text, options))
 
 
 class TelegramBot(MixinBase):
@@ -30,6 +63,12 @@ class TelegramBot(MixinBase):
     tg_config: TelegramConfig
     _mevent_handlers: MutableMapping[str, Tuple[TgEventHandler, EventType]]
     loaded: bool
+    outbound: util.flood.OutboundScheduler
+    redactor: util.redact.Redactor
+    _response_fingerprints: "OrderedDict[MessageKey, int]"
+    _catch_up_sem: asyncio.Semaphore
+    catch_up_events: int
+    catch_up_skipped: int
 
     # Initialized during startup
     client: tg.TelegramClient
@@ -42,11 +81,24 @@ class TelegramBot(MixinBase):
         self.tg_config = self.config["telegram"]
         self._mevent_handlers = {}
         self.loaded = False
+        self.outbound = util.flood.OutboundScheduler(on_flood=self.on_flood_wait)
+        self.compile_redactor()
+        self._response_fingerprints = OrderedDict()
+        self._catch_up_sem = asyncio.Semaphore(
+            self.config["bot"]["catch_up_concurrency"]
+        )
+        self.catch_up_events = 0
+        self.catch_up_skipped = 0
 
         # Propagate initialization to other mixins
         super().__init__(**kwargs)
 
     async def init_client(self: "Bot") -> None:
+        # Use the injected client if provided, e.g. a fake one for offline testing
+        if self.client_factory is not None:
+            self.client = self.client_factory()
+            return
+
         # Get Telegram parameters from config and check types
         session_name = self.tg_config["session_name"]
         if not isinstance(session_name, str):
@@ -84,6 +136,17 @@ class TelegramBot(MixinBase):
             tg.events.NewMessage(outgoing=True, func=self.command_predicate),
         )
 
+        # Keep the redactor up to date when our phone number changes
+        self.client.add_event_handler(
+            self.on_user_phone, tg.events.Raw(types=tg.types.UpdateUserPhone)
+        )
+
+        # Keep the shared entity cache fresh from update payloads
+        self.client.add_event_handler(self.on_raw_update, tg.events.Raw())
+        self.client.add_event_handler(
+            self.on_entity_chat_action, tg.events.ChatAction()
+        )
+
         # Load modules
         self.load_all_modules()
         await self.dispatch_event("load")
@@ -105,6 +168,7 @@ class TelegramBot(MixinBase):
         self.user = user
         # noinspection PyTypeChecker
         self.uid = user.id
+        self.compile_redactor()
 
         # Set Sentry username if enabled
         if self.config["bot"]["report_username"]:
@@ -141,14 +205,14 @@ class TelegramBot(MixinBase):
             await self.stop()
 
     def update_module_event(
-        self: "Bot", name: str, event_type: Type[EventType]
+        self: "Bot", name: str, event_type: Callable[[], EventType]
     ) -> None:
         if name in self.listeners:
             # Add if there ARE listeners and it's NOT already registered
             if name not in self._mevent_handlers:
 
                 async def event_handler(event: EventType) -> None:
-                    await self.dispatch_event(name, event)
+                    await self.dispatch_tg_event(name, event)
 
                 handler_info = (event_handler, event_type())
                 self.client.add_event_handler(*handler_info)
@@ -165,24 +229,92 @@ class TelegramBot(MixinBase):
         self.update_module_event("message_read", tg.events.MessageRead)
         self.update_module_event("chat_action", tg.events.ChatAction)
         self.update_module_event("user_update", tg.events.UserUpdate)
+        self.update_module_event(
+            "channel_participant",
+            functools.partial(tg.events.Raw, types=tg.types.UpdateChannelParticipant),
+        )
+
+    async def dispatch_tg_event(self: "Bot", name: str, event: EventType) -> None:
+        date = _event_date(event)
+        if date is None:
+            await self.dispatch_event(name, event)
+            return
+
+        age = (datetime.now(timezone.utc) - date).total_seconds()
+        if age <= BACKLOG_THRESHOLD:
+            await self.dispatch_event(name, event, age=age)
+            return
+
+        # Drop backlogged events that are too old to be worth processing
+        if age > self.config["bot"]["catch_up_max_age"]:
+            self.catch_up_skipped += 1
+        else:
+            # Replay the rest with bounded concurrency to avoid load spikes
+            async with self._catch_up_sem:
+                await self.dispatch_event(name, event, age=age)
+
+            self.catch_up_events += 1
+
+        total = self.catch_up_events + self.catch_up_skipped
+        if total % CATCH_UP_LOG_INTERVAL == 0:
+            self.log.info(
+                f"Caught up on {self.catch_up_events} backlogged events, skipped {self.catch_up_skipped} stale events"
+            )
 
     @property
     def events_activated(self: "Bot") -> int:
         return len(self._mevent_handlers)
 
+    async def on_flood_wait(self: "Bot", chat_id: Any, seconds: int) -> None:
+        self.log.warning(f"Hit flood wait of {seconds} seconds in chat {chat_id}")
+        await self.log_stat("flood_waits")
+
+    def compile_redactor(self: "Bot") -> None:
+        """Recompiles the response redactor from the current config and user."""
+
+        secrets = [str(self.tg_config["api_id"]), str(self.tg_config["api_hash"])]
+        # The user isn't known until we've connected to Telegram
+        user: Optional[tg.types.User] = getattr(self, "user", None)
+        if user is not None and user.phone is not None:
+            secrets.append(user.phone)
+
+        patterns = self.config["bot"]["redact_patterns"]
+        self.redactor = util.redact.Redactor(secrets, patterns)
+
+    async def on_user_phone(self: "Bot", update: tg.types.UpdateUserPhone) -> None:
+        if update.user_id == self.uid:
+            self.user.phone = update.phone
+            self.compile_redactor()
+
     def redact_message(self, text: str) -> str:
-        tg_config: Mapping[str, str] = self.config["telegram"]
-        api_id = str(tg_config["api_id"])
-        api_hash = tg_config["api_hash"]
+        return self.redactor.redact(text)
+
+    def _track_response(
+        self: "Bot", msg: tg.custom.Message, fingerprint: int
+    ) -> tg.custom.Message:
+        key = (msg.chat_id, msg.id)
+        self._response_fingerprints[key] = fingerprint
+        self._response_fingerprints.move_to_end(key)
 
-        if api_id in text:
-            text = text.replace(api_id, "[REDACTED]")
-        if api_hash in text:
-            text = text.replace(api_hash, "[REDACTED]")
-        if self.user.phone is not None and self.user.phone in text:
-            text = text.replace(self.user.phone, "[REDACTED]")
+        if len(self._response_fingerprints) > MAX_TRACKED_RESPONSES:
+            self._response_fingerprints.popitem(last=False)
 
-        return text
+        return msg
+
+    async def _edit_response(
+        self: "Bot",
+        msg: tg.custom.Message,
+        text: Optional[str],
+        fingerprint: int,
+        **kwargs: Any,
+    ) -> tg.custom.Message:
+        # Skip the round-trip if the message already shows the same content
+        if self._response_fingerprints.get((msg.chat_id, msg.id)) == fingerprint:
+            await self.log_stat("edits_suppressed")
+            return msg
+
+        new_msg = await self.outbound.submit(msg.chat_id, msg.edit, text=text, **kwargs)
+        return self._track_response(new_msg, fingerprint)
 
     # Flexible response function with filtering, truncation, redaction, etc.
     async def respond(
@@ -201,9 +333,10 @@ class TelegramBot(MixinBase):
 
         # Filter text
         if text is not None:
-            # Redact sensitive information if enabled and known
+            # Redact sensitive information if enabled and known, stopping early
+            # once there's enough text to fill the message
             if redact:
-                text = self.redact_message(text)
+                text = self.redactor.redact_head(text, util.tg.MESSAGE_CHAR_LIMIT)
 
             # Truncate messages longer than Telegram's 4096-character length limit
             text = util.tg.truncate(text)
@@ -216,25 +349,33 @@ class TelegramBot(MixinBase):
         if mode is None:
             mode = self.config["bot"]["response_mode"]
 
+        # Queue outgoing requests per chat to avoid flood limits
+        submit = self.outbound.submit
+        chat_id = msg.chat_id
+        fingerprint = _response_fingerprint(text, kwargs)
+
         if mode == "edit":
-            return await msg.edit(text=text, **kwargs)
+            return await self._edit_response(msg, text, fingerprint, **kwargs)
 
         if mode == "reply":
             if response is not None:
                 # Already replied, so just edit the existing reply to reduce spam
-                return await response.edit(text=text, **kwargs)
+                return await self._edit_response(response, text, fingerprint, **kwargs)
 
             # Reply since we haven't done so yet
-            return await msg.reply(text, **kwargs)
+            response = await submit(chat_id, msg.reply, text, **kwargs)
+            return self._track_response(response, fingerprint)
 
         if mode == "repost":
             if response is not None:
                 # Already reposted, so just edit the existing reply to reduce spam
-                return await response.edit(text=text, **kwargs)
+                return await self._edit_response(response, text, fingerprint, **kwargs)
 
             # Repost since we haven't done so yet
-            response = await msg.respond(text, reply_to=msg.reply_to_msg_id, **kwargs)
+            response = await submit(
+                chat_id, msg.respond, text, reply_to=msg.reply_to_msg_id, **kwargs
+            )
             await msg.delete()
-            return response
+            return self._track_response(response, fingerprint)
 
         raise ValueError(f"Unknown response mode '{mode}'")
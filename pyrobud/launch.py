@@ -89,6 +89,7 @@ def main(*, config_path: str = DEFAULT_CONFIG_PATH) -> None:
     asyncio.set_event_loop(loop)
     aiorun.run(_upgrade(config, config_path), stop_on_unhandled_errors=True, loop=loop)
     loop.close()
+    util.config.validate(config)
 
     loop = setup_asyncio(config)
 
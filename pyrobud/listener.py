@@ -1,4 +1,4 @@
-from typing import Any, Callable
+from typing import Any, Callable, Optional
 
 ListenerFunc = Any
 Decorator = Callable[[ListenerFunc], ListenerFunc]
@@ -14,17 +14,36 @@ def priority(_prio: int) -> Decorator:
     return prio_decorator
 
 
+def max_age(seconds: float) -> Decorator:
+    """Skips events older than the given number of seconds, such as backlogged ones."""
+
+    def age_decorator(func: ListenerFunc) -> ListenerFunc:
+        setattr(func, "_listener_max_age", seconds)
+        return func
+
+    return age_decorator
+
+
 class Listener:
     event: str
     func: ListenerFunc
     module: Any
     priority: int
-
-    def __init__(self, event: str, func: ListenerFunc, mod: Any, prio: int) -> None:
+    max_age: Optional[float]
+
+    def __init__(
+        self,
+        event: str,
+        func: ListenerFunc,
+        mod: Any,
+        prio: int,
+        max_age: Optional[float] = None,
+    ) -> None:
         self.event = event
         self.func = func
         self.module = mod
         self.priority = prio
+        self.max_age = max_age
 
     def __lt__(self, other: "Listener") -> bool:
         return self.priority < other.priority
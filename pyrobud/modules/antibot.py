@@ -1,13 +1,75 @@
 import asyncio
+import functools
+import time
 from datetime import timedelta, timezone
-from typing import ClassVar, Union
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    ClassVar,
+    Coroutine,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeAlias,
+    TypeVar,
+    Union,
+)
 
 import regex
 import telethon as tg
 
-from .. import command, module, util
+from .. import command, listener, module, util
 
 MessageEvent = Union[tg.events.NewMessage.Event, tg.events.ChatAction.Event]
+Participant: TypeAlias = tg.types.TypeChannelParticipant
+ParticipantKey = Tuple[int, int]
+Result = TypeVar("Result")
+
+_NOT_LOADED = object()
+
+# Join dates and admin status rarely change, and changes are tracked from updates
+PARTICIPANT_CACHE_SIZE = 8192
+PARTICIPANT_CACHE_TTL = 6 * 60 * 60
+# Admin lists are loaded in full, so they're refreshed separately
+ADMIN_LIST_TTL = 60 * 60
+# Don't act on backlogged messages; the spam has likely been handled already
+MAX_MESSAGE_AGE = 10 * 60
+# Recently confirmed speakers, which skip the database entirely
+SPOKEN_CACHE_SIZE = 16384
+SPOKEN_CACHE_TTL = 6 * 60 * 60
+# Seconds after joining during which less suspicious messages are acted on
+DEFAULT_THRESHOLD_TIME = 30
+# Total weight of matched keywords at which a message is considered suspicious
+KEYWORD_SCORE_THRESHOLD = 1
+DEFAULT_KEYWORD_WEIGHT = 1
+# Scores of suspicious message traits, and the total at which a message is spam
+SCORE_HIGH = 10
+SCORE_LOW = 5
+SPAM_SCORE_THRESHOLD = 10
+# Relative costs of message rules by what they need: message attributes, text
+# processing, cached entities, database reads, API requests, and image decoding
+COST_ATTR = 0
+COST_TEXT = 1
+COST_CACHE = 5
+COST_DB = 10
+COST_API = 50
+COST_IMAGE = 100
+# Joins or flagged spammers per window at which a group is considered to be raided
+RAID_WINDOW = 60
+RAID_JOIN_THRESHOLD = 20
+RAID_SPAM_THRESHOLD = 5
+# Seconds without new spammers after which a raid is considered over
+RAID_COOLDOWN = 5 * 60
+# Concurrent removals during a raid, which share the bot's global rate limit
+RAID_WORKERS = 4
+# Spam messages are deleted in batches of up to this size (Telegram's limit)
+RAID_DELETE_BATCH = 100
+RAID_FLUSH_INTERVAL = 2
 
 SUSPICIOUS_KEYWORDS = [
     "invest",
@@ -29,6 +91,9 @@ SUSPICIOUS_KEYWORDS = [
     "cash out",
     "withdraw",
 ]
+DEFAULT_KEYWORD_MATCHER = util.keywords.KeywordMatcher(
+    {kw: DEFAULT_KEYWORD_WEIGHT for kw in SUSPICIOUS_KEYWORDS}
+)
 
 SUSPICIOUS_ENTITIES = [
     tg.tl.types.MessageEntityUrl,
@@ -59,18 +124,108 @@ OBFUSCATED_CHARSETS = [
     "🅰🅱🅲🅳🅴🅵🅶🅷🅸🅹🅺🅻🅼🅽🅾🅿🆀🆁🆂🆃🆄🆅🆆🆇🆈🆉🅰🅱🅲🅳🅴🅵🅶🅷🅸🅹🅺🅻🅼🅽🅾🅿🆀🆁🆂🆃🆄🆅🆆🆇🆈🆉0123456789~ `!@#$%^&*()-_=+[]{}|;:'\",<.>/?\\",
     "ɐqɔpǝɟƃɥᴉɾʞlɯuodbɹsʇnʌʍxʎz∀qƆpƎℲפHIſʞ˥WNOԀQɹS┴∩ΛMX⅄Z0ƖᄅƐㄣϛ9ㄥ86~ ,¡@#$%^⅋*)(-‾=+][}{|;:,,,'>˙</¿",
 ]
-OBFUSCATED_TRANS_TABLES = [
-    str.maketrans(NORMAL_CHARSET, charset) for charset in OBFUSCATED_CHARSETS
+# Maps all of the above as well as other stylized and confusable characters back
+# to normal ones in a single pass
+DEOBFUSCATION_TABLE = util.homoglyphs.build_table(NORMAL_CHARSET, OBFUSCATED_CHARSETS)
+# Spam waves repeat the same text, so remember recently normalized messages
+NORMALIZED_CACHE_SIZE = 1024
+# Recently confirmed spam, shared by all groups to catch mass-forwarded waves
+FINGERPRINT_CACHE_SIZE = 4096
+FINGERPRINT_TTL = 6 * 60 * 60
+# Texts whose SimHashes differ in at most this many bits are near-duplicates
+FINGERPRINT_DISTANCE = 7
+# Shorter texts are too generic to fingerprint
+FINGERPRINT_MIN_LENGTH = 20
+# Photos whose perceptual hashes differ in at most this many of 64 bits are
+# considered to be the same image
+IMAGE_HASH_DISTANCE = 8
+# Perceptual hashes of recently checked photos, by photo ID
+IMAGE_HASH_CACHE_SIZE = 1024
+# The whole blocklist is rewritten when saving, so new entries are saved in batches
+BLOCKLIST_SAVE_INTERVAL = 30
+# Largest file of user IDs that can be imported into the blocklist
+BLOCKLIST_IMPORT_MAX_SIZE = 16 * 1024 * 1024
+# Joining users are screened in batches collected over this many seconds, up to
+# the number of users that can be fetched in one request
+JOIN_BATCH_WINDOW = 2
+JOIN_BATCH_SIZE = 100
+# Bios need a request for each user, so only a few are looked up at a time
+BIO_LOOKUP_CONCURRENCY = 4
+BIO_CACHE_SIZE = 4096
+# Total score of suspicious profile traits at which a joining user is removed
+PROFILE_SCORE_THRESHOLD = 10
+# Scores of weak profile traits, which regular users have as well. Together they
+# stay below the threshold, so they only count alongside spam phrases in the bio.
+PROFILE_SCORE_NO_PHOTO = 2
+PROFILE_SCORE_BIO_LINK = 3
+BIO_KEYWORD_WEIGHT = 6
+# Phrases in bios rather than single words, since many regular users mention
+# investing or trading in theirs
+BIO_SPAM_PHRASES = [
+    "guaranteed profit",
+    "daily profit",
+    "earn daily",
+    "crypto signals",
+    "forex signals",
+    "trading signals",
+    "binary option",
+    "mining pool",
+    "double your",
+    "recover lost funds",
+    "fund recovery",
+    "no scam",
 ]
+BIO_KEYWORD_MATCHER = util.keywords.KeywordMatcher(
+    {kw: BIO_KEYWORD_WEIGHT for kw in BIO_SPAM_PHRASES}
+)
 
 CHINESE_PATTERN = regex.compile(r".*\p{IsHan}.*", regex.UNICODE)
+INVITE_LINK_PATTERN = regex.compile(r"(?:t|telegram)\.me/", regex.IGNORECASE)
+USER_ID_SEPARATOR_PATTERN = regex.compile(r"[\s,;]+")
+
+
+def decode_obfuscated_text(text: str) -> str:
+    return text.translate(DEOBFUSCATION_TABLE)
+
+
+@functools.lru_cache(maxsize=NORMALIZED_CACHE_SIZE)
+def normalize_text(text: str) -> str:
+    """Returns the given text deobfuscated and in lowercase for content checks."""
+
+    return decode_obfuscated_text(text).lower()
+
+
+@functools.lru_cache(maxsize=NORMALIZED_CACHE_SIZE)
+def text_simhash(text: str) -> int:
+    return util.simhash.simhash(util.simhash.features(text))
+
+
+def fingerprint_text(msg: tg.custom.Message) -> Optional[str]:
+    if not msg.raw_text:
+        return None
+
+    text = normalize_text(msg.raw_text)
+    return text if len(text) >= FINGERPRINT_MIN_LENGTH else None
+
+
+def fingerprint_media(msg: tg.custom.Message) -> Optional[int]:
+    # Stickers and GIFs are shared too widely to identify spam
+    if msg.photo:
+        return msg.photo.id
+    elif msg.document and not (msg.sticker or msg.gif):
+        return msg.document.id
 
+    return None
 
-def decode_obfuscated_text(text: str):
-    for trans in OBFUSCATED_TRANS_TABLES:
-        text = text.translate(trans)
 
-    return text
+def parse_user_ids(text: str) -> List[int]:
+    """Returns the user IDs in the given whitespace- or comma-separated text."""
+
+    return [
+        int(token)
+        for token in USER_ID_SEPARATOR_PATTERN.split(text)
+        if token.isdigit() and int(token) < 2**63
+    ]
 
 
 def msg_text_highly_suspicious(msg: tg.custom.Message):
@@ -83,16 +238,159 @@ def msg_text_highly_suspicious(msg: tg.custom.Message):
     )
 
 
+class MessageCheck:
+    """A message being checked by antibot's rules, with metadata loaded on demand."""
+
+    mod: "AntibotModule"
+    msg: tg.custom.Message
+    _sender: Any
+    _participant: Any
+
+    def __init__(self, mod: "AntibotModule", msg: tg.custom.Message) -> None:
+        self.mod = mod
+        self.msg = msg
+        self._sender = _NOT_LOADED
+        self._participant = _NOT_LOADED
+
+    async def get_sender(self) -> Optional[tg.types.User]:
+        if self._sender is _NOT_LOADED:
+            self._sender = await self.mod.bot.get_sender(self.msg)
+
+        return self._sender
+
+    async def get_participant(self) -> Optional[Participant]:
+        """Returns the sender's group-specific information, if they're still a member."""
+
+        if self._participant is _NOT_LOADED:
+            self._participant = None
+            sender = await self.get_sender()
+            if sender is not None:
+                chat = await self.mod.bot.get_chat(self.msg)
+                try:
+                    self._participant = await self.mod.get_participant(chat, sender)
+                except (ValueError, tg.errors.UserNotParticipantError):
+                    pass
+
+        return self._participant
+
+
+class Raid:
+    """State of an ongoing raid in a group, whose spammers are removed in batches."""
+
+    chat: tg.types.Channel
+    chat_id: int
+    start_time: int
+    last_activity: float
+    queue: "asyncio.Queue[tg.types.User]"
+    pending: Set[int]
+    spam_ids: List[int]
+    task: "asyncio.Task[None]"
+
+    # Report
+    peak_joins: int
+    kicked: int
+    failed: int
+    deleted: int
+
+    def __init__(self, chat: tg.types.Channel, chat_id: int) -> None:
+        self.chat = chat
+        self.chat_id = chat_id
+        self.start_time = util.time.usec()
+        self.last_activity = time.monotonic()
+        self.queue = asyncio.Queue()
+        self.pending = set()
+        self.spam_ids = []
+
+        self.peak_joins = 0
+        self.kicked = 0
+        self.failed = 0
+        self.deleted = 0
+
+    def add(self, user: tg.types.User, msg_id: Optional[int]) -> None:
+        self.last_activity = time.monotonic()
+        if msg_id is not None:
+            self.spam_ids.append(msg_id)
+
+        # Spammers often send several messages before they're removed
+        if user.id not in self.pending:
+            self.pending.add(user.id)
+            self.queue.put_nowait(user)
+
+    @property
+    def idle(self) -> bool:
+        return (
+            self.queue.empty()
+            and time.monotonic() - self.last_activity >= RAID_COOLDOWN
+        )
+
+
 class AntibotModule(module.Module):
     name: ClassVar[str] = "Antibot"
     db: util.db.AsyncDB
     group_db: util.db.AsyncDB
+    spoken_db: util.db.AsyncDB
     user_db: util.db.AsyncDB
+    image_db: util.db.AsyncDB
+    participants: util.cache.TTLCache[ParticipantKey, Participant]
+    admins_loaded: util.cache.TTLCache[int, bool]
+    _pending_lookups: MutableMapping[Any, "asyncio.Task[Any]"]
+    keyword_matchers: MutableMapping[int, util.keywords.KeywordMatcher]
+    rules: util.rules.RuleEngine
+    # Enable times of groups where antibot is enabled, mirrored from the database
+    enabled_groups: MutableMapping[int, int]
+    threshold_time: int
+    # Users who have spoken in each group, persisted as spoken.<chat>.<user>
+    spoken_filters: MutableMapping[int, util.bloom.ScalableBloomFilter]
+    spoken_recent: util.cache.TTLCache[ParticipantKey, bool]
+    # Origin groups of recently confirmed spam, by exact text, media and SimHash
+    spam_texts: util.cache.TTLCache[int, int]
+    spam_media: util.cache.TTLCache[int, int]
+    spam_simhashes: util.simhash.SimHashIndex[int]
+    # Perceptual hashes of images marked as spam, persisted as images.<hash>
+    spam_images: util.bktree.BKTree
+    image_hashes: util.cache.TTLCache[int, int]
+    # Confirmed spambots in any group, persisted as a packed array of user IDs
+    blocklist: util.intset.SortedIntSet
+    blocklist_save_task: Optional["asyncio.Task[None]"]
+    # Joining users waiting to be screened in each group, with their join events
+    join_batches: MutableMapping[int, MutableMapping[int, tg.events.ChatAction.Event]]
+    join_flush_tasks: MutableMapping[int, "asyncio.Task[None]"]
+    join_flushes: Set["asyncio.Task[None]"]
+    bios: util.cache.TTLCache[int, str]
+    bio_lookups: asyncio.Semaphore
+    # Raid detection and handling
+    join_rates: MutableMapping[int, util.rate.EventRate]
+    spam_rates: MutableMapping[int, util.rate.EventRate]
+    raids: MutableMapping[int, Raid]
 
     async def on_load(self) -> None:
         self.db = self.bot.get_db("antibot")
         self.group_db = self.db.prefixed_db("groups.")
+        self.spoken_db = self.db.prefixed_db("spoken.")
         self.user_db = self.db.prefixed_db("users.")
+        self.image_db = self.db.prefixed_db("images.")
+        self.participants = util.cache.TTLCache(
+            PARTICIPANT_CACHE_SIZE, PARTICIPANT_CACHE_TTL
+        )
+        self.admins_loaded = util.cache.TTLCache(PARTICIPANT_CACHE_SIZE, ADMIN_LIST_TTL)
+        self._pending_lookups = {}
+        self.keyword_matchers = {}
+        self.rules = util.rules.RuleEngine.from_object(self, SPAM_SCORE_THRESHOLD)
+        self.spoken_recent = util.cache.TTLCache(SPOKEN_CACHE_SIZE, SPOKEN_CACHE_TTL)
+        self.spam_texts = util.cache.TTLCache(FINGERPRINT_CACHE_SIZE, FINGERPRINT_TTL)
+        self.spam_media = util.cache.TTLCache(FINGERPRINT_CACHE_SIZE, FINGERPRINT_TTL)
+        self.spam_simhashes = util.simhash.SimHashIndex(
+            FINGERPRINT_CACHE_SIZE, FINGERPRINT_TTL, FINGERPRINT_DISTANCE
+        )
+        self.image_hashes = util.cache.TTLCache(IMAGE_HASH_CACHE_SIZE, FINGERPRINT_TTL)
+        self.join_batches = {}
+        self.join_flush_tasks = {}
+        self.join_flushes = set()
+        self.bios = util.cache.TTLCache(BIO_CACHE_SIZE, PARTICIPANT_CACHE_TTL)
+        self.bio_lookups = asyncio.Semaphore(BIO_LOOKUP_CONCURRENCY)
+        self.join_rates = {}
+        self.spam_rates = {}
+        self.raids = {}
 
         # Migrate message tracking start times to the new per-group format
         fmsg_start_time = await self.db.get("first_msg_start_time")
@@ -109,6 +407,201 @@ class AntibotModule(module.Module):
 
             await self.db.delete("first_msg_start_time")
 
+        # Migrate has-spoken flags to chat-major keys so that each group's flags
+        # are stored together, apart from the group settings loaded on startup
+        migrated = 0
+        async for key, value in self.user_db:
+            user_id, sep, chat_id = key.partition(".has_spoken_in_")
+            if sep:
+                if value:
+                    await self.spoken_db.put(f"{chat_id}.{user_id}", True)
+
+                await self.user_db.delete(key)
+                migrated += 1
+
+        if migrated:
+            self.log.info(
+                f"Migrated {migrated} has-spoken flags to the per-group format"
+            )
+
+        await self.load_group_state()
+        await self.load_spam_images()
+
+        blocklist: Optional[bytes] = await self.db.get("blocklist")
+        self.blocklist = (
+            util.intset.SortedIntSet.from_bytes(blocklist)
+            if blocklist
+            else util.intset.SortedIntSet()
+        )
+        self.blocklist_save_task = None
+
+    async def on_stop(self) -> None:
+        for raid in list(self.raids.values()):
+            raid.task.cancel()
+
+        # Wait for join screening to stop so that no tasks are left pending
+        join_tasks = [*self.join_flush_tasks.values(), *self.join_flushes]
+        for task in join_tasks:
+            task.cancel()
+        await asyncio.gather(*join_tasks, return_exceptions=True)
+
+        # Save recently blocked spambots now rather than losing them
+        if self.blocklist_save_task is not None:
+            self.blocklist_save_task.cancel()
+            await self.save_blocklist()
+
+    async def load_group_state(self) -> None:
+        """Loads the settings needed to check messages from the database."""
+
+        self.threshold_time = await self.db.get(
+            "threshold_time", DEFAULT_THRESHOLD_TIME
+        )
+
+        enabled = []
+        enable_times = {}
+        async for key, value in self.group_db:
+            chat_id, _, setting = key.partition(".")
+            if setting == "enabled" and value:
+                enabled.append(int(chat_id))
+            elif setting == "enable_time":
+                enable_times[int(chat_id)] = value
+
+        self.enabled_groups = {
+            chat_id: enable_times.get(chat_id, 0) for chat_id in enabled
+        }
+
+        # Only enabled groups are checked, so skip the flags of all other groups
+        self.spoken_filters = {}
+        for group_id in self.enabled_groups:
+            bloom = self.get_spoken_filter(group_id)
+            async for key, _ in self.spoken_db.iterator(prefix=f"{group_id}."):
+                bloom.add(int(key[len(f"{group_id}.") :]))
+
+    async def load_spam_images(self) -> None:
+        # BK-trees can't remove keys, so they're rebuilt after unmarking images
+        self.spam_images = util.bktree.BKTree(
+            [int(key, 16) async for key, _ in self.image_db]
+        )
+
+    async def save_blocklist(self) -> None:
+        await self.db.put("blocklist", self.blocklist.to_bytes())
+
+    async def _save_blocklist_later(self) -> None:
+        await asyncio.sleep(BLOCKLIST_SAVE_INTERVAL)
+        self.blocklist_save_task = None
+        await self.save_blocklist()
+
+    def block(self, user_id: int) -> None:
+        if self.blocklist.add(user_id) and self.blocklist_save_task is None:
+            self.blocklist_save_task = self.bot.loop.create_task(
+                self._save_blocklist_later()
+            )
+
+    def get_spoken_filter(self, chat_id: int) -> util.bloom.ScalableBloomFilter:
+        try:
+            return self.spoken_filters[chat_id]
+        except KeyError:
+            bloom = util.bloom.ScalableBloomFilter()
+            self.spoken_filters[chat_id] = bloom
+            return bloom
+
+    async def has_spoken(self, chat_id: int, user_id: int) -> bool:
+        key = (chat_id, user_id)
+        if key in self.spoken_recent:
+            return True
+
+        # The filter rules out most users who haven't spoken without any I/O
+        bloom = self.spoken_filters.get(chat_id)
+        if bloom is None or user_id not in bloom:
+            return False
+
+        # Confirm possible false positives with the database
+        spoken = await self.spoken_db.has(f"{chat_id}.{user_id}")
+        if spoken:
+            self.spoken_recent.put(key, True)
+
+        return spoken
+
+    async def mark_spoken(self, chat_id: int, user_id: int) -> None:
+        # Only write on the first message, not every message
+        if await self.has_spoken(chat_id, user_id):
+            return
+
+        self.get_spoken_filter(chat_id).add(user_id)
+        self.spoken_recent.put((chat_id, user_id), True)
+        await self.spoken_db.put(f"{chat_id}.{user_id}", True)
+
+    async def forget_spoken(self, chat_id: int, user_id: int) -> None:
+        # Bloom filters don't support removal, but lookups are confirmed anyway
+        self.spoken_recent.pop((chat_id, user_id))
+        await self.spoken_db.delete(f"{chat_id}.{user_id}")
+
+    async def _coalesce(
+        self, key: Any, func: Callable[[], Coroutine[Any, Any, Result]]
+    ) -> Result:
+        # Share a single in-flight request between all concurrent lookups of the
+        # same key, so spam waves don't turn into a flood of identical requests
+        task = self._pending_lookups.get(key)
+        if task is None:
+            task = self.bot.loop.create_task(func())
+            self._pending_lookups[key] = task
+            task.add_done_callback(lambda _: self._pending_lookups.pop(key, None))
+
+        # Don't cancel the shared request if only one of the waiters is cancelled
+        return await asyncio.shield(task)
+
+    async def _fetch_admins(self, chat: tg.types.Channel, chat_id: int) -> None:
+        try:
+            async for user in self.bot.client.iter_participants(
+                chat, filter=tg.types.ChannelParticipantsAdmins
+            ):
+                self.participants.put((chat_id, user.id), user.participant)
+        except tg.errors.ChatAdminRequiredError:
+            # Fall back to individual lookups
+            pass
+
+        self.admins_loaded.put(chat_id, True)
+
+    async def _fetch_participant(
+        self, chat: tg.types.Channel, key: ParticipantKey, user: tg.types.User
+    ) -> Participant:
+        result = await self.bot.client(
+            tg.tl.functions.channels.GetParticipantRequest(chat, user)
+        )
+        self.participants.put(key, result.participant)
+        return result.participant
+
+    async def load_admins(self, chat: tg.types.Channel, chat_id: int) -> None:
+        if chat_id not in self.admins_loaded:
+            await self._coalesce(chat_id, lambda: self._fetch_admins(chat, chat_id))
+
+    async def is_known_admin(self, chat: tg.types.Channel, user: tg.types.User) -> bool:
+        """Checks the user against the group's admin list, without looking them up."""
+
+        chat_id = tg.utils.get_peer_id(chat)
+        await self.load_admins(chat, chat_id)
+        return isinstance(
+            self.participants.get((chat_id, user.id)),
+            (tg.types.ChannelParticipantCreator, tg.types.ChannelParticipantAdmin),
+        )
+
+    async def get_participant(
+        self, chat: tg.types.Channel, user: tg.types.User
+    ) -> Participant:
+        chat_id = tg.utils.get_peer_id(chat)
+
+        # Load all admins at once since they're the most likely to be talking
+        await self.load_admins(chat, chat_id)
+
+        key = (chat_id, user.id)
+        ptcp = self.participants.get(key)
+        if ptcp is not None:
+            return ptcp
+
+        return await self._coalesce(
+            key, lambda: self._fetch_participant(chat, key, user)
+        )
+
     def msg_has_suspicious_entity(self, msg: tg.custom.Message) -> bool:
         if not msg.entities:
             return False
@@ -116,7 +609,23 @@ class AntibotModule(module.Module):
         # Messages containing certain entities are more likely to be spam
         return any(type(entity) in SUSPICIOUS_ENTITIES for entity in msg.entities)
 
-    def msg_has_suspicious_keyword(self, msg: tg.custom.Message) -> bool:
+    async def get_keyword_matcher(self, chat_id: int) -> util.keywords.KeywordMatcher:
+        matcher = self.keyword_matchers.get(chat_id)
+        if matcher is None:
+            # Groups without custom keywords share the default matcher
+            weights: Optional[Mapping[str, float]] = await self.group_db.get(
+                f"{chat_id}.keywords"
+            )
+            if weights is None:
+                matcher = DEFAULT_KEYWORD_MATCHER
+            else:
+                matcher = util.keywords.KeywordMatcher(weights)
+
+            self.keyword_matchers[chat_id] = matcher
+
+        return matcher
+
+    async def msg_has_suspicious_keyword(self, msg: tg.custom.Message) -> bool:
         if not msg.raw_text:
             return False
 
@@ -127,145 +636,562 @@ class AntibotModule(module.Module):
             # Use a f-string so we don't need to deal with None values
             text += f"{webpage.site_name}{webpage.title}{webpage.description}"
 
-        # Decode text with obfuscated characters
-        text = decode_obfuscated_text(text)
-        # Only check lowercase
-        text = text.lower()
+        # Decode text with obfuscated characters and only check lowercase
+        text = normalize_text(text)
 
         # Many spam messages mention certain keywords, such as cryptocurrency exchanges
-        return any(kw in text for kw in SUSPICIOUS_KEYWORDS)
+        matcher = await self.get_keyword_matcher(msg.chat_id)
+        matches = matcher.matches(text)
+        if sum(matches.values()) < KEYWORD_SCORE_THRESHOLD:
+            return False
+
+        self.log.debug(f"Message {msg.id} in {msg.chat_id} matched keywords {matches}")
+        return True
+
+    @staticmethod
+    def msg_type_suspicious(msg: tg.custom.Message) -> bool:
+        return bool(msg.contact or msg.geo or msg.game)
 
-    def msg_content_suspicious(self, msg: tg.custom.Message) -> bool:
+    # Rules for suspicious messages, evaluated cheapest-first by the rule engine
+
+    @util.rules.rule(COST_ATTR, veto=True)
+    async def rule_outgoing(self, check: MessageCheck) -> bool:
+        # Message *could* be suspicious only if we didn't send it
+        return bool(check.msg.out)
+
+    @util.rules.rule(COST_ATTR, veto=True)
+    async def rule_undated(self, check: MessageCheck) -> bool:
+        # Exonerate empty messages, which don't have a date
+        return not check.msg.date
+
+    @util.rules.rule(COST_ATTR, SCORE_HIGH)
+    async def rule_suspicious_type(self, check: MessageCheck) -> bool:
+        return self.msg_type_suspicious(check.msg)
+
+    @util.rules.rule(COST_TEXT, SCORE_HIGH)
+    async def rule_forwarded_entity(self, check: MessageCheck) -> bool:
         # Forwarded messages are subject to more aggressive entity checks
-        suspicious_entity = self.msg_has_suspicious_entity(msg)
-        if msg.forward and suspicious_entity:
-            return True
+        return bool(check.msg.forward) and self.msg_has_suspicious_entity(check.msg)
 
-        # All messages are subject to keyword checks
-        if self.msg_has_suspicious_keyword(msg):
-            return True
+    @util.rules.rule(COST_TEXT, SCORE_LOW)
+    async def rule_suspicious_photo(self, check: MessageCheck) -> bool:
+        msg = check.msg
+        return bool(msg.photo) and (not msg.text or self.msg_has_suspicious_entity(msg))
 
+    @util.rules.rule(COST_TEXT * 2, SCORE_HIGH)
+    async def rule_highly_suspicious_text(self, check: MessageCheck) -> bool:
         # Messages with bold text, Chinese characters (in groups where English is the primary language), *and* suspicious entities
-        if msg_text_highly_suspicious(msg) and suspicious_entity:
-            return True
+        return bool(
+            msg_text_highly_suspicious(check.msg)
+            and self.msg_has_suspicious_entity(check.msg)
+        )
 
-        # Allow otherwise
-        return False
+    @util.rules.rule(COST_TEXT * 3, SCORE_HIGH)
+    async def rule_keyword(self, check: MessageCheck) -> bool:
+        # All messages are subject to keyword checks
+        return await self.msg_has_suspicious_keyword(check.msg)
 
-    @staticmethod
-    def msg_type_suspicious(msg: tg.custom.Message) -> bool:
-        return bool(msg.contact or msg.geo or msg.game)
+    @util.rules.rule(COST_ATTR, SCORE_HIGH, decisive=True)
+    async def rule_blocklisted(self, check: MessageCheck) -> bool:
+        # Spambots confirmed in any group are removed on sight, unless they're
+        # established members here. Only blocklisted senders are looked up.
+        if check.msg.sender_id not in self.blocklist:
+            return False
 
-    async def msg_data_is_suspicious(self, msg: tg.custom.Message) -> int:
-        incoming = not msg.out
-        has_date = msg.date
-        forwarded = msg.forward
-
-        # Message *could* be suspicious if we didn't send it
-        # Check for a date to exonerate empty messages
-        if incoming and has_date:
-            # Lazily evaluate suspicious content as it is more expensive
-            if forwarded:
-                # Messages forwarded from a linked channel by Telegram don't have a sender
-                # We can assume these messages are safe since only admins can link channels
-                sender = await msg.get_sender()
-                if sender is None:
-                    return 0
-
-                # Spambots don't forward their own messages; they mass-forward
-                # messages from central coordinated channels for maximum efficiency
-                # This protects users who forward questions with links/images to
-                # various support chats asking for help (arguably, that's spammy,
-                # but it's out of scope for this function)
-                if (
-                    msg.forward.from_id == sender.id
-                    or msg.forward.from_name == tg.utils.get_display_name(sender)
-                ):
-                    return 0
+        return await self.is_new_sender(check)
 
-            if self.msg_type_suspicious(msg) or self.msg_content_suspicious(msg):
-                return 10
-            elif msg.photo and (not msg.text or self.msg_has_suspicious_entity(msg)):
-                return 5
+    def remember_spam(self, msg: tg.custom.Message) -> None:
+        text = fingerprint_text(msg)
+        if text is not None:
+            self.spam_texts.put(hash(text), msg.chat_id)
+            self.spam_simhashes.put(text_simhash(text), msg.chat_id)
 
-        return 0
+        media_id = fingerprint_media(msg)
+        if media_id is not None:
+            self.spam_media.put(media_id, msg.chat_id)
 
-    async def msg_is_suspicious(self, msg: tg.custom.Message) -> bool:
-        # Check if the data in the message is suspicious
-        data_score = await self.msg_data_is_suspicious(msg)
-        if data_score <= 0:
+    async def is_new_sender(self, check: MessageCheck) -> bool:
+        # Decisive rules skip the costlier vetoes, so the ones that exempt the
+        # sender are applied here instead
+        sender = await check.get_sender()
+        if sender is None or await self.has_spoken(check.msg.chat_id, sender.id):
             return False
 
-        # Load message metadata entities
-        chat = await msg.get_chat()
-        sender = await msg.get_sender()
+        chat = await self.bot.get_chat(check.msg)
+        if await self.is_known_admin(chat, sender):
+            return False
 
-        # Messages forwarded from a linked channel by Telegram don't have a sender
-        # We can assume these messages are safe because only admins can link channels
-        if sender is None:
+        # Membership is only looked up once the cheaper checks have passed
+        for veto in (
+            self.rule_own_forward,
+            self.rule_not_participant,
+            self.rule_admin,
+            self.rule_joined_before_enable,
+        ):
+            if await veto(check):
+                return False
+
+        return True
+
+    @util.rules.rule(COST_TEXT, SCORE_HIGH, decisive=True)
+    async def rule_repeated_spam(self, check: MessageCheck) -> bool:
+        # Spambots mass-forward the same messages into many groups
+        text = fingerprint_text(check.msg)
+        origin = None if text is None else self.spam_texts.get(hash(text))
+        if origin is None:
+            media_id = fingerprint_media(check.msg)
+            if media_id is not None:
+                origin = self.spam_media.get(media_id)
+
+        if origin is None or not await self.is_new_sender(check):
+            return False
+
+        self.log.debug(
+            f"Message {check.msg.id} in {check.msg.chat_id} repeats spam from {origin}"
+        )
+        return True
+
+    @util.rules.rule(COST_TEXT * 4, SCORE_HIGH, decisive=True)
+    async def rule_similar_spam(self, check: MessageCheck) -> bool:
+        # Catch slightly altered copies as well. Hashing is cheaper than checking
+        # the sender, which can take database and API lookups, so match first
+        text = fingerprint_text(check.msg)
+        if not self.spam_simhashes or text is None:
+            return False
+
+        origin = self.spam_simhashes.find(text_simhash(text))
+        if origin is None or not await self.is_new_sender(check):
+            return False
+
+        self.log.debug(
+            f"Message {check.msg.id} in {check.msg.chat_id} is similar to spam from {origin}"
+        )
+        return True
+
+    async def get_image_hash(self, msg: tg.custom.Message) -> Optional[int]:
+        """Returns the perceptual hash of the message's photo, if it has one."""
+
+        photo = msg.photo
+        if photo is None:
+            return None
+
+        img_hash = self.image_hashes.get(photo.id)
+        if img_hash is None:
+            # The smallest thumbnail is enough for a 9x8 hash, and it's usually
+            # embedded in the message, so nothing needs to be downloaded
+            data = await self.bot.client.download_media(msg, bytes, thumb=0)
+            if not data:
+                return None
+
+            img_hash = await util.async_helpers.run_in_process(util.image.dhash, data)
+            self.image_hashes.put(photo.id, img_hash)
+
+        return img_hash
+
+    @util.rules.rule(COST_IMAGE, SCORE_HIGH)
+    async def rule_spam_image(self, check: MessageCheck) -> bool:
+        # Spambots reuse the same images with different captions and re-encodings
+        if not self.spam_images or not check.msg.photo:
             return False
 
-        # Load group-specific user information
         try:
-            ch_participant = await self.bot.client(
-                tg.tl.functions.channels.GetParticipantRequest(chat, sender)
+            img_hash = await self.get_image_hash(check.msg)
+        except (ValueError, OSError, tg.errors.RPCError) as e:
+            self.log.warning(
+                f"Error hashing photo in message {check.msg.id}", exc_info=e
             )
-        except (ValueError, tg.errors.UserNotParticipantError):
-            # User was already banned or deleted; we don't need to proceed
             return False
 
-        ptcp = ch_participant.participant
+        if img_hash is None:
+            return False
 
-        # Exempt the group creator and admins
-        if isinstance(ptcp, tg.tl.types.ChannelParticipantCreator) or isinstance(
-            ptcp, tg.types.ChannelParticipantAdmin
-        ):
+        matches = self.spam_images.find(img_hash, IMAGE_HASH_DISTANCE)
+        if not matches:
             return False
 
-        delta = msg.date - ptcp.date
-        just_joined = delta.total_seconds() <= await self.db.get("threshold_time", 30)
+        self.log.debug(
+            f"Photo in message {check.msg.id} in {check.msg.chat_id} is {matches[0][0]} bits from a spam image"
+        )
+        return True
+
+    @util.rules.rule(COST_CACHE, veto=True)
+    async def rule_no_sender(self, check: MessageCheck) -> bool:
+        # Messages forwarded from a linked channel by Telegram don't have a sender
+        # We can assume these messages are safe because only admins can link channels
+        return await check.get_sender() is None
+
+    @util.rules.rule(COST_CACHE, veto=True)
+    async def rule_own_forward(self, check: MessageCheck) -> bool:
+        # Spambots don't forward their own messages; they mass-forward messages
+        # from central coordinated channels for maximum efficiency
+        # This protects users who forward questions with links/images to various
+        # support chats asking for help (arguably, that's spammy, but it's out of
+        # scope for antibot)
+        fwd = check.msg.forward
+        sender = await check.get_sender()
+        if not fwd or sender is None:
+            return False
+
+        return fwd.from_id == sender.id or fwd.from_name == tg.utils.get_display_name(
+            sender
+        )
+
+    @util.rules.rule(COST_DB, veto=True)
+    async def rule_has_spoken(self, check: MessageCheck) -> bool:
+        # Only users' first messages are checked
+        sender = await check.get_sender()
+        return sender is not None and await self.has_spoken(
+            check.msg.chat_id, sender.id
+        )
+
+    @util.rules.rule(COST_API, veto=True)
+    async def rule_not_participant(self, check: MessageCheck) -> bool:
+        # User was already banned or deleted; we don't need to proceed
+        return await check.get_participant() is None
+
+    @util.rules.rule(COST_API, veto=True)
+    async def rule_admin(self, check: MessageCheck) -> bool:
+        # Exempt the group creator and admins
+        return isinstance(
+            await check.get_participant(),
+            (tg.types.ChannelParticipantCreator, tg.types.ChannelParticipantAdmin),
+        )
+
+    @util.rules.rule(COST_API, veto=True)
+    async def rule_joined_before_enable(self, check: MessageCheck) -> bool:
+        # First messages are only tracked for users who joined after antibot was
+        # enabled, so earlier members can't be checked
+        ptcp = await check.get_participant()
+        if ptcp is None:
+            return False
 
         join_time_sec = int(ptcp.date.replace(tzinfo=timezone.utc).timestamp())
-        first_msg_eligible = join_time_sec > await self.group_db.get(
-            f"{msg.chat_id}.enable_time", 0
+        return join_time_sec <= self.enabled_groups.get(check.msg.chat_id, 0)
+
+    @util.rules.rule(COST_API, SCORE_LOW)
+    async def rule_just_joined(self, check: MessageCheck) -> bool:
+        # Less suspicious first messages sent right after joining also count
+        ptcp = await check.get_participant()
+        if ptcp is None:
+            return False
+
+        delta = check.msg.date - ptcp.date
+        return delta.total_seconds() <= self.threshold_time
+
+    async def check_msg(
+        self, msg: tg.custom.Message, *, exhaustive: bool = False
+    ) -> util.rules.Verdict:
+        return await self.rules.evaluate(MessageCheck(self, msg), exhaustive=exhaustive)
+
+    async def msg_is_suspicious(self, msg: tg.custom.Message) -> bool:
+        verdict = await self.check_msg(msg)
+        if verdict.triggered:
+            self.log.debug(
+                f"Message {msg.id} in {msg.chat_id} matched rules {verdict.hits}"
+            )
+
+        return verdict.triggered
+
+    async def get_bio(self, user: tg.types.User) -> str:
+        bio = self.bios.get(user.id)
+        if bio is None:
+            async with self.bio_lookups:
+                try:
+                    full = await self.bot.client(
+                        tg.tl.functions.users.GetFullUserRequest(user)
+                    )
+                except tg.errors.RPCError as e:
+                    self.log.warning(f"Error getting bio of user {user.id}", exc_info=e)
+                    return ""
+
+            bio = full.full_user.about or ""
+            self.bios.put(user.id, bio)
+
+        return bio
+
+    async def screen_profiles(
+        self, chat_id: int, users: Sequence[tg.types.User]
+    ) -> List[float]:
+        """Scores the profiles of a batch of joining users, one trait at a time."""
+
+        scores = [0.0] * len(users)
+
+        def add_score(
+            matches: Sequence[bool],
+            score: float,
+            indices: Optional[Sequence[int]] = None,
+        ) -> None:
+            # Matches are for the users at the given indices, or all users
+            for idx, match in zip(indices or range(len(users)), matches):
+                if match:
+                    scores[idx] += score
+
+        # Accounts flagged by Telegram itself
+        add_score([bool(user.scam or user.fake) for user in users], SCORE_HIGH)
+        # Some spammers have Telegram invite links in their first or last names
+        names = [tg.utils.get_display_name(user) for user in users]
+        add_score(
+            [bool(INVITE_LINK_PATTERN.search(name)) for name in names], SCORE_HIGH
+        )
+        # Accounts registered in bulk usually don't have a profile photo
+        add_score([user.photo is None for user in users], PROFILE_SCORE_NO_PHOTO)
+
+        # Bios need a request for each user, so only look them up for undecided
+        # users, and save requests for removals during raids
+        undecided = [
+            idx for idx, score in enumerate(scores) if score < PROFILE_SCORE_THRESHOLD
+        ]
+        if not undecided or chat_id in self.raids:
+            return scores
+
+        bios = await asyncio.gather(*(self.get_bio(users[idx]) for idx in undecided))
+        bios = [normalize_text(bio) for bio in bios]
+        add_score(
+            [bool(INVITE_LINK_PATTERN.search(bio)) for bio in bios],
+            PROFILE_SCORE_BIO_LINK,
+            undecided,
         )
-        if first_msg_eligible:
-            # We started tracking first messages in this group before the user
-            # joined, so we can run the first message check
-            is_first_msg = not await self.user_db.get(
-                f"{sender.id}.has_spoken_in_{msg.chat_id}", False
+        for idx, bio in zip(undecided, bios):
+            scores[idx] += BIO_KEYWORD_MATCHER.score(bio)
+
+        return scores
+
+    async def get_joined_users(
+        self, batch: Mapping[int, tg.events.ChatAction.Event]
+    ) -> List[tg.types.User]:
+        """Returns the users who joined in the given batch, fetching missing ones at once."""
+
+        users = []
+        missing = []
+        for user_id, action in batch.items():
+            user = self.bot.entity_cache.get(user_id)
+            if user is None:
+                user = next((u for u in action.users if u.id == user_id), None)
+
+            if isinstance(user, tg.types.User) and not user.min:
+                users.append(user)
+                continue
+
+            try:
+                input_user = await self.bot.client.get_input_entity(user_id)
+                missing.append(tg.utils.get_input_user(input_user))
+            except (ValueError, TypeError):
+                self.log.warning(f"Unable to find joining user {user_id}")
+
+        if missing:
+            try:
+                fetched = await self.bot.client(
+                    tg.tl.functions.users.GetUsersRequest(missing)
+                )
+            except tg.errors.RPCError as e:
+                self.log.warning("Error getting joining users", exc_info=e)
+                fetched = []
+
+            for user in fetched:
+                if isinstance(user, tg.types.User):
+                    self.bot.cache_entity(user)
+                    users.append(user)
+
+        return users
+
+    async def flush_joins(self, chat_id: int) -> None:
+        batch = self.join_batches.pop(chat_id, None)
+        if not batch:
+            return
+
+        users = await self.get_joined_users(batch)
+        # Exempt bots, which only admins can add, and deleted accounts
+        users = [user for user in users if not (user.bot or user.deleted)]
+        # Spambots confirmed in other groups are removed without further checks
+        spammers = [user for user in users if user.id in self.blocklist]
+        users = [user for user in users if user.id not in self.blocklist]
+
+        scores = await self.screen_profiles(chat_id, users)
+        flagged = [
+            user
+            for user, score in zip(users, scores)
+            if score >= PROFILE_SCORE_THRESHOLD
+        ]
+        if flagged:
+            self.log.debug(
+                f"Joining users {[user.id for user in flagged]} in {chat_id} have suspicious profiles"
             )
-            if is_first_msg and data_score >= 10:
-                # Suspicious message was the user's first message in this group
-                return True
 
-            # Less suspicious first messages sent right after joining also count
-            if is_first_msg and just_joined and data_score >= 5:
-                return True
+        # These are most likely spambots, take action against them
+        await asyncio.gather(
+            *(self.take_action(batch[user.id], user) for user in spammers + flagged)
+        )
+
+    async def _flush_joins_later(self, chat_id: int) -> None:
+        await asyncio.sleep(JOIN_BATCH_WINDOW)
 
-        # Allow this message
-        return False
+        # Let new joins start another batch while this one is screened, but keep
+        # track of the flush so that it can still be stopped
+        task = self.join_flush_tasks.pop(chat_id)
+        self.join_flushes.add(task)
+        try:
+            await self.flush_joins(chat_id)
+        finally:
+            self.join_flushes.discard(task)
+
+    async def queue_joins(self, action: tg.events.ChatAction.Event) -> None:
+        batch = self.join_batches.setdefault(action.chat_id, {})
+        for user_id in action.user_ids:
+            batch[user_id] = action
+
+        if len(batch) >= JOIN_BATCH_SIZE:
+            await self.flush_joins(action.chat_id)
+        elif action.chat_id not in self.join_flush_tasks:
+            self.join_flush_tasks[action.chat_id] = self.bot.loop.create_task(
+                self._flush_joins_later(action.chat_id)
+            )
 
     @staticmethod
-    def profile_check_invite(user: tg.types.User) -> bool:
-        # Some spammers have Telegram invite links in their first or last names
-        return "t.me/" in tg.utils.get_display_name(user)
+    def record_rate(
+        rates: MutableMapping[int, util.rate.EventRate], chat_id: int, count: int = 1
+    ) -> int:
+        rate = rates.get(chat_id)
+        if rate is None:
+            rate = util.rate.EventRate(RAID_WINDOW)
+            rates[chat_id] = rate
+
+        return rate.hit(count)
+
+    async def start_raid(self, event: MessageEvent) -> Raid:
+        raid = self.raids.get(event.chat_id)
+        if raid is not None:
+            return raid
+
+        chat = await self.bot.get_chat(event)
+        # Another event may have started the raid while fetching the chat
+        raid = self.raids.get(event.chat_id)
+        if raid is not None:
+            return raid
+
+        self.log.warning(f'Raid detected in group "{chat.title}", switching to batches')
+        raid = Raid(chat, event.chat_id)
+        raid.task = self.bot.loop.create_task(self.run_raid(raid))
+        self.raids[event.chat_id] = raid
+        return raid
+
+    async def _raid_request(
+        self, func: Callable[..., Awaitable[Result]], *args: Any
+    ) -> Result:
+        # Removals aren't messages in the chat, so they skip its queue but still
+        # wait out FloodWaits together with everything else the bot sends
+        return await self.bot.outbound.submit(None, func, *args)
+
+    async def remove_raider(self, raid: Raid, user: tg.types.User) -> None:
+        try:
+            request = tg.tl.functions.channels.DeleteParticipantHistoryRequest(
+                raid.chat, user
+            )
+            await self._raid_request(self.bot.client, request)
+            await self._raid_request(self.bot.client.kick_participant, raid.chat, user)
+        except tg.errors.RPCError as e:
+            raid.failed += 1
+            self.log.warning(f"Failed to remove spambot with ID {user.id}: {e}")
+            return
+
+        raid.kicked += 1
+        self.participants.pop((raid.chat_id, user.id))
+        await self.bot.log_stat("spambots_banned")
+
+    async def raid_worker(self, raid: Raid) -> None:
+        while True:
+            user = await raid.queue.get()
+            try:
+                await self.remove_raider(raid, user)
+            finally:
+                raid.queue.task_done()
+
+    async def flush_raid_messages(self, raid: Raid) -> None:
+        while raid.spam_ids:
+            batch = raid.spam_ids[:RAID_DELETE_BATCH]
+            del raid.spam_ids[:RAID_DELETE_BATCH]
+
+            try:
+                await self._raid_request(
+                    self.bot.client.delete_messages, raid.chat, batch
+                )
+            except tg.errors.RPCError as e:
+                self.log.warning(f"Failed to delete {len(batch)} spam messages: {e}")
+            else:
+                raid.deleted += len(batch)
 
-    async def user_is_suspicious(self, user: tg.types.User) -> bool:
-        # Some spammers have invites in their names
-        return self.profile_check_invite(user)
+    async def run_raid(self, raid: Raid) -> None:
+        workers = [
+            self.bot.loop.create_task(self.raid_worker(raid))
+            for _ in range(RAID_WORKERS)
+        ]
+
+        try:
+            while not raid.idle:
+                await asyncio.sleep(RAID_FLUSH_INTERVAL)
+                await self.flush_raid_messages(raid)
+
+            await raid.queue.join()
+            await self.flush_raid_messages(raid)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+            self.raids.pop(raid.chat_id, None)
+
+        await self.report_raid(raid)
+
+    async def report_raid(self, raid: Raid) -> None:
+        duration = util.time.format_duration_us(util.time.usec() - raid.start_time)
+        self.log.info(
+            f'Raid in group "{raid.chat.title}" ended after {duration}: kicked {raid.kicked} spambots, deleted {raid.deleted} messages, {raid.failed} failures'
+        )
+        await self.bot.log_stat("raids_handled")
+
+        report = util.text.join_map(
+            {
+                "Duration": duration,
+                "Peak joins per minute": raid.peak_joins,
+                "Spambots kicked": raid.kicked,
+                "Spam messages deleted": raid.deleted,
+                "Failed removals": raid.failed,
+            },
+            heading=f"Antibot raid report for {raid.chat.title}",
+        )
+        await self.bot.outbound.submit(
+            self.bot.uid, self.bot.client.send_message, "me", report
+        )
 
     async def take_action(self, event: MessageEvent, user: tg.types.User) -> None:
+        self.block(user.id)
+        if isinstance(event, tg.events.NewMessage.Event):
+            self.remember_spam(event.message)
+
+        # Hand spammers over to the batch workers during raids
+        spammers = self.record_rate(self.spam_rates, event.chat_id)
+        raid = self.raids.get(event.chat_id)
+        if raid is None and spammers >= RAID_SPAM_THRESHOLD:
+            raid = await self.start_raid(event)
+
+        if raid is not None:
+            if isinstance(event, tg.events.NewMessage.Event):
+                msg_id: Optional[int] = event.message.id
+            else:
+                msg_id = event.action_message.id if event.action_message else None
+
+            raid.add(user, msg_id)
+            return
+
         # Wait a bit for welcome bots to react
         await asyncio.sleep(1)
 
         # Delete all of the sender's messages
-        chat = await event.get_chat()
-        request = tg.tl.functions.channels.DeleteUserHistoryRequest(chat, user)
+        chat = await self.bot.get_chat(event)
+        request = tg.tl.functions.channels.DeleteParticipantHistoryRequest(chat, user)
         await self.bot.client(request)
 
         # Kick the sender
         await self.bot.client.kick_participant(chat, user)
+        self.participants.pop((event.chat_id, user.id))
 
         # Log the event
         self.log.info(f'Kicked spambot with ID {user.id} in group "{chat.title}"')
@@ -274,38 +1200,63 @@ class AntibotModule(module.Module):
         # Delete the spam message just in case
         await event.delete()
 
-    async def is_enabled(self, event: MessageEvent) -> bool:
-        return bool(
-            event.is_group
-            and await self.group_db.get(f"{event.chat_id}.enabled", False)
-        )
+    def is_enabled(self, event: MessageEvent) -> bool:
+        return bool(event.is_group and event.chat_id in self.enabled_groups)
 
+    @listener.max_age(MAX_MESSAGE_AGE)
     async def on_message(self, msg: tg.events.NewMessage.Event) -> None:
         # Only run in groups where antibot is enabled
-        if await self.is_enabled(msg):
+        if self.is_enabled(msg):
             if await self.msg_is_suspicious(msg.message):
                 # This is most likely a spambot, take action against the user
-                user = await msg.get_sender()
+                user = await self.bot.get_sender(msg)
                 await self.take_action(msg, user)
-            else:
-                await self.user_db.put(
-                    f"{msg.sender_id}.has_spoken_in_{msg.chat_id}", True
-                )
+            elif msg.sender_id is not None:
+                await self.mark_spoken(msg.chat_id, msg.sender_id)
 
     async def clear_group(self, group_id: int) -> None:
-        async for key, _ in self.group_db.iterator(prefix=f"{group_id}."):
-            await self.group_db.delete(key)
+        self.enabled_groups.pop(group_id, None)
+        self.keyword_matchers.pop(group_id, None)
+        self.spoken_filters.pop(group_id, None)
+        self.spoken_recent.pop_matching(lambda key: key[0] == group_id)
+
+        await self.group_db.delete_prefix(f"{group_id}.")
+        await self.spoken_db.delete_prefix(f"{group_id}.")
+
+    def update_participants(self, action: tg.events.ChatAction.Event) -> None:
+        if action.user_left or action.user_kicked:
+            for user_id in action.user_ids:
+                self.participants.pop((action.chat_id, user_id))
+        elif (action.user_added or action.user_joined) and action.action_message:
+            # New members are always regular participants
+            join_date = action.action_message.date
+            for user_id in action.user_ids:
+                self.participants.put(
+                    (action.chat_id, user_id),
+                    tg.types.ChannelParticipant(user_id, join_date),
+                )
 
-        async for key, _ in self.user_db:
-            if key.endswith(f".has_spoken_in_{group_id}"):
-                await self.user_db.delete(key)
+    async def on_channel_participant(
+        self, update: tg.types.UpdateChannelParticipant
+    ) -> None:
+        # Catch promotions and demotions, which don't have service messages
+        chat_id = tg.utils.get_peer_id(tg.types.PeerChannel(update.channel_id))
+        key = (chat_id, update.user_id)
+        ptcp = update.new_participant
+        if ptcp is None or isinstance(
+            ptcp, (tg.types.ChannelParticipantBanned, tg.types.ChannelParticipantLeft)
+        ):
+            self.participants.pop(key)
+        else:
+            self.participants.put(key, ptcp)
 
+    @listener.max_age(MAX_MESSAGE_AGE)
     async def on_chat_action(self, action: tg.events.ChatAction.Event) -> None:
+        self.update_participants(action)
+
         # Remove has-spoken-in flag for departing users
-        if (action.user_left or action.user_kicked) and await self.is_enabled(action):
-            await self.user_db.delete(
-                f"{action.user_id}.has_spoken_in_{action.chat_id}"
-            )
+        if (action.user_left or action.user_kicked) and self.is_enabled(action):
+            await self.forget_spoken(action.chat_id, action.user_id)
 
             # Clean up antibot data if we left the group
             if action.user_id == self.bot.uid:
@@ -319,14 +1270,20 @@ class AntibotModule(module.Module):
             return
 
         # Only act in groups where this is enabled
-        if not await self.is_enabled(action):
+        if not self.is_enabled(action):
             return
 
-        # Fetch the user's data and run checks
-        user = await action.get_user()
-        if await self.user_is_suspicious(user):
-            # This is most likely a spambot, take action against the user
-            await self.take_action(action, user)
+        # Watch for mass joins, which are usually followed by a wave of spam
+        joins = self.record_rate(self.join_rates, action.chat_id, len(action.user_ids))
+        raid = self.raids.get(action.chat_id)
+        if raid is None and joins >= RAID_JOIN_THRESHOLD:
+            raid = await self.start_raid(action)
+
+        if raid is not None:
+            raid.peak_joins = max(raid.peak_joins, joins)
+
+        # Joins come in waves, so check users' profiles in batches
+        await self.queue_joins(action)
 
     @command.desc("Toggle the antibot auto-moderation feature in this group")
     async def cmd_antibot(self, ctx: command.Context) -> str:
@@ -336,7 +1293,7 @@ class AntibotModule(module.Module):
         if not ctx.msg.is_channel:
             return "__Please convert this group to a supergroup in order to enable antibot.__"
 
-        last_state = await self.group_db.get(f"{ctx.msg.chat_id}.enabled", False)
+        last_state = ctx.msg.chat_id in self.enabled_groups
         if ctx.input:
             state = ctx.input.lower() in util.INPUT_YES
         else:
@@ -348,7 +1305,7 @@ class AntibotModule(module.Module):
 
         if state:
             # Check for required permissions
-            chat = await ctx.msg.get_chat()
+            chat = await self.bot.get_chat(ctx.msg)
             ch_participant = await self.bot.client(
                 tg.tl.functions.channels.GetParticipantRequest(chat, self.bot.user)
             )
@@ -366,8 +1323,10 @@ class AntibotModule(module.Module):
             else:
                 return "__I must be an admin with the **Delete Messages** and **Ban Users** permissions for antibot to work.__"
 
+            enable_time = util.time.sec()
             await self.group_db.put(f"{ctx.msg.chat_id}.enabled", True)
-            await self.group_db.put(f"{ctx.msg.chat_id}.enable_time", util.time.sec())
+            await self.group_db.put(f"{ctx.msg.chat_id}.enable_time", enable_time)
+            self.enabled_groups[ctx.msg.chat_id] = enable_time
         else:
             await self.clear_group(ctx.msg.chat_id)
 
@@ -377,3 +1336,162 @@ class AntibotModule(module.Module):
             else ""
         )
         return f"Antibot is now **{state_text}** in this group.{comment}"
+
+    @command.desc("Manage the suspicious keywords antibot looks for in this group")
+    @command.usage(
+        '["list", "add", "del", or "reset"] [keywords, one per line, as "keyword" or "keyword = weight"?]',
+        optional=True,
+    )
+    @command.alias("abkw", "abkeywords")
+    async def cmd_antibotkw(self, ctx: command.Context) -> str:
+        if not ctx.msg.is_group:
+            return "__Antibot can only be used in groups.__"
+
+        chat_id = ctx.msg.chat_id
+        action, *items = ctx.plain_input.split(None, 1) or ["list"]
+        action = action.lower()
+        lines = items[0].splitlines() if items else []
+
+        matcher = await self.get_keyword_matcher(chat_id)
+        weights = dict(matcher.weights)
+
+        if action == "list":
+            custom = "" if matcher is DEFAULT_KEYWORD_MATCHER else "custom "
+            entries = [f"`{kw}`: {weight:g}" for kw, weight in sorted(weights.items())]
+            return util.text.join_list(
+                (f"Antibot's {custom}keywords in this group:", *entries)
+            )
+        elif action == "add":
+            new_weights = util.keywords.parse_weighted(
+                [line.lower() for line in lines], DEFAULT_KEYWORD_WEIGHT
+            )
+            if not new_weights:
+                return "__Provide keywords to add, one per line.__"
+
+            weights.update(new_weights)
+            result = f"Added {len(new_weights)} keywords."
+        elif action in ("del", "delete", "rm", "remove"):
+            removed = [
+                kw for kw in map(str.lower, map(str.strip, lines)) if kw in weights
+            ]
+            if not removed:
+                return "__None of those keywords are in use.__"
+
+            for keyword in removed:
+                del weights[keyword]
+
+            result = f"Removed {len(removed)} keywords."
+        elif action == "reset":
+            await self.group_db.delete(f"{chat_id}.keywords")
+            self.keyword_matchers.pop(chat_id, None)
+            return "Reset keywords to the defaults."
+        else:
+            return f"__Unknown action `{action}`.__"
+
+        await self.group_db.put(f"{chat_id}.keywords", weights)
+        self.keyword_matchers[chat_id] = util.keywords.KeywordMatcher(weights)
+        return result
+
+    @command.desc("Show how often each antibot rule matches and how long it takes")
+    @command.alias("abrules")
+    async def cmd_antibotrules(self, ctx: command.Context) -> str:
+        lines = []
+        for rule, time_share in self.rules.stats():
+            effect = "veto" if rule.veto else f"+{rule.score:g}"
+            lines.append(
+                f"`{rule.name}` ({effect}, cost {rule.cost:g}): matched {rule.hit_rate:.1%} of {rule.runs} runs, {rule.avg_time * 1e6:.1f} µs avg, {time_share:.1%} of time"
+            )
+
+        return util.text.join_list(
+            (f"Antibot rules (spam at a score of {self.rules.threshold:g}):", *lines)
+        )
+
+    @command.desc(
+        "Mark or unmark the replied-to photo as a known spam image for antibot"
+    )
+    @command.usage('["mark", "unmark", or "list"]', optional=True)
+    @command.alias("abimg", "abimage")
+    async def cmd_antibotimg(self, ctx: command.Context) -> str:
+        action = ctx.input.lower() or "mark"
+        if action == "list":
+            hashes = [f"`{img_hash:016x}`" for img_hash in sorted(self.spam_images)]
+            return util.text.join_list((f"{len(hashes)} known spam images:", *hashes))
+        elif action not in ("mark", "unmark"):
+            return f"__Unknown action `{action}`.__"
+
+        reply_msg = await ctx.msg.get_reply_message()
+        if not reply_msg or not reply_msg.photo:
+            return "__Reply to a photo to mark or unmark it as spam.__"
+
+        try:
+            img_hash = await self.get_image_hash(reply_msg)
+        except (ValueError, OSError, tg.errors.RPCError) as e:
+            return f"__Unable to read the photo: {e}__"
+
+        if img_hash is None:
+            return "__This photo doesn't have a thumbnail to hash.__"
+
+        if action == "unmark":
+            matches = self.spam_images.find(img_hash, IMAGE_HASH_DISTANCE)
+            if not matches:
+                return "__This image isn't marked as spam.__"
+
+            for _, key in matches:
+                await self.image_db.delete(f"{key:016x}")
+
+            await self.load_spam_images()
+            return f"Unmarked {len(matches)} similar spam images."
+
+        if not self.spam_images.add(img_hash):
+            return "__This image is already marked as spam.__"
+
+        await self.image_db.put(f"{img_hash:016x}", util.time.sec())
+        return f"Marked image `{img_hash:016x}` as spam."
+
+    @command.desc("Manage antibot's blocklist of spambots, shared by all groups")
+    @command.usage(
+        '["add", "del", "import", or "clear"] [user IDs, or reply to a file of them?]',
+        optional=True,
+    )
+    @command.alias("abblock", "abbl")
+    async def cmd_antibotblock(self, ctx: command.Context) -> str:
+        action, *items = ctx.plain_input.split(None, 1) or ["count"]
+        action = action.lower()
+        user_ids = parse_user_ids(items[0]) if items else []
+
+        if action == "count":
+            return f"Antibot's blocklist has **{len(self.blocklist)}** known spambots."
+        elif action == "add":
+            if not user_ids:
+                return "__Provide user IDs to add.__"
+
+            result = f"Added {self.blocklist.update(user_ids)} spambots."
+        elif action in ("del", "delete", "rm", "remove"):
+            if not user_ids:
+                return "__Provide user IDs to remove.__"
+
+            removed = sum(self.blocklist.discard(user_id) for user_id in user_ids)
+            result = f"Removed {removed} spambots."
+        elif action == "import":
+            reply_msg = await ctx.msg.get_reply_message()
+            if not reply_msg or not reply_msg.file:
+                return "__Reply to a file of user IDs to import it.__"
+
+            if reply_msg.file.size > BLOCKLIST_IMPORT_MAX_SIZE:
+                return "__That file is too large to import.__"
+
+            text = await util.tg.download_text(ctx, reply_msg)
+            user_ids = parse_user_ids(text)
+            if not user_ids:
+                return "__That file doesn't contain any user IDs.__"
+
+            added = self.blocklist.update(user_ids)
+            result = f"Imported {added} new spambots out of {len(user_ids)} user IDs."
+        elif action == "clear":
+            self.blocklist.clear()
+            result = "Cleared the blocklist."
+        else:
+            return f"__Unknown action `{action}`.__"
+
+        await self.save_blocklist()
+        return result
@@ -172,7 +172,8 @@ Please read the rules _before_ participating.
                 )
                 await ctx.respond(status_header)
 
-        async with self.bot.client.conversation(target) as conv:
+        progress = ctx.progress()
+        async with progress, self.bot.client.conversation(target) as conv:
 
             async def reply_and_ack() -> tg.custom.Message:
                 # Wait for a reply
@@ -194,14 +195,16 @@ Commands issued:
 
 {status_body}"""
 
-                # Wait for the rate-limit, the bot's response, and the send
+                # Queue a status update; intermediate ones are coalesced
+                progress.update(status)
+
+                # Wait for the rate-limit and the bot's response
                 try:
                     reply_task = self.bot.loop.create_task(reply_and_ack())
-                    send_task = self.bot.loop.create_task(ctx.respond(status))
 
                     # pylint: disable=unused-variable
                     done, pending = await asyncio.wait(
-                        (reply_task, send_task, asyncio.sleep(0.25))
+                        (reply_task, asyncio.sleep(0.25))
                     )
 
                     # Raise all exceptions
@@ -164,7 +164,7 @@ Time: {el_str}"""
         entity_ref: tg.hints.EntitiesLike = ctx.input
 
         if ctx.input == "chat":
-            entity = await ctx.msg.get_chat()
+            entity = await self.bot.get_chat(ctx.msg)
         elif ctx.input:
             if ctx.input.isdigit():
                 try:
@@ -175,7 +175,7 @@ Time: {el_str}"""
                 entity_ref = ctx.input
 
             try:
-                entity = await self.bot.client.get_entity(entity_ref)
+                entity = await self.bot.get_entity(entity_ref)
             except ValueError as e:
                 return f"Error getting entity `{entity_ref}`: {e}"
         elif ctx.msg.is_reply:
@@ -198,7 +198,7 @@ Time: {el_str}"""
 
         if ctx.msg.is_reply:
             reply_msg = await ctx.msg.get_reply_message()
-            sender = await reply_msg.get_sender()
+            sender = await self.bot.get_sender(reply_msg)
             lines.append(f"Message ID: `{reply_msg.id}`")
 
             if sender:
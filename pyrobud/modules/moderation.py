@@ -1,4 +1,3 @@
-from datetime import datetime
 from typing import ClassVar, List, Optional
 
 import telethon as tg
@@ -30,7 +29,7 @@ class ModerationModule(module.Module):
 
         mention_slots = 4096 - len(mention_text)
 
-        chat = await ctx.msg.get_chat()
+        chat = await self.bot.get_chat(ctx.msg)
         async for user in self.bot.client.iter_participants(chat, filter=user_filter):
             mention_text += f"[\u200b](tg://user?id={user.id})"
 
@@ -70,7 +69,7 @@ class ModerationModule(module.Module):
             return "__Provide a list of user IDs to ban, or reply to a user's message to ban them.__"
 
         lines: List[str]
-        chat = await ctx.msg.get_chat()
+        chat = await self.bot.get_chat(ctx.msg)
         single_user = len(user_ids) == 1
         if single_user:
             lines = []
@@ -80,7 +79,7 @@ class ModerationModule(module.Module):
 
         for user_id in user_ids:
             try:
-                user = await self.bot.client.get_entity(user_id)
+                user = await self.bot.get_entity(user_id)
             except ValueError:
                 if single_user:
                     lines.append(f"__Unable to find user__ `{user_id}`.")
@@ -104,7 +103,9 @@ class ModerationModule(module.Module):
             ban_request = tg.tl.functions.channels.EditBannedRequest(chat, user, rights)
 
             try:
-                await self.bot.client(ban_request)
+                await self.bot.outbound.submit(
+                    ctx.msg.chat_id, self.bot.client, ban_request
+                )
             except tg.errors.ChatAdminRequiredError:
                 return "__I need permission to ban users in this chat.__"
 
@@ -115,50 +116,43 @@ class ModerationModule(module.Module):
     @command.usage("[target chat ID/username/...?]", optional=True)
     async def cmd_prunemembers(self, ctx: command.Context) -> str:
         if ctx.input:
-            chat = await self.bot.client.get_entity(ctx.input)
+            chat = await self.bot.get_entity(ctx.input)
             if isinstance(chat, tg.types.User):
                 return f"`{ctx.input}` __references a user, not a chat.__"
 
             _chat_name = f" from **{chat.title}**"
             _chat_name2 = f" in **{chat.title}**"
         else:
-            chat = await ctx.msg.get_chat()
+            chat = await self.bot.get_chat(ctx.msg)
             _chat_name = ""
             _chat_name2 = ""
 
         await ctx.respond(f"Fetching members{_chat_name}...")
         all_members = await self.bot.client.get_participants(chat)
 
-        last_time = datetime.now()
         total_count = len(all_members)
         err_count = 0
         pruned_count = 0
-        idx = 0
 
         status_text = f"Pruning deleted members{_chat_name}..."
         await ctx.respond(status_text)
 
-        for user in all_members:
-            if not user.deleted:
-                continue
+        async with ctx.progress() as progress:
+            for idx, user in enumerate(all_members):
+                if not user.deleted:
+                    continue
 
-            try:
-                await self.bot.client.kick_participant(chat, user)
-            except tg.errors.UserAdminInvalidError:
-                err_count += 1
-            else:
-                pruned_count += 1
+                try:
+                    await self.bot.client.kick_participant(chat, user)
+                except tg.errors.UserAdminInvalidError:
+                    err_count += 1
+                else:
+                    pruned_count += 1
 
-            percent_done = int((idx + 1) / total_count * 100)
-            now = datetime.now()
-            delta = now - last_time
-            if delta.total_seconds() >= 5:
-                await ctx.respond(
+                percent_done = int((idx + 1) / total_count * 100)
+                progress.update(
                     f"{status_text} {percent_done}% done ({idx + 1} of {total_count} processed; {pruned_count} banned; {err_count} failed)"
                 )
 
-            last_time = now
-            idx += 1
-
         percent_pruned = int(pruned_count / total_count * 100)
         return f"Pruned {pruned_count} deleted users{_chat_name2} — {percent_pruned}% of the original member count."
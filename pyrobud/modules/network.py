@@ -1,5 +1,4 @@
 import asyncio
-import io
 import re
 import urllib.parse
 from typing import ClassVar, Optional
@@ -14,6 +13,7 @@ LOGIN_CODE_REGEX = r"[Ll]ogin code: (\d+)"
 
 class NetworkModule(module.Module):
     name: ClassVar[str] = "Network"
+    upload_target: ClassVar[util.upload.UploadTarget] = util.upload.FileIOTarget()
 
     @command.desc("Pong")
     async def cmd_ping(self, ctx: command.Context):
@@ -58,21 +58,19 @@ class NetworkModule(module.Module):
         if not reply_msg.file:
             return "__That message doesn't contain a file.__"
 
-        data = await util.tg.download_file(ctx, reply_msg)
-        buf = io.BytesIO(data)
-        buf.name = reply_msg.file.name
-
-        await ctx.respond("Uploading file to [file.io](https://file.io/)...")
-
-        async with self.bot.http.post(
-            f"https://file.io/?expires={expires}", data={"file": buf}
-        ) as resp:
-            resp_data = await resp.json()
-
-            if not resp_data["success"]:
-                return f"__Error uploading file — status code {resp.status}__"
-
-            return str(resp_data["link"])
+        target = self.upload_target
+        await ctx.respond(f"Uploading file to {target.name}...")
+
+        # Upload while downloading without buffering the entire file
+        stream = util.tg.stream_download(ctx, reply_msg)
+        try:
+            return await target.upload(
+                self.bot.http, stream, reply_msg.file.name, expires=expires
+            )
+        except util.upload.UploadError as e:
+            return f"__Error uploading file — {e}__"
+        finally:
+            await stream.aclose()
 
     @command.desc("Update the embed for a link")
     @command.usage("[link?, or reply]", optional=True)
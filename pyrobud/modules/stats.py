@@ -1,4 +1,5 @@
-from typing import ClassVar, Optional
+import asyncio
+from typing import Any, ClassVar, List, Mapping, MutableMapping, Optional
 
 import telethon as tg
 
@@ -6,6 +7,29 @@ from .. import command, module, util
 
 USEC_PER_HOUR = 60 * 60 * 1000000
 USEC_PER_DAY = USEC_PER_HOUR * 24
+# Counters are kept in memory and written to the database at this interval
+FLUSH_INTERVAL = 60
+
+# Counters shown for time windows
+WINDOW_STATS = {
+    "received": "Messages received",
+    "sent": "Messages sent",
+    "processed": "Commands processed",
+    "replaced": "Snippets replaced",
+    "spambots_banned": "Spambots kicked",
+    "raids_handled": "Raids handled",
+    "stickers_created": "Stickers created",
+    "edits_suppressed": "Redundant edits skipped",
+    "flood_waits": "Flood waits",
+}
+BUCKET_UNITS = {60: "min", 60 * 60: "h", 24 * 60 * 60: "day"}
+# Longest time window that counts are kept for
+MAX_WINDOW = max(width * slots for width, slots in util.timeseries.DEFAULT_TIERS)
+# Busiest chats and senders shown, with the relative error and failure probability
+# of their message counts
+TOP_COUNT = 10
+TOP_EPSILON = 0.001
+TOP_DELTA = 0.01
 
 
 def _calc_pct(num1: int, num2: int) -> str:
@@ -28,9 +52,23 @@ def _calc_pd(stat: int, uptime: int) -> str:
 class StatsModule(module.Module):
     name: ClassVar[str] = "Stats"
     db: util.db.AsyncDB
+    series_db: util.db.AsyncDB
+    # Counts over time, persisted as series.<stat>.<tier>
+    series: MutableMapping[str, util.timeseries.TimeSeries]
+    # Newest bucket of each tier when it was last written
+    saved_heads: MutableMapping[str, List[int]]
+    # Increments of lifetime totals that haven't been written yet
+    pending: MutableMapping[str, int]
+    # Message counts of the busiest chats and senders, persisted as top_<kind>
+    top_chats: util.sketch.HeavyHitters
+    top_senders: util.sketch.HeavyHitters
+    top_changed: bool
+    flush_task: Optional["asyncio.Task[None]"] = None
 
     async def on_load(self) -> None:
         self.db = self.bot.get_db("stats")
+        self.series_db = self.db.prefixed_db("series.")
+        self.pending = {}
 
         # Log migration message if applicable
         if await self.db.has("stop_time_usec") or await self.db.has("uptime"):
@@ -48,15 +86,85 @@ class StatsModule(module.Module):
             await self.db.put("start_time_usec", self.bot.start_time_usec - uptime)
             await self.db.delete("uptime")
 
+        self.series = {}
+        async for key, value in self.series_db:
+            stat, _, tier_idx = key.rpartition(".")
+            series = self.series.get(stat)
+            if series is None:
+                series = util.timeseries.TimeSeries()
+                self.series[stat] = series
+
+            if int(tier_idx) < len(series.tiers):
+                series.tiers[int(tier_idx)].load_bytes(value)
+
+        self.saved_heads = {}
+        for stat, series in self.series.items():
+            self.saved_heads[stat] = [tier.head for tier in series.tiers]
+            series.resync()
+
+        self.top_chats = await self.load_heavy_hitters("top_chats")
+        self.top_senders = await self.load_heavy_hitters("top_senders")
+        self.top_changed = False
+
+    async def load_heavy_hitters(self, key: str) -> util.sketch.HeavyHitters:
+        hitters = util.sketch.HeavyHitters(TOP_COUNT, TOP_EPSILON, TOP_DELTA)
+        data: Optional[Mapping[str, Any]] = await self.db.get(key)
+        if data is not None:
+            hitters.load_dict(data)
+
+        return hitters
+
     async def on_start(self, time_us: int) -> None:
         # Initialize start_time_usec for new instances
         if not await self.db.has("start_time_usec"):
             await self.db.put("start_time_usec", time_us)
 
+        if self.flush_task is None:
+            self.flush_task = self.bot.loop.create_task(self.flush_periodically())
+
+    async def on_stop(self) -> None:
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Writes all counters changed since the last flush to the database."""
+
+        pending, self.pending = self.pending, {}
+        for key, delta in pending.items():
+            await self.db.inc(key, delta)
+            await self.save_series(key)
+
+        if self.top_changed:
+            self.top_changed = False
+            await self.db.put("top_chats", self.top_chats.to_dict())
+            await self.db.put("top_senders", self.top_senders.to_dict())
+
+    async def save_series(self, key: str) -> None:
+        # Coarser tiers are only written when they start a new bucket, since
+        # resync() can rebuild their newest buckets from the finest tier
+        tiers = self.series[key].tiers
+        saved_heads = self.saved_heads.setdefault(key, [-1] * len(tiers))
+        for idx, tier in enumerate(tiers):
+            if idx == 0 or tier.head != saved_heads[idx]:
+                await self.series_db.put(f"{key}.{idx}", tier.to_bytes())
+                saved_heads[idx] = tier.head
+
+    async def flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            await self.flush()
+
     async def on_message(self, msg: tg.events.NewMessage.Event) -> None:
         stat = "sent" if msg.out else "received"
         await self.bot.log_stat(stat)
 
+        self.top_chats.add(msg.chat_id)
+        if msg.sender_id is not None:
+            self.top_senders.add(msg.sender_id)
+        self.top_changed = True
+
         if msg.sticker:
             sticker_stat = stat + "_stickers"
             await self.bot.log_stat(sticker_stat)
@@ -71,13 +179,65 @@ class StatsModule(module.Module):
         await self.bot.log_stat("processed")
 
     async def on_stat_event(self, key: str) -> None:
-        await self.db.inc(key)
+        self.pending[key] = self.pending.get(key, 0) + 1
+
+        series = self.series.get(key)
+        if series is None:
+            series = util.timeseries.TimeSeries()
+            self.series[key] = series
+
+        series.add()
 
     async def get_start_time(self) -> int:
         return await self.db.get("start_time_usec") or self.bot.start_time_usec
 
-    @command.desc("Show chat stats (pass `reset` to reset stats)")
-    @command.usage('["reset" to reset stats?]', optional=True)
+    def format_window_stats(self, window: int) -> str:
+        window_us = window * 1000000
+        stats = {}
+        for key, desc in WINDOW_STATS.items():
+            series = self.series.get(key)
+            if series is None:
+                continue
+
+            width, values = series.values(window)
+            total = sum(values)
+            stats[desc] = (
+                f"{total} ({_calc_ph(total, window_us)}/h) • peak of {max(values)} per {BUCKET_UNITS.get(width, f'{width}s')}"
+            )
+
+        return util.text.join_map(
+            stats or {"Events": "none yet"},
+            heading=f"Stats for the last {util.time.format_duration_us(window_us)}",
+        )
+
+    async def get_peer_name(self, peer_id: int) -> str:
+        try:
+            entity = await self.bot.get_entity(peer_id)
+        except ValueError:
+            return f"`{peer_id}`"
+
+        return f"{tg.utils.get_display_name(entity)} (`{peer_id}`)"
+
+    async def format_top(self, kind: str, hitters: util.sketch.HeavyHitters) -> str:
+        sketch = hitters.sketch
+        top = {}
+        for peer_id, count in hitters.items():
+            top[await self.get_peer_name(peer_id)] = (
+                f"{count} messages ({_calc_pct(count, sketch.total)}%)"
+            )
+
+        return util.text.join_map(
+            top or {"None": "no messages yet"},
+            heading=f"Busiest {kind} of {sketch.total} messages (counts are at most {sketch.error_bound:.0f} too high with {sketch.confidence:.0%} confidence)",
+        )
+
+    @command.desc(
+        "Show chat stats, optionally only for a recent time window or the busiest chats and users (pass `reset` to reset stats)"
+    )
+    @command.usage(
+        '[time window like "1h" or "7d", "top" for the busiest chats and users, or "reset" to reset stats?]',
+        optional=True,
+    )
     @command.alias("stat")
     async def cmd_stats(self, ctx: command.Context) -> str:
         if ctx.input == "reset":
@@ -86,6 +246,22 @@ class StatsModule(module.Module):
             await self.on_start(util.time.usec())
             return "__All stats have been reset.__"
 
+        if ctx.input == "top":
+            chats = await self.format_top("chats", self.top_chats)
+            senders = await self.format_top("users", self.top_senders)
+            return f"{chats}\n\n{senders}"
+
+        if ctx.input:
+            window = util.time.parse_duration(ctx.input)
+            if not window:
+                return f"__Invalid time window `{ctx.input}`.__"
+            if window > MAX_WINDOW:
+                return f"__Stats are only kept for the last {util.time.format_duration_us(MAX_WINDOW * 1000000)}.__"
+
+            return self.format_window_stats(window)
+
+        await self.flush()
+
         start_time: Optional[int] = await self.db.get("start_time_usec")
         if start_time is None:
             start_time = util.time.usec()
@@ -102,6 +278,9 @@ class StatsModule(module.Module):
         replaced: int = await self.db.get("replaced", 0)
         ab_kicked: int = await self.db.get("spambots_banned", 0)
         stickers: int = await self.db.get("stickers_created", 0)
+        flood_waits: int = await self.db.get("flood_waits", 0)
+        edits_suppressed: int = await self.db.get("edits_suppressed", 0)
+        outbound = self.bot.outbound
 
         return util.text.join_map(
             {
@@ -113,6 +292,10 @@ class StatsModule(module.Module):
                 "Snippets replaced": f"{replaced} ({_calc_ph(replaced, uptime)}/h) • {_calc_pct(replaced, sent)}% of sent messages",
                 "Spambots kicked": f"{ab_kicked} ({_calc_pd(ab_kicked, uptime)}/day)",
                 "Stickers created": f"{stickers} ({_calc_pd(stickers, uptime)}/day)",
+                "Redundant edits skipped": f"{edits_suppressed} ({_calc_ph(edits_suppressed, uptime)}/h)",
+                "Flood waits": f"{flood_waits} ({_calc_pd(flood_waits, uptime)}/day)",
+                "Backlogged events": f"{self.bot.catch_up_events} replayed • {self.bot.catch_up_skipped} skipped as stale since start",
+                "Outbound queue delay": f"{outbound.avg_queue_time * 1000:.0f} ms avg • {outbound.max_queue_time * 1000:.0f} ms max • {outbound.requests} requests since start",
             },
             heading="Stats since last reset",
         )
@@ -49,6 +49,7 @@ class StickerModule(module.Module):
 
         success = False
         before = datetime.now()
+        submit = self.bot.outbound.submit
 
         async with self.bot.client.conversation(target) as conv:
 
@@ -63,9 +64,11 @@ class StickerModule(module.Module):
             try:
                 for cmd_type, data, expected_resp in commands:
                     if cmd_type == "text":
-                        await conv.send_message(data)
+                        await submit(conv.chat_id, conv.send_message, data)
                     elif cmd_type == "file":
-                        await conv.send_file(data, force_document=True)
+                        await submit(
+                            conv.chat_id, conv.send_file, data, force_document=True
+                        )
                     else:
                         raise TypeError(f"Unknown command type '{cmd_type}'")
 
@@ -94,7 +97,7 @@ class StickerModule(module.Module):
             finally:
                 # Cancel the operation if we return early
                 if not success:
-                    await conv.send_message("/cancel")
+                    await submit(conv.chat_id, conv.send_message, "/cancel")
 
         return True, f"https://t.me/addstickers/{pack_name}"
 
@@ -129,8 +132,9 @@ class StickerModule(module.Module):
 
         await ctx.respond("Copying sticker...")
 
-        sticker_bytes = await reply_msg.download_media(file=bytes)
-        sticker_buf = io.BytesIO(sticker_bytes)
+        sticker_buf = io.BytesIO()
+        await util.tg.download_file(ctx, reply_msg, sticker_buf, file_type="sticker")
+        sticker_buf.seek(0)
         await util.image.img_to_png(sticker_buf)
 
         sticker_buf.seek(0)
@@ -277,8 +281,9 @@ class StickerModule(module.Module):
 
         await ctx.respond("Creating sticker...")
 
-        sticker_bytes = await reply_msg.download_media(file=bytes)
-        sticker_buf = io.BytesIO(sticker_bytes)
+        sticker_buf = io.BytesIO()
+        await util.tg.download_file(ctx, reply_msg, sticker_buf, file_type="image")
+        sticker_buf.seek(0)
 
         png_buf = io.BytesIO()
         webp_buf = io.BytesIO()
@@ -317,8 +322,9 @@ class StickerModule(module.Module):
 
         await ctx.respond("Creating sticker...")
 
-        sticker_bytes = await reply_msg.download_media(file=bytes)
-        sticker_buf = io.BytesIO(sticker_bytes)
+        sticker_buf = io.BytesIO()
+        await util.tg.download_file(ctx, reply_msg, sticker_buf, file_type="image")
+        sticker_buf.seek(0)
 
         path = Path("stickers") / f"{name}.webp"
         await util.image.img_to_sticker(sticker_buf, {"webp": path})
@@ -346,15 +352,15 @@ class StickerModule(module.Module):
 
         await ctx.respond("Glitching image...")
 
-        orig_bytes = await reply_msg.download_media(file=bytes)
+        png_buf = io.BytesIO()
+        await util.tg.download_file(ctx, reply_msg, png_buf, file_type="image")
 
         # Convert to PNG if necessary
-        if orig_bytes.startswith(PNG_MAGIC):
-            png_bytes = orig_bytes
-        else:
-            png_buf = io.BytesIO(orig_bytes)
+        if png_buf.getbuffer()[: len(PNG_MAGIC)] != PNG_MAGIC:
+            png_buf.seek(0)
             await util.image.img_to_png(png_buf)
-            png_bytes = png_buf.getvalue()
+
+        png_bytes = png_buf.getvalue()
 
         # Invoke external 'corrupter' program to glitch the image
         # Source code: https://github.com/r00tman/corrupter
@@ -73,22 +73,23 @@ class SystemModule(module.Module):
         st = await util.run_sync(speedtest.Speedtest)
         status = "Selecting server..."
 
-        await ctx.respond(status)
-        server = await util.run_sync(st.get_best_server)
-        status += f" {server['sponsor']} ({server['name']})\n"
-        status += f"Ping: {server['latency']:.2f} ms\n"
-
-        status += "Performing download test..."
-        await ctx.respond(status)
-        dl_bits = await util.run_sync(st.download)
-        dl_mbit = dl_bits / 1000 / 1000
-        status += f" {dl_mbit:.2f} Mbps\n"
-
-        status += "Performing upload test..."
-        await ctx.respond(status)
-        ul_bits = await util.run_sync(st.upload)
-        ul_mbit = ul_bits / 1000 / 1000
-        status += f" {ul_mbit:.2f} Mbps\n"
+        async with ctx.progress() as progress:
+            progress.update(status)
+            server = await util.run_sync(st.get_best_server)
+            status += f" {server['sponsor']} ({server['name']})\n"
+            status += f"Ping: {server['latency']:.2f} ms\n"
+
+            status += "Performing download test..."
+            progress.update(status)
+            dl_bits = await util.run_sync(st.download)
+            dl_mbit = dl_bits / 1000 / 1000
+            status += f" {dl_mbit:.2f} Mbps\n"
+
+            status += "Performing upload test..."
+            progress.update(status)
+            ul_bits = await util.run_sync(st.upload)
+            ul_mbit = ul_bits / 1000 / 1000
+            status += f" {ul_mbit:.2f} Mbps\n"
 
         delta = util.time.usec() - before
         status += f"\nTime elapsed: {util.time.format_duration_us(delta)}"
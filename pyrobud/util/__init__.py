@@ -1,17 +1,31 @@
 from . import (
     async_helpers,
+    bktree,
+    bloom,
+    cache,
     config,
     db,
     dependencies,
     error,
+    flood,
     git,
+    homoglyphs,
     image,
+    intset,
+    keywords,
     misc,
+    rate,
+    redact,
+    rules,
     sentry,
+    simhash,
+    sketch,
     system,
     text,
     tg,
     time,
+    timeseries,
+    upload,
     version,
 )
 
@@ -1,9 +1,15 @@
 import asyncio
+import concurrent.futures
 import functools
-from typing import Any, Callable, TypeVar
+from typing import Any, Callable, Optional, TypeVar
 
 Result = TypeVar("Result")
 
+# CPU-bound work is rare, so a couple of processes are enough
+PROCESS_POOL_WORKERS = 2
+
+_process_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
 
 async def run_sync(func: Callable[..., Result], *args: Any, **kwargs: Any) -> Result:
     """Runs the given sync function (optionally with arguments) on a separate thread."""
@@ -11,3 +17,33 @@ async def run_sync(func: Callable[..., Result], *args: Any, **kwargs: Any) -> Re
     # Python 3.14+: use get_running_loop() in async functions
     loop = asyncio.get_running_loop()
     return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+async def run_in_process(
+    func: Callable[..., Result], *args: Any, **kwargs: Any
+) -> Result:
+    """Runs the given picklable sync function in a shared process pool.
+
+    Unlike run_sync, this doesn't hold up the event loop's thread with the GIL, so
+    it's meant for CPU-bound work such as decoding images.
+    """
+
+    global _process_pool
+
+    if _process_pool is None:
+        _process_pool = concurrent.futures.ProcessPoolExecutor(PROCESS_POOL_WORKERS)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _process_pool, functools.partial(func, *args, **kwargs)
+    )
+
+
+def shutdown_process_pool() -> None:
+    """Stops the shared process pool, if it was started."""
+
+    global _process_pool
+
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
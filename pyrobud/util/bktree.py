@@ -0,0 +1,89 @@
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+Metric = Callable[[int, int], int]
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class _Node:
+    key: int
+    children: Dict[int, "_Node"]
+
+    def __init__(self, key: int) -> None:
+        self.key = key
+        self.children = {}
+
+
+class BKTree:
+    """Burkhard-Keller tree of integer keys for nearest-neighbor searches.
+
+    Each child is stored under its distance from the parent, so by the triangle
+    inequality, searches only need to descend into children whose distance is within
+    the search radius of the query's distance to the parent.
+    """
+
+    metric: Metric
+    _root: Optional[_Node]
+    _size: int
+
+    def __init__(
+        self, keys: Iterable[int] = (), metric: Metric = hamming_distance
+    ) -> None:
+        self.metric = metric
+        self._root = None
+        self._size = 0
+
+        for key in keys:
+            self.add(key)
+
+    def add(self, key: int) -> bool:
+        """Adds the given key and returns whether it was new."""
+
+        if self._root is None:
+            self._root = _Node(key)
+            self._size += 1
+            return True
+
+        node = self._root
+        while True:
+            dist = self.metric(key, node.key)
+            if dist == 0:
+                return False
+
+            child = node.children.get(dist)
+            if child is None:
+                node.children[dist] = _Node(key)
+                self._size += 1
+                return True
+
+            node = child
+
+    def find(self, key: int, max_distance: int) -> List[Tuple[int, int]]:
+        """Returns (distance, key) pairs within the given distance, closest first."""
+
+        results = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            dist = self.metric(key, node.key)
+            if dist <= max_distance:
+                results.append((dist, node.key))
+
+            for child_dist, child in node.children.items():
+                if dist - max_distance <= child_dist <= dist + max_distance:
+                    stack.append(child)
+
+        results.sort()
+        return results
+
+    def __iter__(self) -> Iterator[int]:
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            yield node.key
+            stack.extend(node.children.values())
+
+    def __len__(self) -> int:
+        return self._size
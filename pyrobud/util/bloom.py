@@ -0,0 +1,114 @@
+import hashlib
+import math
+from typing import Iterator, List, Tuple
+
+# Capacity and error rate multipliers for each filter added to a scalable filter
+GROWTH_FACTOR = 2
+TIGHTENING_RATIO = 0.5
+
+
+def _hash_pair(key: int) -> Tuple[int, int]:
+    # Python's integer hashes are the identity, so derive independent hashes
+    digest = hashlib.blake2b(
+        key.to_bytes(8, "little", signed=True), digest_size=16
+    ).digest()
+    # The second hash must be odd to cycle through all bit positions
+    return (
+        int.from_bytes(digest[:8], "little"),
+        int.from_bytes(digest[8:], "little") | 1,
+    )
+
+
+class BloomFilter:
+    """Fixed-capacity Bloom filter for integer keys, such as user IDs.
+
+    Membership tests never return false negatives, but may return false positives
+    at roughly the configured error rate once filled to capacity.
+    """
+
+    capacity: int
+    num_bits: int
+    num_hashes: int
+    count: int
+    bits: bytearray
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        self.capacity = capacity
+        self.num_bits = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, hashes: Tuple[int, int]) -> Iterator[int]:
+        h1, h2 = hashes
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add_hashed(self, hashes: Tuple[int, int]) -> None:
+        for pos in self._positions(hashes):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+        self.count += 1
+
+    def contains_hashed(self, hashes: Tuple[int, int]) -> bool:
+        return all(
+            self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(hashes)
+        )
+
+    def add(self, key: int) -> None:
+        self.add_hashed(_hash_pair(key))
+
+    def __contains__(self, key: int) -> bool:
+        return self.contains_hashed(_hash_pair(key))
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+
+class ScalableBloomFilter:
+    """Bloom filter that grows as keys are added, keeping its error rate bounded."""
+
+    initial_capacity: int
+    error_rate: float
+    filters: List[BloomFilter]
+
+    def __init__(self, initial_capacity: int = 1024, error_rate: float = 0.01) -> None:
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.filters = []
+
+    def _grow(self) -> BloomFilter:
+        # Geometrically tightening error rates keep the compound rate below the
+        # configured one, no matter how many filters are added
+        n = len(self.filters)
+        capacity = self.initial_capacity * GROWTH_FACTOR**n
+        error_rate = self.error_rate * (1 - TIGHTENING_RATIO) * TIGHTENING_RATIO**n
+
+        bloom = BloomFilter(capacity, error_rate)
+        self.filters.append(bloom)
+        return bloom
+
+    def add(self, key: int) -> None:
+        bloom = self.filters[-1] if self.filters else None
+        if bloom is None or bloom.full:
+            bloom = self._grow()
+
+        bloom.add_hashed(_hash_pair(key))
+
+    def __contains__(self, key: int) -> bool:
+        hashes = _hash_pair(key)
+        return any(bloom.contains_hashed(hashes) for bloom in self.filters)
+
+    def __len__(self) -> int:
+        return sum(len(bloom) for bloom in self.filters)
+
+    @property
+    def size(self) -> int:
+        """Returns the memory used by the filter's bit arrays, in bytes."""
+
+        return sum(len(bloom.bits) for bloom in self.filters)
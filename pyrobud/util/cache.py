@@ -0,0 +1,58 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+Key = TypeVar("Key", bound=Hashable)
+Value = TypeVar("Value")
+
+
+class TTLCache(Generic[Key, Value]):
+    """Size-bounded LRU cache with a fixed time-to-live for each entry."""
+
+    max_size: int
+    ttl: float
+    _entries: "OrderedDict[Key, Tuple[float, Value]]"
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, key: Key, default: Optional[Value] = None) -> Optional[Value]:
+        try:
+            expire_time, value = self._entries[key]
+        except KeyError:
+            return default
+
+        if expire_time < time.monotonic():
+            del self._entries[key]
+            return default
+
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Key, value: Value) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        # Evict the least recently used entries
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Key) -> None:
+        self._entries.pop(key, None)
+
+    def pop_matching(self, predicate: Callable[[Key], bool]) -> None:
+        """Removes all entries with keys that satisfy the given predicate."""
+
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __contains__(self, key: Key) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
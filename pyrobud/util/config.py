@@ -1,12 +1,14 @@
 import collections.abc
 import logging
 import os
+import re
 from pathlib import Path
-from typing import Any, Mapping, MutableMapping, Union
+from typing import Any, List, Mapping, MutableMapping, Union
 
 import tomlkit
 import tomlkit.toml_document
 
+from . import redact
 from .async_helpers import run_sync
 from .config_db_migrator import upgrade_v3
 
@@ -89,6 +91,9 @@ upgrade_methods = [
     {"version": 9, "asyncio": {"debug": False}},
     {"version": 10, "asyncio": {"use_uvloop": DeleteValue, "disable_uvloop": False}},
     {"version": 11, "bot": {"overflow_mode": "truncate", "overflow_page_limit": 4}},
+    {"version": 12, "bot": {"overflow_file": False}},
+    {"version": 13, "bot": {"redact_patterns": []}},
+    {"version": 14, "bot": {"catch_up_max_age": 21600, "catch_up_concurrency": 8}},
 ]
 
 
@@ -125,3 +130,22 @@ async def upgrade(config: Config, path: str) -> None:
 
         # Save config ASAP to prevent an inconsistent state if the next upgrade fails
         await run_sync(save, config, path)
+
+
+def validate(config: Config) -> None:
+    """Skips invalid settings that would otherwise stop the bot from starting.
+
+    Only the in-memory config is changed, so the user's file is left as is.
+    """
+
+    bot_config = config["bot"]
+    patterns: List[str] = []
+    for pattern in bot_config.get("redact_patterns", []):
+        try:
+            redact.check_pattern(pattern, patterns)
+        except re.error as e:
+            log.error(f"Skipping invalid redaction pattern {pattern!r}: {e}")
+        else:
+            patterns.append(pattern)
+
+    bot_config["redact_patterns"] = patterns
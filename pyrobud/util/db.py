@@ -137,6 +137,29 @@ class AsyncDB:
         )
         return value is not None
 
+    async def delete_prefix(self, prefix: str) -> None:
+        """Deletes all keys that start with the given prefix in a single batch."""
+
+        if self._fallback_storage is not None:
+            # In-memory fallback
+            full_prefix = f"{self.prefix or ''}{prefix}"
+            keys_to_delete = [
+                k for k in self._fallback_storage.keys() if k.startswith(full_prefix)
+            ]
+            for k in keys_to_delete:
+                del self._fallback_storage[k]
+            return
+
+        def delete_keys() -> None:
+            # The iterator reads from an implicit snapshot, so deleting is safe
+            with self._db.write_batch() as batch:
+                for key in self._db.iterator(
+                    prefix=prefix.encode("utf-8"), include_value=False
+                ):
+                    batch.delete(key)
+
+        return await run_sync(delete_keys)
+
     async def clear(self, **kwargs: Any) -> None:
         if self._fallback_storage is not None:
             # In-memory fallback - clear all keys with our prefix
@@ -168,7 +191,18 @@ class AsyncDB:
         if self._fallback_storage is not None:
             # In-memory fallback
             prefix = self.prefix or ''
-            items = [(k[len(prefix):], v) for k, v in self._fallback_storage.items() if k.startswith(prefix)]
+            # Honor key prefix filters like plyvel, which doesn't strip them
+            key_prefix = kwargs.get("prefix", "")
+            if isinstance(key_prefix, bytes):
+                key_prefix = key_prefix.decode("utf-8")
+            elif not isinstance(key_prefix, str):
+                raise TypeError("Key prefix must be str or bytes")
+
+            items = [
+                (k[len(prefix):], v)
+                for k, v in self._fallback_storage.items()
+                if k.startswith(prefix + key_prefix)
+            ]
             return AsyncDBIterator(iter(items), is_fallback=True)
         
         for key, value in kwargs.items():
@@ -0,0 +1,940 @@
+import asyncio
+import inspect
+import io
+import itertools
+import logging
+import os
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    MutableMapping,
+    MutableSet,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import telethon as tg
+from telethon._updates import EntityCache
+
+Entity = Union[tg.types.User, tg.types.Chat, tg.types.Channel]
+EventCallback = Callable[[Any], Awaitable[None]]
+Responder = Callable[
+    [tg.custom.Message], Union[Optional[str], Awaitable[Optional[str]]]
+]
+MessageKey = Tuple[int, int]
+
+log = logging.getLogger("fake_tg")
+
+# Offset for generated entity IDs so they don't collide with small test IDs
+ENTITY_ID_BASE = 1000000
+FAKE_DC_ID = 2
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _read_file(file: Any) -> Tuple[bytes, str]:
+    if isinstance(file, bytes):
+        return file, "file"
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            return f.read(), os.path.basename(file)
+    if isinstance(file, io.IOBase) or hasattr(file, "read"):
+        return file.read(), getattr(file, "name", None) or "file"
+
+    raise TypeError(f"Unsupported file type {type(file)}")
+
+
+class FakeTelegramClient:
+    """In-process stand-in for tg.TelegramClient that never touches the network.
+
+    It implements the subset of the client used by the bot and its modules, and
+    dispatches real Telethon events built from updates it generates itself.
+    Incoming traffic is simulated with receive(), receive_edit() and
+    join_chat(), while requests made by the bot are applied to the fake state.
+    """
+
+    me: tg.types.User
+    parse_mode: Any
+    entities: MutableMapping[int, Entity]
+    messages: MutableMapping[MessageKey, tg.custom.Message]
+    participants: MutableMapping[int, MutableMapping[int, Any]]
+    files: MutableMapping[int, bytes]
+    bios: MutableMapping[int, str]
+    responders: MutableMapping[int, Responder]
+    requests: List[Any]
+    history_limit: Optional[int]
+    download_rate: Optional[float]
+    _mb_entity_cache: EntityCache
+    _event_builders: List[Tuple[Any, EventCallback]]
+    _usernames: MutableMapping[str, Entity]
+    _conversations: MutableMapping[int, List["FakeConversation"]]
+    _msg_ids: MutableMapping[int, "itertools.count[int]"]
+    _entity_ids: "itertools.count[int]"
+    _tasks: MutableSet["asyncio.Task[None]"]
+    _connected: bool
+    _disconnected: Optional["asyncio.Future[None]"]
+
+    def __init__(
+        self,
+        *,
+        first_name: str = "Pyrobud",
+        phone: str = "15550000000",
+        history_limit: Optional[int] = None,
+        download_rate: Optional[float] = None,
+    ):
+        self.parse_mode = tg.utils.sanitize_parse_mode("md")
+        self.entities = {}
+        self.messages = {}
+        self.participants = {}
+        self.files = {}
+        self.bios = {}
+        self.responders = {}
+        self.requests = []
+        self.history_limit = history_limit
+        self.download_rate = download_rate
+        self._mb_entity_cache = EntityCache()
+        self._event_builders = []
+        self._usernames = {}
+        self._conversations = {}
+        self._msg_ids = {}
+        self._entity_ids = itertools.count(ENTITY_ID_BASE)
+        self._tasks = set()
+        self._connected = False
+        self._disconnected = None
+
+        self.me = self.add_user(first_name=first_name, phone=phone, is_self=True)
+        self._mb_entity_cache.set_self_user(self.me.id, False, self.me.access_hash)
+
+    # Connection
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return asyncio.get_running_loop()
+
+    @property
+    def _self_id(self) -> int:
+        return self.me.id
+
+    async def start(self, *args: Any, **kwargs: Any) -> "FakeTelegramClient":
+        self._connected = True
+        return self
+
+    async def connect(self) -> None:
+        self._connected = True
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def disconnect(self) -> None:
+        self._connected = False
+        if self._disconnected is not None and not self._disconnected.done():
+            self._disconnected.set_result(None)
+
+    async def run_until_disconnected(self) -> None:
+        self._disconnected = self.loop.create_future()
+        await self._disconnected
+
+    async def catch_up(self) -> None:
+        pass
+
+    async def get_me(self, input_peer: bool = False) -> Any:
+        return tg.utils.get_input_peer(self.me) if input_peer else self.me
+
+    # Events
+
+    def add_event_handler(self, callback: EventCallback, event: Any = None) -> None:
+        if event is None:
+            event = tg.events.Raw()
+        elif inspect.isclass(event):
+            event = event()
+
+        self._event_builders.append((event, callback))
+
+    def remove_event_handler(self, callback: EventCallback, event: Any = None) -> int:
+        found = 0
+        for builder, cb in list(self._event_builders):
+            if cb == callback and (event is None or isinstance(builder, type(event))):
+                self._event_builders.remove((builder, cb))
+                found += 1
+
+        return found
+
+    def list_event_handlers(self) -> List[Tuple[EventCallback, Any]]:
+        return [(callback, event) for event, callback in self._event_builders]
+
+    async def dispatch(self, update: Any, entities: Sequence[Entity] = ()) -> None:
+        """Dispatches the given update to all matching event handlers."""
+
+        update._entities = {tg.utils.get_peer_id(e): e for e in entities if e}
+
+        built: Dict[type, Any] = {}
+        for builder, callback in list(self._event_builders):
+            builder_type = type(builder)
+            if builder_type not in built:
+                event = builder_type.build(update, None, self._self_id)
+                if isinstance(event, tg.events.common.EventCommon):
+                    event.original_update = update
+                    event._entities = update._entities
+                    event._set_client(self)
+                elif event:
+                    event._client = self
+
+                built[builder_type] = event
+
+            event = built[builder_type]
+            if not event:
+                continue
+
+            if not builder.resolved:
+                await builder.resolve(self)
+
+            result = builder.filter(event)
+            if inspect.isawaitable(result):
+                result = await result
+            if not result:
+                continue
+
+            try:
+                await callback(event)
+            except tg.events.StopPropagation:
+                break
+            except Exception:
+                name = getattr(callback, "__name__", repr(callback))
+                log.exception(f"Unhandled exception on {name}")
+
+    def _dispatch_later(self, update: Any, entities: Sequence[Entity]) -> None:
+        # Updates for our own requests arrive asynchronously, as with Telegram
+        task = self.loop.create_task(self.dispatch(update, entities))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def wait_idle(self) -> None:
+        """Waits until all pending updates have been dispatched."""
+
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    # Entities
+
+    def _register(self, entity: Entity) -> Entity:
+        self.entities[tg.utils.get_peer_id(entity)] = entity
+        if getattr(entity, "username", None):
+            self._usernames[entity.username.lower()] = entity
+
+        if isinstance(entity, tg.types.User):
+            self._mb_entity_cache.extend([entity], [])
+        else:
+            self._mb_entity_cache.extend([], [entity])
+
+        return entity
+
+    def add_user(
+        self,
+        user_id: Optional[int] = None,
+        *,
+        first_name: str = "User",
+        last_name: Optional[str] = None,
+        username: Optional[str] = None,
+        about: Optional[str] = None,
+        **kwargs: Any,
+    ) -> tg.types.User:
+        if user_id is None:
+            user_id = next(self._entity_ids)
+        if about is not None:
+            self.bios[user_id] = about
+
+        user = tg.types.User(
+            user_id,
+            access_hash=user_id,
+            first_name=first_name,
+            last_name=last_name,
+            username=username,
+            **kwargs,
+        )
+        return self._register(user)
+
+    def add_channel(
+        self,
+        channel_id: Optional[int] = None,
+        *,
+        title: str = "Group",
+        username: Optional[str] = None,
+        megagroup: bool = True,
+        admin: bool = True,
+    ) -> tg.types.Channel:
+        if channel_id is None:
+            channel_id = next(self._entity_ids)
+
+        admin_rights = tg.types.ChatAdminRights(delete_messages=True, ban_users=True)
+        channel = tg.types.Channel(
+            channel_id,
+            title,
+            tg.types.ChatPhotoEmpty(),
+            _now(),
+            megagroup=megagroup,
+            broadcast=not megagroup,
+            access_hash=channel_id,
+            username=username,
+            admin_rights=admin_rights if admin else None,
+        )
+        self._register(channel)
+
+        chat_id = tg.utils.get_peer_id(channel)
+        self.participants[chat_id] = {}
+        if admin:
+            self.add_participant(channel, self.me, admin=True)
+
+        return channel
+
+    def add_participant(
+        self,
+        chat: Entity,
+        user: tg.types.User,
+        *,
+        admin: bool = False,
+        date: Optional[datetime] = None,
+    ) -> Any:
+        date = date or _now()
+        if admin:
+            rights = tg.types.ChatAdminRights(delete_messages=True, ban_users=True)
+            ptcp = tg.types.ChannelParticipantAdmin(
+                user.id, self.me.id, date, rights, can_edit=True
+            )
+        else:
+            ptcp = tg.types.ChannelParticipant(user.id, date)
+
+        self.participants[tg.utils.get_peer_id(chat)][user.id] = ptcp
+        return ptcp
+
+    def _resolve(self, ref: Any) -> Entity:
+        if isinstance(ref, str):
+            if ref.lower() in ("me", "self"):
+                return self.me
+
+            username = ref.lower().rsplit("/", 1)[-1].lstrip("@")
+            try:
+                return self._usernames[username]
+            except KeyError:
+                raise ValueError(f'No user has "{ref}" as username')
+
+        if isinstance(ref, tg.types.InputPeerSelf):
+            return self.me
+        if isinstance(ref, tg.custom.Message):
+            ref = ref.peer_id
+
+        peer_id = ref if isinstance(ref, int) else tg.utils.get_peer_id(ref)
+        try:
+            return self.entities[peer_id]
+        except KeyError:
+            pass
+
+        # Unmarked IDs are also accepted for channels
+        if peer_id > 0:
+            marked_id = tg.utils.get_peer_id(tg.types.PeerChannel(peer_id))
+            if marked_id in self.entities:
+                return self.entities[marked_id]
+
+        raise ValueError(f"Could not find the input entity for {ref!r}")
+
+    async def get_entity(self, entity: Any) -> Any:
+        if isinstance(entity, list):
+            return [self._resolve(ref) for ref in entity]
+
+        return self._resolve(entity)
+
+    async def get_input_entity(self, peer: Any) -> Any:
+        return tg.utils.get_input_peer(self._resolve(peer))
+
+    async def get_peer_id(self, peer: Any, add_mark: bool = True) -> int:
+        return tg.utils.get_peer_id(self._resolve(peer), add_mark=add_mark)
+
+    # Messages
+
+    def _next_msg_id(self, peer: Any) -> int:
+        # Channels have their own message IDs, while other chats share one sequence
+        key = (
+            tg.utils.get_peer_id(peer) if isinstance(peer, tg.types.PeerChannel) else 0
+        )
+        if key not in self._msg_ids:
+            self._msg_ids[key] = itertools.count(1)
+
+        return next(self._msg_ids[key])
+
+    def _parse(self, text: Optional[str], parse_mode: Any = ()) -> Tuple[str, Any]:
+        if parse_mode == ():
+            parse_mode = self.parse_mode
+        else:
+            parse_mode = tg.utils.sanitize_parse_mode(parse_mode)
+
+        if not text:
+            return "", None
+        if parse_mode is None:
+            return text, None
+
+        return parse_mode.parse(text)
+
+    def _make_update(self, msg: Any, edit: bool = False) -> Any:
+        if isinstance(msg.peer_id, tg.types.PeerChannel):
+            cls = (
+                tg.types.UpdateEditChannelMessage
+                if edit
+                else tg.types.UpdateNewChannelMessage
+            )
+        else:
+            cls = tg.types.UpdateEditMessage if edit else tg.types.UpdateNewMessage
+
+        return cls(msg, pts=0, pts_count=1)
+
+    def _store(
+        self,
+        chat: Entity,
+        sender: Optional[Entity],
+        text: str,
+        *,
+        out: bool,
+        entities: Any = None,
+        reply_to: Optional[int] = None,
+        media: Any = None,
+        fwd_from: Optional[tg.types.MessageFwdHeader] = None,
+        action: Any = None,
+        date: Optional[datetime] = None,
+    ) -> tg.custom.Message:
+        peer = tg.utils.get_peer(chat)
+        from_id = tg.utils.get_peer(sender) if sender is not None else None
+        kwargs = dict(
+            date=date or _now(),
+            out=out,
+            from_id=from_id,
+            reply_to=(
+                tg.types.MessageReplyHeader(reply_to_msg_id=reply_to)
+                if reply_to
+                else None
+            ),
+        )
+
+        msg_id = self._next_msg_id(peer)
+        if action is not None:
+            msg = tg.tl.patched.MessageService(msg_id, peer, action=action, **kwargs)
+        else:
+            msg = tg.tl.patched.Message(
+                msg_id,
+                peer,
+                message=text,
+                entities=entities,
+                media=media,
+                fwd_from=fwd_from,
+                **kwargs,
+            )
+
+        known = {tg.utils.get_peer_id(e): e for e in (chat, sender) if e is not None}
+        msg._finish_init(self, known, None)
+        self.messages[(tg.utils.get_peer_id(peer), msg.id)] = msg
+        self._trim_history()
+        return msg
+
+    def _trim_history(self) -> None:
+        # Forget the oldest messages and their files to bound long-running usage
+        if self.history_limit is None:
+            return
+
+        while len(self.messages) > self.history_limit:
+            msg = self.messages.pop(next(iter(self.messages)))
+            media = getattr(msg, "media", None)
+            if isinstance(media, tg.types.MessageMediaDocument):
+                self.files.pop(media.document.id, None)
+            elif isinstance(media, tg.types.MessageMediaPhoto):
+                self.files.pop(media.photo.id, None)
+
+    def _find_message(self, entity: Any, msg_id: int) -> Optional[tg.custom.Message]:
+        if entity is not None:
+            chat = self._resolve(entity)
+            if isinstance(chat, tg.types.Channel):
+                return self.messages.get((tg.utils.get_peer_id(chat), msg_id))
+
+        # Messages outside of channels share a single ID sequence
+        for (chat_id, key_id), msg in self.messages.items():
+            if key_id == msg_id and not isinstance(msg.peer_id, tg.types.PeerChannel):
+                return msg
+
+        return None
+
+    async def send_message(
+        self,
+        entity: Any,
+        message: Any = "",
+        *,
+        reply_to: Any = None,
+        parse_mode: Any = (),
+        file: Any = None,
+        **kwargs: Any,
+    ) -> tg.custom.Message:
+        chat = self._resolve(entity)
+        if isinstance(message, tg.custom.Message):
+            message = message.text
+
+        if file is not None:
+            return await self.send_file(
+                chat, file, caption=message, reply_to=reply_to, parse_mode=parse_mode
+            )
+
+        text, entities = self._parse(message, parse_mode)
+        reply_id = tg.utils.get_message_id(reply_to)
+        msg = self._store(
+            chat, self.me, text, out=True, entities=entities, reply_to=reply_id
+        )
+        self._after_send(chat, msg)
+        return msg
+
+    async def send_file(
+        self,
+        entity: Any,
+        file: Any,
+        *,
+        caption: Optional[str] = None,
+        reply_to: Any = None,
+        parse_mode: Any = (),
+        **kwargs: Any,
+    ) -> tg.custom.Message:
+        chat = self._resolve(entity)
+        data, name = _read_file(file)
+        media = self.make_document(data, name)
+
+        text, entities = self._parse(caption, parse_mode)
+        reply_id = tg.utils.get_message_id(reply_to)
+        msg = self._store(
+            chat,
+            self.me,
+            text,
+            out=True,
+            entities=entities,
+            reply_to=reply_id,
+            media=media,
+        )
+        self._after_send(chat, msg)
+        return msg
+
+    def _after_send(self, chat: Entity, msg: tg.custom.Message) -> None:
+        self._dispatch_later(self._make_update(msg), [chat, self.me])
+
+        # Let scripted peers such as bots answer our messages
+        responder = self.responders.get(tg.utils.get_peer_id(chat))
+        if responder is not None:
+            task = self.loop.create_task(self._respond(chat, msg, responder))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _respond(
+        self, chat: Entity, msg: tg.custom.Message, responder: Responder
+    ) -> None:
+        reply = responder(msg)
+        if inspect.isawaitable(reply):
+            reply = await reply
+
+        if reply is not None:
+            await self.receive(chat, chat, reply)
+
+    async def edit_message(
+        self,
+        entity: Any,
+        message: Any = None,
+        text: Optional[str] = None,
+        *,
+        parse_mode: Any = (),
+        file: Any = None,
+        **kwargs: Any,
+    ) -> tg.custom.Message:
+        if isinstance(entity, tg.custom.Message):
+            text = message
+            message = entity
+            entity = entity.peer_id
+
+        msg = self._find_message(entity, tg.utils.get_message_id(message))
+        if msg is None:
+            raise tg.errors.MessageIdInvalidError(request=None)
+
+        new_text, entities = self._parse(text, parse_mode)
+        if file is None and new_text == msg.message and entities == msg.entities:
+            raise tg.errors.MessageNotModifiedError(request=None)
+
+        msg.message = new_text
+        msg.entities = entities
+        msg.edit_date = _now()
+        msg._text = None
+        if file is not None:
+            data, name = _read_file(file)
+            msg.media = self.make_document(data, name)
+
+        self._dispatch_later(self._make_update(msg, edit=True), [msg.chat, self.me])
+        return msg
+
+    async def delete_messages(
+        self, entity: Any, message_ids: Any, *, revoke: bool = True
+    ) -> List[tg.types.messages.AffectedMessages]:
+        if not isinstance(message_ids, list):
+            message_ids = [message_ids]
+
+        ids = [tg.utils.get_message_id(m) for m in message_ids]
+        peer = None
+        for msg_id in ids:
+            msg = self._find_message(entity, msg_id)
+            if msg is not None:
+                peer = msg.peer_id
+                del self.messages[(tg.utils.get_peer_id(peer), msg_id)]
+
+        if isinstance(peer, tg.types.PeerChannel):
+            update: Any = tg.types.UpdateDeleteChannelMessages(
+                peer.channel_id, ids, pts=0, pts_count=len(ids)
+            )
+        else:
+            update = tg.types.UpdateDeleteMessages(ids, pts=0, pts_count=len(ids))
+
+        self._dispatch_later(update, [])
+        return [tg.types.messages.AffectedMessages(pts=0, pts_count=len(ids))]
+
+    async def get_messages(
+        self, entity: Any, *args: Any, ids: Any = None, **kwargs: Any
+    ) -> Any:
+        if ids is None:
+            # Return the most recent messages in the chat
+            chat_id = tg.utils.get_peer_id(self._resolve(entity))
+            limit = args[0] if args else kwargs.get("limit", 1)
+            msgs = [m for (cid, _), m in self.messages.items() if cid == chat_id]
+            return msgs[::-1][:limit]
+
+        if isinstance(ids, list):
+            return [await self.get_messages(entity, ids=i) for i in ids]
+
+        if isinstance(ids, tg.types.InputMessageReplyTo):
+            msg = self._find_message(entity, ids.id)
+            if msg is None or msg.reply_to is None:
+                return None
+
+            ids = msg.reply_to.reply_to_msg_id
+
+        return self._find_message(entity, tg.utils.get_message_id(ids))
+
+    async def send_read_acknowledge(self, *args: Any, **kwargs: Any) -> bool:
+        return True
+
+    # Incoming traffic
+
+    def add_message(
+        self,
+        chat: Entity,
+        sender: Optional[Entity],
+        text: str = "",
+        *,
+        entities: Any = None,
+        reply_to: Optional[int] = None,
+        file: Any = None,
+        media: Any = None,
+        forward_from: Optional[Entity] = None,
+        out: bool = False,
+        date: Optional[datetime] = None,
+    ) -> tg.custom.Message:
+        """Adds a message to the history without dispatching any events."""
+
+        if file is not None:
+            data, name = _read_file(file)
+            media = self.make_document(data, name)
+
+        fwd_from = None
+        if forward_from is not None:
+            fwd_from = tg.types.MessageFwdHeader(
+                date or _now(), from_id=tg.utils.get_peer(forward_from)
+            )
+
+        return self._store(
+            chat,
+            sender,
+            text,
+            out=out,
+            entities=entities,
+            reply_to=reply_to,
+            media=media,
+            fwd_from=fwd_from,
+            date=date,
+        )
+
+    async def receive(
+        self,
+        chat: Entity,
+        sender: Optional[Entity],
+        text: str = "",
+        *,
+        forward_from: Optional[Entity] = None,
+        **kwargs: Any,
+    ) -> tg.custom.Message:
+        """Simulates a new message and waits for its event handlers to finish."""
+
+        msg = self.add_message(chat, sender, text, forward_from=forward_from, **kwargs)
+        self._deliver_to_conversations(msg)
+        await self.dispatch(self._make_update(msg), [chat, sender, forward_from])
+        return msg
+
+    async def receive_edit(
+        self, msg: tg.custom.Message, text: str
+    ) -> tg.custom.Message:
+        """Simulates an edit of the given message and waits for its event handlers."""
+
+        msg.message = text
+        msg.entities = None
+        msg.edit_date = _now()
+        msg._text = None
+        await self.dispatch(self._make_update(msg, edit=True), [msg.chat, msg.sender])
+        return msg
+
+    async def join_chat(
+        self, chat: tg.types.Channel, user: tg.types.User
+    ) -> tg.custom.Message:
+        """Simulates the given user joining the given group by link."""
+
+        self.add_participant(chat, user)
+        action = tg.types.MessageActionChatJoinedByLink(inviter_id=self.me.id)
+        msg = self._store(chat, user, "", out=False, action=action)
+        await self.dispatch(self._make_update(msg), [chat, user])
+        return msg
+
+    # Files
+
+    def make_document(
+        self,
+        data: bytes,
+        name: str = "file",
+        mime_type: str = "application/octet-stream",
+    ) -> tg.types.MessageMediaDocument:
+        doc_id = next(self._entity_ids)
+        self.files[doc_id] = data
+        doc = tg.types.Document(
+            doc_id,
+            access_hash=doc_id,
+            file_reference=b"",
+            date=_now(),
+            mime_type=mime_type,
+            size=len(data),
+            dc_id=FAKE_DC_ID,
+            attributes=[tg.types.DocumentAttributeFilename(name)],
+        )
+        return tg.types.MessageMediaDocument(document=doc)
+
+    def make_photo(self, data: bytes) -> tg.types.MessageMediaPhoto:
+        # Every size of the photo, including thumbnails, downloads as the given data
+        photo_id = next(self._entity_ids)
+        self.files[photo_id] = data
+        photo = tg.types.Photo(
+            photo_id,
+            access_hash=photo_id,
+            file_reference=b"",
+            date=_now(),
+            sizes=[tg.types.PhotoSize("x", 0, 0, len(data))],
+            dc_id=FAKE_DC_ID,
+        )
+        return tg.types.MessageMediaPhoto(photo=photo)
+
+    def _file_data(self, file: Any) -> bytes:
+        if isinstance(file, tg.custom.Message):
+            file = file.media
+        if isinstance(file, tg.types.MessageMediaDocument):
+            file = file.document
+        elif isinstance(file, tg.types.MessageMediaPhoto):
+            file = file.photo
+
+        try:
+            return self.files[file.id]
+        except (AttributeError, KeyError):
+            raise ValueError(f"Unknown file {file!r}")
+
+    async def iter_download(
+        self,
+        file: Any,
+        *,
+        offset: int = 0,
+        stride: Optional[int] = None,
+        limit: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        request_size: int = 512 * 1024,
+        **kwargs: Any,
+    ) -> AsyncIterator[bytes]:
+        data = self._file_data(file)
+        chunk_size = chunk_size or request_size
+        stride = stride or chunk_size
+
+        count = 0
+        while offset < len(data) and (limit is None or count < limit):
+            chunk = data[offset : offset + chunk_size]
+            # Simulate the time taken to fetch each chunk from Telegram
+            if self.download_rate:
+                await asyncio.sleep(len(chunk) / self.download_rate)
+
+            yield chunk
+            offset += stride
+            count += 1
+
+    async def download_media(
+        self, message: Any, file: Any = None, **kwargs: Any
+    ) -> Any:
+        data = self._file_data(message)
+        if file is None or file is bytes:
+            return data
+        if hasattr(file, "write"):
+            file.write(data)
+            return file
+
+        with open(file, "wb") as f:
+            f.write(data)
+
+        return str(file)
+
+    # Participants
+
+    async def iter_participants(
+        self,
+        entity: Any,
+        limit: Optional[int] = None,
+        *,
+        filter: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[tg.types.User]:
+        chat_id = tg.utils.get_peer_id(self._resolve(entity))
+        admins_only = filter is tg.types.ChannelParticipantsAdmins or isinstance(
+            filter, tg.types.ChannelParticipantsAdmins
+        )
+
+        admin_types = (
+            tg.types.ChannelParticipantAdmin,
+            tg.types.ChannelParticipantCreator,
+        )
+        for idx, (user_id, ptcp) in enumerate(list(self.participants[chat_id].items())):
+            if limit is not None and idx >= limit:
+                break
+            if admins_only and not isinstance(ptcp, admin_types):
+                continue
+
+            user = self.entities[user_id]
+            user.participant = ptcp
+            yield user
+
+    async def kick_participant(self, entity: Any, user: Any) -> None:
+        chat_id = tg.utils.get_peer_id(self._resolve(entity))
+        user_id = tg.utils.get_peer_id(self._resolve(user))
+        self.participants[chat_id].pop(user_id, None)
+
+    # Raw requests
+
+    async def __call__(self, request: Any, ordered: bool = False, **kwargs: Any) -> Any:
+        if isinstance(request, list):
+            return [await self(r) for r in request]
+
+        self.requests.append(request)
+        functions = tg.tl.functions
+
+        if isinstance(request, functions.channels.GetParticipantRequest):
+            chat_id = tg.utils.get_peer_id(self._resolve(request.channel))
+            user = self._resolve(request.participant)
+            try:
+                ptcp = self.participants[chat_id][user.id]
+            except KeyError:
+                raise tg.errors.UserNotParticipantError(request=request)
+
+            return tg.types.channels.ChannelParticipant(ptcp, chats=[], users=[user])
+
+        if isinstance(request, functions.users.GetUsersRequest):
+            users = []
+            for ref in request.id:
+                try:
+                    users.append(self._resolve(ref))
+                except ValueError:
+                    pass
+
+            return users
+
+        if isinstance(request, functions.users.GetFullUserRequest):
+            user = self._resolve(request.id)
+            full_user = tg.types.UserFull(
+                user.id,
+                settings=tg.types.PeerSettings(),
+                notify_settings=tg.types.PeerNotifySettings(),
+                common_chats_count=0,
+                about=self.bios.get(user.id),
+            )
+            return tg.types.users.UserFull(full_user, chats=[], users=[user])
+
+        if isinstance(request, functions.channels.DeleteParticipantHistoryRequest):
+            chat = self._resolve(request.channel)
+            user_peer = tg.utils.get_peer(self._resolve(request.participant))
+            chat_id = tg.utils.get_peer_id(chat)
+            ids = [
+                msg_id
+                for (cid, msg_id), msg in self.messages.items()
+                if cid == chat_id and msg.from_id == user_peer
+            ]
+            if ids:
+                await self.delete_messages(chat, ids)
+
+            return tg.types.messages.AffectedHistory(
+                pts=0, pts_count=len(ids), offset=0
+            )
+
+        if isinstance(request, functions.channels.EditBannedRequest):
+            if request.banned_rights.view_messages:
+                await self.kick_participant(request.channel, request.participant)
+
+            return tg.types.Updates([], [], [], _now(), 0)
+
+        raise NotImplementedError(f"{type(request).__name__} is not supported")
+
+    # Conversations
+
+    def conversation(self, entity: Any, **kwargs: Any) -> "FakeConversation":
+        return FakeConversation(self, self._resolve(entity))
+
+    def _deliver_to_conversations(self, msg: tg.custom.Message) -> None:
+        for conv in self._conversations.get(msg.chat_id, ()):
+            conv._incoming.put_nowait(msg)
+
+
+class FakeConversation:
+    """Conversation with a chat on a FakeTelegramClient."""
+
+    client: FakeTelegramClient
+    chat: Entity
+    chat_id: int
+    _incoming: "asyncio.Queue[tg.custom.Message]"
+
+    def __init__(self, client: FakeTelegramClient, chat: Entity) -> None:
+        self.client = client
+        self.chat = chat
+        self.chat_id = tg.utils.get_peer_id(chat)
+        self._incoming = asyncio.Queue()
+
+    async def __aenter__(self) -> "FakeConversation":
+        self.client._conversations.setdefault(self.chat_id, []).append(self)
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        self.cancel()
+
+    def cancel(self) -> None:
+        convs = self.client._conversations.get(self.chat_id, [])
+        if self in convs:
+            convs.remove(self)
+
+    async def send_message(self, *args: Any, **kwargs: Any) -> tg.custom.Message:
+        return await self.client.send_message(self.chat, *args, **kwargs)
+
+    async def send_file(self, *args: Any, **kwargs: Any) -> tg.custom.Message:
+        return await self.client.send_file(self.chat, *args, **kwargs)
+
+    async def get_response(
+        self, message: Any = None, *, timeout: Optional[float] = 60
+    ) -> tg.custom.Message:
+        return await asyncio.wait_for(self._incoming.get(), timeout)
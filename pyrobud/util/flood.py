@@ -0,0 +1,231 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, MutableMapping, Optional, TypeVar
+
+import telethon as tg
+
+Result = TypeVar("Result")
+FloodCallback = Callable[[Any, int], Awaitable[None]]
+
+# Telegram allows roughly 30 outgoing messages per second across all chats...
+GLOBAL_RATE = 30
+GLOBAL_BURST = 30
+# ...and about one per second within a single chat, with short bursts tolerated
+CHAT_RATE = 1
+CHAT_BURST = 5
+# FloodWaits longer than this are raised instead of being waited out
+MAX_FLOOD_WAIT = 300
+MAX_RETRIES = 3
+# Number of idle per-chat queues to keep before pruning
+MAX_IDLE_QUEUES = 1024
+
+
+class TokenBucket:
+    """Asynchronous token bucket rate limiter with FIFO waiters."""
+
+    rate: float
+    capacity: float
+    tokens: float
+    updated: float
+    blocked_until: float
+    _lock: asyncio.Lock
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        # Tokens don't accumulate while blocked
+        if now <= self.updated:
+            return
+
+        elapsed = now - self.updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    @property
+    def full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+    async def acquire(self) -> None:
+        # The lock is FIFO, so waiters are served in the order they arrived
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def block(self, seconds: float) -> None:
+        """Blocks all acquisitions for the given number of seconds."""
+
+        now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 0
+        self.updated = self.blocked_until
+
+
+class _ChatQueue:
+    lock: asyncio.Lock
+    bucket: TokenBucket
+    pending: int
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.lock = asyncio.Lock()
+        self.bucket = TokenBucket(rate, capacity)
+        self.pending = 0
+
+
+class OutboundScheduler:
+    """Per-chat FIFO scheduler for outgoing requests with flood control."""
+
+    bucket: TokenBucket
+    chat_rate: float
+    chat_burst: float
+    max_flood_wait: int
+    max_retries: int
+    on_flood: Optional[FloodCallback]
+    _queues: MutableMapping[Any, _ChatQueue]
+
+    # Metrics
+    requests: int
+    flood_waits: int
+    flood_wait_time: int
+    queue_time: float
+    max_queue_time: float
+
+    def __init__(
+        self,
+        *,
+        rate: float = GLOBAL_RATE,
+        burst: float = GLOBAL_BURST,
+        chat_rate: float = CHAT_RATE,
+        chat_burst: float = CHAT_BURST,
+        max_flood_wait: int = MAX_FLOOD_WAIT,
+        max_retries: int = MAX_RETRIES,
+        on_flood: Optional[FloodCallback] = None,
+    ) -> None:
+        self.bucket = TokenBucket(rate, burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_flood_wait = max_flood_wait
+        self.max_retries = max_retries
+        self.on_flood = on_flood
+        self._queues = {}
+
+        self.requests = 0
+        self.flood_waits = 0
+        self.flood_wait_time = 0
+        self.queue_time = 0
+        self.max_queue_time = 0
+
+    @property
+    def avg_queue_time(self) -> float:
+        return self.queue_time / self.requests if self.requests else 0
+
+    def _get_queue(self, chat_id: Any) -> _ChatQueue:
+        try:
+            return self._queues[chat_id]
+        except KeyError:
+            pass
+
+        # Drop idle queues whose buckets have refilled, since recreating them
+        # later results in the same state
+        if len(self._queues) >= MAX_IDLE_QUEUES:
+            for key, queue in list(self._queues.items()):
+                if not queue.pending and queue.bucket.full:
+                    del self._queues[key]
+
+        queue = _ChatQueue(self.chat_rate, self.chat_burst)
+        self._queues[chat_id] = queue
+        return queue
+
+    async def _handle_flood(
+        self,
+        chat_id: Any,
+        queue: Optional[_ChatQueue],
+        e: tg.errors.RPCError,
+        retries: int,
+    ) -> None:
+        seconds: int = getattr(e, "seconds", 0)
+        self.flood_waits += 1
+        self.flood_wait_time += seconds
+
+        if self.on_flood is not None:
+            await self.on_flood(chat_id, seconds)
+
+        if seconds > self.max_flood_wait or retries >= self.max_retries:
+            raise e
+
+        if isinstance(e, tg.errors.SlowModeWaitError) and queue is not None:
+            # Slow mode only applies to the affected chat
+            queue.bucket.block(seconds)
+            await queue.bucket.acquire()
+        else:
+            # FloodWaits apply to the entire account, so pause everything
+            self.bucket.block(seconds)
+            await self.bucket.acquire()
+
+    async def submit(
+        self,
+        chat_id: Any,
+        func: Callable[..., Awaitable[Result]],
+        *args: Any,
+        **kwargs: Any,
+    ) -> Result:
+        """Calls the given request function once the chat's queue and rate limits allow it.
+
+        Requests that don't send anything to a chat, such as kicks, can pass None
+        as the chat to skip its queue and only share the global rate limit.
+        """
+
+        enqueue_time = time.monotonic()
+        if chat_id is None:
+            return await self._call(None, None, enqueue_time, func, *args, **kwargs)
+
+        queue = self._get_queue(chat_id)
+        queue.pending += 1
+        try:
+            async with queue.lock:
+                await queue.bucket.acquire()
+                return await self._call(
+                    chat_id, queue, enqueue_time, func, *args, **kwargs
+                )
+        finally:
+            queue.pending -= 1
+
+    async def _call(
+        self,
+        chat_id: Any,
+        queue: Optional[_ChatQueue],
+        enqueue_time: float,
+        func: Callable[..., Awaitable[Result]],
+        *args: Any,
+        **kwargs: Any,
+    ) -> Result:
+        await self.bucket.acquire()
+
+        delay = time.monotonic() - enqueue_time
+        self.requests += 1
+        self.queue_time += delay
+        self.max_queue_time = max(self.max_queue_time, delay)
+
+        retries = 0
+        while True:
+            try:
+                return await func(*args, **kwargs)
+            except (tg.errors.FloodWaitError, tg.errors.SlowModeWaitError) as e:
+                await self._handle_flood(chat_id, queue, e, retries)
+                retries += 1
@@ -0,0 +1,145 @@
+import unicodedata
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+TranslationTable = Dict[int, Optional[str]]
+
+# Blocks of stylized letters and digits that NFKC folds to their plain forms:
+# modifier letters, superscripts/subscripts, letterlike symbols, enclosed
+# alphanumerics, ligatures, fullwidth forms, mathematical alphanumerics, and the
+# enclosed alphanumeric supplement
+NFKC_BLOCKS: Sequence[Tuple[int, int]] = [
+    (0x02B0, 0x02FF),
+    (0x1D2C, 0x1DBF),
+    (0x2070, 0x209F),
+    (0x2100, 0x214F),
+    (0x2460, 0x24FF),
+    (0xFB00, 0xFB06),
+    (0xFF00, 0xFFEF),
+    (0x1D400, 0x1D7FF),
+    (0x1F100, 0x1F1FF),
+]
+
+# Letters that are visually confusable with ASCII letters, mostly from the Unicode
+# confusables data (UTS #39)
+CONFUSABLES = {
+    # Cyrillic
+    "а": "a",
+    "в": "b",
+    "е": "e",
+    "о": "o",
+    "р": "p",
+    "с": "c",
+    "у": "y",
+    "х": "x",
+    "ѕ": "s",
+    "і": "i",
+    "ј": "j",
+    "ԁ": "d",
+    "ԛ": "q",
+    "ԝ": "w",
+    "һ": "h",
+    "ӏ": "l",
+    "А": "A",
+    "В": "B",
+    "Е": "E",
+    "К": "K",
+    "М": "M",
+    "Н": "H",
+    "О": "O",
+    "Р": "P",
+    "С": "C",
+    "Т": "T",
+    "У": "Y",
+    "Х": "X",
+    "Ѕ": "S",
+    "І": "I",
+    "Ј": "J",
+    # Greek
+    "α": "a",
+    "ι": "i",
+    "κ": "k",
+    "ν": "v",
+    "ο": "o",
+    "ρ": "p",
+    "υ": "u",
+    "Α": "A",
+    "Β": "B",
+    "Ε": "E",
+    "Ζ": "Z",
+    "Η": "H",
+    "Ι": "I",
+    "Κ": "K",
+    "Μ": "M",
+    "Ν": "N",
+    "Ο": "O",
+    "Ρ": "P",
+    "Τ": "T",
+    "Υ": "Y",
+    "Χ": "X",
+    # Armenian
+    "հ": "h",
+    "ո": "n",
+    "ս": "u",
+    "ց": "g",
+    "օ": "o",
+    # Latin
+    "ı": "i",
+    "ɑ": "a",
+    "ɡ": "g",
+    # Latin small capitals
+    "ᴀ": "a",
+    "ʙ": "b",
+    "ᴄ": "c",
+    "ᴅ": "d",
+    "ᴇ": "e",
+    "ꜰ": "f",
+    "ɢ": "g",
+    "ʜ": "h",
+    "ɪ": "i",
+    "ᴊ": "j",
+    "ᴋ": "k",
+    "ʟ": "l",
+    "ᴍ": "m",
+    "ɴ": "n",
+    "ᴏ": "o",
+    "ᴘ": "p",
+    "ʀ": "r",
+    "ꜱ": "s",
+    "ᴛ": "t",
+    "ᴜ": "u",
+    "ᴠ": "v",
+    "ᴡ": "w",
+    "ʏ": "y",
+    "ᴢ": "z",
+}
+
+# Invisible characters inserted to break up words
+INVISIBLE_CHARS = "\u00ad\u200b\u200c\u200d\u2060\ufeff"
+
+
+def build_table(
+    normal_charset: str, charsets: Iterable[str], *, nfkc: bool = True
+) -> TranslationTable:
+    """Builds one table mapping stylized and confusable characters to plain ones.
+
+    Each of the given charsets maps character by character to the normal charset,
+    and takes precedence over NFKC and confusables data. Plain characters are never
+    translated, even if a charset uses them to stand in for others.
+    """
+
+    table: TranslationTable = {ord(char): None for char in INVISIBLE_CHARS}
+    table.update({ord(src): dst for src, dst in CONFUSABLES.items()})
+
+    if nfkc:
+        for start, end in NFKC_BLOCKS:
+            for code in range(start, end + 1):
+                normalized = unicodedata.normalize("NFKC", chr(code))
+                if normalized != chr(code) and normalized.isascii():
+                    table[code] = normalized
+
+    for charset in charsets:
+        for src, dst in zip(charset, normal_charset):
+            if src != dst and src not in normal_charset:
+                table[ord(src)] = dst
+
+    return table
@@ -48,3 +48,25 @@ async def img_to_sticker(src: FileLike, formats: FormatMap) -> FormatMap:
 
     await run_sync(_img_to_sticker)
     return formats
+
+
+def dhash(data: bytes, size: int = 8) -> int:
+    """Returns a perceptual difference hash of the given image data.
+
+    Each bit records whether a pixel is brighter than its right neighbor in a
+    downscaled grayscale copy, so re-encoded, resized or slightly edited copies of an
+    image have hashes that differ in few bits. Decoding is CPU-bound, so this is
+    best run with util.async_helpers.run_in_process.
+    """
+
+    with Image.open(io.BytesIO(data)) as im:
+        small = im.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS)
+        pixels = small.tobytes()
+
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(offset, offset + size):
+            bits = (bits << 1) | (pixels[col] > pixels[col + 1])
+
+    return bits
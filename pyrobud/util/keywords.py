@@ -0,0 +1,104 @@
+from collections import deque
+from typing import Deque, Dict, List, Mapping, MutableMapping, Sequence, Tuple
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton that finds all weighted keywords in one pass.
+
+    Scanning cost depends only on the length of the text, not on the number of
+    keywords. Keywords are matched case-sensitively, so callers should normalize
+    both the keywords and the text in the same way.
+    """
+
+    weights: Mapping[str, float]
+    _goto: List[Dict[str, int]]
+    _fail: List[int]
+    _outputs: List[Tuple[str, ...]]
+
+    def __init__(self, weights: Mapping[str, float]) -> None:
+        self.weights = {kw: weight for kw, weight in weights.items() if kw}
+        self._goto = [{}]
+        self._outputs = [()]
+
+        # Build a trie of all keywords
+        for keyword in self.weights:
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._outputs.append(())
+
+                state = next_state
+
+            self._outputs[state] += (keyword,)
+
+        # Link each state to the longest proper suffix that's also in the trie,
+        # in breadth-first order so that shorter suffixes are resolved first
+        self._fail = [0] * len(self._goto)
+        queue: Deque[int] = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # Inherit matches ending at the suffix state
+                self._outputs[next_state] += self._outputs[self._fail[next_state]]
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def matches(self, text: str) -> MutableMapping[str, float]:
+        """Returns all keywords found in the given text with their weights."""
+
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+
+        found: Dict[str, float] = {}
+        state = 0
+        for char in text:
+            next_state = goto[state].get(char)
+            while next_state is None and state:
+                state = fail[state]
+                next_state = goto[state].get(char)
+
+            state = next_state or 0
+            if outputs[state]:
+                for keyword in outputs[state]:
+                    found[keyword] = self.weights[keyword]
+
+        return found
+
+    def score(self, text: str) -> float:
+        """Returns the total weight of all distinct keywords in the given text."""
+
+        return sum(self.matches(text).values())
+
+
+def parse_weighted(items: Sequence[str], default_weight: float = 1) -> Dict[str, float]:
+    """Parses "keyword" and "keyword = weight" entries into a weight map."""
+
+    weights = {}
+    for item in items:
+        keyword, sep, weight = item.rpartition("=")
+        try:
+            if not sep:
+                raise ValueError
+
+            value = float(weight)
+        except ValueError:
+            keyword, value = item, default_weight
+
+        keyword = keyword.strip()
+        if keyword:
+            weights[keyword] = value
+
+    return weights
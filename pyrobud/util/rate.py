@@ -0,0 +1,35 @@
+import time
+from collections import deque
+from typing import Deque, Tuple
+
+
+class EventRate:
+    """Counts events that happened within a sliding time window."""
+
+    window: float
+    total: int
+    _events: Deque[Tuple[float, int]]
+
+    def __init__(self, window: float) -> None:
+        self.window = window
+        self.total = 0
+        self._events = deque()
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.window
+        while self._events and self._events[0][0] <= cutoff:
+            _, count = self._events.popleft()
+            self.total -= count
+
+    def hit(self, count: int = 1) -> int:
+        """Records the given number of events and returns the count in the window."""
+
+        now = time.monotonic()
+        self._expire(now)
+        self._events.append((now, count))
+        self.total += count
+        return self.total
+
+    def count(self) -> int:
+        self._expire(time.monotonic())
+        return self.total
@@ -0,0 +1,126 @@
+import re
+from typing import Iterable, List, Optional, Pattern, Sequence
+
+REDACTED = "[REDACTED]"
+# Number of characters custom patterns are assumed to span at most when scanning
+# streamed chunks, since regex match lengths can't be known in advance
+PATTERN_OVERLAP = 256
+STREAM_CHUNK_SIZE = 4096
+# Numbered backreferences, which point at the wrong group once patterns are combined
+NUMBERED_BACKREF_PATTERN = re.compile(r"(?<!\\)(?:\\\\)*\\(?:[1-9]|g<\d+>)")
+
+
+def check_pattern(pattern: str, others: Sequence[str] = ()) -> None:
+    """Raises re.error if the pattern can't be combined with the given ones.
+
+    Patterns are joined into a single alternation, so global inline flags and
+    numbered backreferences can't be used, and group names must be unique.
+    """
+
+    if NUMBERED_BACKREF_PATTERN.search(pattern):
+        raise re.error("numbered backreferences aren't supported, use named groups")
+
+    # Compile after another alternative, like in the Redactor, so that global
+    # flags are rejected even in the first pattern
+    re.compile("|".join(["(?:)", *(f"(?:{p})" for p in (*others, pattern))]))
+
+
+class Redactor:
+    """Single-pass redactor for sensitive strings and patterns, compiled once."""
+
+    pattern: Optional[Pattern[str]]
+    overlap: int
+
+    def __init__(self, secrets: Iterable[str], patterns: Iterable[str] = ()) -> None:
+        # Match longer secrets first in case one contains another
+        literals = sorted(
+            {secret for secret in secrets if secret}, key=len, reverse=True
+        )
+        parts = [re.escape(literal) for literal in literals]
+        parts.extend(f"(?:{pattern})" for pattern in patterns)
+
+        self.pattern = re.compile("|".join(parts)) if parts else None
+
+        # Amount of text to hold back between streamed chunks so that matches
+        # spanning chunk boundaries are still caught
+        self.overlap = max((len(literal) for literal in literals), default=0)
+        if len(parts) > len(literals):
+            self.overlap = max(self.overlap, PATTERN_OVERLAP)
+
+    def redact(self, text: str) -> str:
+        """Returns the given text with all sensitive information replaced."""
+
+        if self.pattern is None:
+            return text
+
+        return self.pattern.sub(REDACTED, text)
+
+    def redact_head(self, text: str, limit: int) -> str:
+        """Redacts the given text only as far as needed to produce limit characters."""
+
+        if self.pattern is None or len(text) <= STREAM_CHUNK_SIZE:
+            return self.redact(text)
+
+        stream = self.stream()
+        out: List[str] = []
+        out_len = 0
+
+        for offset in range(0, len(text), STREAM_CHUNK_SIZE):
+            chunk = stream.feed(text[offset : offset + STREAM_CHUNK_SIZE])
+            out.append(chunk)
+            out_len += len(chunk)
+
+            # Stop early once the output is known to exceed the limit
+            if out_len > limit:
+                return "".join(out)
+
+        out.append(stream.finish())
+        return "".join(out)
+
+    def stream(self) -> "RedactionStream":
+        """Returns a stream that redacts text fed to it in chunks."""
+
+        return RedactionStream(self)
+
+
+class RedactionStream:
+    redactor: Redactor
+    _tail: str
+
+    def __init__(self, redactor: Redactor) -> None:
+        self.redactor = redactor
+        self._tail = ""
+
+    def feed(self, chunk: str) -> str:
+        """Redacts the given chunk, returning the text that is safe to output."""
+
+        pattern = self.redactor.pattern
+        if pattern is None:
+            return chunk
+
+        buf = self._tail + chunk
+
+        # Hold back enough text for a match that starts near the end of the
+        # buffer, but never cut through a match that has already started
+        cut = max(0, len(buf) - self.redactor.overlap)
+        out: List[str] = []
+        pos = 0
+        for match in pattern.finditer(buf):
+            if match.start() >= cut:
+                break
+
+            out.append(buf[pos : match.start()])
+            out.append(REDACTED)
+            pos = match.end()
+
+        cut = max(cut, pos)
+        out.append(buf[pos:cut])
+        self._tail = buf[cut:]
+        return "".join(out)
+
+    def finish(self) -> str:
+        """Redacts and returns any remaining buffered text."""
+
+        tail = self._tail
+        self._tail = ""
+        return self.redactor.redact(tail)
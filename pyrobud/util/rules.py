@@ -0,0 +1,191 @@
+import time
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from .misc import find_prefixed_funcs
+
+RuleFunc = Any
+Decorator = Callable[[RuleFunc], RuleFunc]
+
+
+def rule(
+    cost: float, score: float = 0, *, veto: bool = False, decisive: bool = False
+) -> Decorator:
+    """Sets the relative cost and the score of a rule function.
+
+    Veto rules exempt whatever they match, regardless of the score. Decisive rules
+    trigger the verdict as soon as they match, skipping all costlier rules.
+    """
+
+    def rule_decorator(func: RuleFunc) -> RuleFunc:
+        setattr(func, "_rule_cost", cost)
+        setattr(func, "_rule_score", score)
+        setattr(func, "_rule_veto", veto)
+        setattr(func, "_rule_decisive", decisive)
+        return func
+
+    return rule_decorator
+
+
+class Rule:
+    name: str
+    func: RuleFunc
+    cost: float
+    score: float
+    veto: bool
+    decisive: bool
+
+    # Metrics
+    runs: int
+    hits: int
+    time: float
+
+    def __init__(
+        self,
+        name: str,
+        func: RuleFunc,
+        cost: float,
+        score: float,
+        veto: bool = False,
+        decisive: bool = False,
+    ) -> None:
+        self.name = name
+        self.func = func
+        self.cost = cost
+        self.score = score
+        self.veto = veto
+        self.decisive = decisive
+
+        self.runs = 0
+        self.hits = 0
+        self.time = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.runs if self.runs else 0
+
+    @property
+    def avg_time(self) -> float:
+        return self.time / self.runs if self.runs else 0
+
+
+class Verdict:
+    triggered: bool
+    score: float
+    hits: List[str]
+    vetoes: List[str]
+    decided_by: Optional[str]
+
+    def __init__(self) -> None:
+        self.triggered = False
+        self.score = 0
+        self.hits = []
+        self.vetoes = []
+        self.decided_by = None
+
+
+class RuleEngine:
+    """Evaluates scored rules cheapest-first, stopping as soon as the outcome is known.
+
+    Scoring rules are skipped once the threshold has been reached, and evaluation
+    stops once a veto matches or the remaining rules can't reach the threshold.
+    """
+
+    rules: Sequence[Rule]
+    threshold: float
+
+    def __init__(self, rules: Sequence[Rule], threshold: float) -> None:
+        # Run vetoes before scoring rules of the same cost, since they end evaluation
+        self.rules = sorted(rules, key=lambda r: (r.cost, not r.veto))
+        self.threshold = threshold
+
+    @classmethod
+    def from_object(cls, obj: Any, threshold: float) -> "RuleEngine":
+        """Creates an engine from the object's "rule_" methods decorated with rule()."""
+
+        rules = [
+            Rule(
+                name,
+                func,
+                getattr(func, "_rule_cost"),
+                getattr(func, "_rule_score"),
+                getattr(func, "_rule_veto"),
+                getattr(func, "_rule_decisive", False),
+            )
+            for name, func in find_prefixed_funcs(obj, "rule_")
+            if hasattr(func, "_rule_cost")
+        ]
+        return cls(rules, threshold)
+
+    async def _run(self, rule: Rule, subject: Any) -> bool:
+        start = time.perf_counter()
+        try:
+            hit = await rule.func(subject)
+        finally:
+            rule.runs += 1
+            rule.time += time.perf_counter() - start
+
+        if hit:
+            rule.hits += 1
+
+        return hit
+
+    async def evaluate(self, subject: Any, *, exhaustive: bool = False) -> Verdict:
+        """Runs the rules on the given subject.
+
+        Exhaustive evaluation runs every rule, e.g. to measure each one's
+        contribution, but reaches the same verdict.
+        """
+
+        verdict = Verdict()
+        # Highest score that the rules left to run could still add
+        potential = sum(r.score for r in self.rules if not r.veto)
+        decisive_left = sum(1 for r in self.rules if r.decisive)
+
+        for rule in self.rules:
+            if not exhaustive:
+                # The threshold can no longer be reached
+                if not decisive_left and verdict.score + potential < self.threshold:
+                    break
+
+                # Only vetoes and decisive rules can change the outcome once the
+                # threshold is reached
+                if (
+                    not rule.veto
+                    and not rule.decisive
+                    and verdict.score >= self.threshold
+                ):
+                    potential -= rule.score
+                    continue
+
+            if not rule.veto:
+                potential -= rule.score
+            if rule.decisive:
+                decisive_left -= 1
+
+            if not await self._run(rule, subject):
+                continue
+
+            if rule.veto:
+                verdict.vetoes.append(rule.name)
+                if not exhaustive:
+                    break
+            else:
+                verdict.score += rule.score
+                verdict.hits.append(rule.name)
+
+                # Vetoes that already matched still take precedence
+                if rule.decisive and not verdict.vetoes and not verdict.decided_by:
+                    verdict.decided_by = rule.name
+                    if not exhaustive:
+                        break
+
+        verdict.triggered = verdict.decided_by is not None or (
+            not verdict.vetoes and verdict.score >= self.threshold
+        )
+        return verdict
+
+    def stats(self) -> List[Tuple[Rule, float]]:
+        """Returns each rule with its share of the total evaluation time."""
+
+        total = sum(r.time for r in self.rules)
+        return [(r, r.time / total if total else 0) for r in self.rules]
@@ -0,0 +1,135 @@
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Generic, Iterable, List, Optional, Set, Tuple, TypeVar
+
+Value = TypeVar("Value")
+
+BITS = 64
+MASK = (1 << BITS) - 1
+SHINGLE_SIZE = 3
+DIGIT_PATTERN = re.compile(r"\d+")
+
+
+def features(text: str) -> List[str]:
+    """Returns the overlapping character shingles of the given text.
+
+    Character shingles keep fingerprints of short texts stable when only a word
+    changes. Numbers are all treated the same, since variations of a message often
+    only change amounts, prices or dates.
+    """
+
+    text = " ".join(DIGIT_PATTERN.sub("0", text).split())
+    return [text[i : i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)]
+
+
+def simhash(items: Iterable[str]) -> int:
+    """Returns a 64-bit SimHash of the given features.
+
+    Similar sets of features have fingerprints that differ in few bits. Features are
+    hashed with Python's string hash, which is randomized for each process, so
+    fingerprints must not be persisted.
+    """
+
+    # Lay out the feature hashes as rows of bits and count the set bits in each
+    # column, which is much faster than adding them up bit by bit in Python
+    rows = "".join([format(hash(item) & MASK, "064b") for item in items])
+    half = len(rows) // (2 * BITS)
+    columns = ["1" if rows[i::BITS].count("1") > half else "0" for i in range(BITS)]
+    return int("".join(columns), 2) if rows else 0
+
+
+def distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class SimHashIndex(Generic[Value]):
+    """Size-bounded LRU index of SimHash fingerprints that finds near-duplicates.
+
+    Entries expire after a fixed time-to-live. Fingerprints are split into one more
+    band than the maximum distance, so by the pigeonhole principle, any fingerprint
+    within that distance shares at least one band exactly with the one searched for.
+    """
+
+    max_size: int
+    ttl: float
+    max_distance: int
+    _entries: "OrderedDict[int, Tuple[float, Value]]"
+    _bands: List[Tuple[int, int]]
+    _tables: List[Dict[int, Set[int]]]
+
+    def __init__(self, max_size: int, ttl: float, max_distance: int) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries = OrderedDict()
+
+        # Shifts and masks of bands that are as equal in size as possible
+        num_bands = max_distance + 1
+        self._bands = []
+        start = 0
+        for idx in range(num_bands):
+            size = BITS // num_bands + (idx < BITS % num_bands)
+            self._bands.append((start, (1 << size) - 1))
+            start += size
+
+        self._tables = [{} for _ in self._bands]
+
+    def _band_keys(self, fingerprint: int) -> Iterable[Tuple[Dict[int, Set[int]], int]]:
+        for table, (shift, mask) in zip(self._tables, self._bands):
+            yield table, (fingerprint >> shift) & mask
+
+    def _remove(self, fingerprint: int) -> None:
+        del self._entries[fingerprint]
+        for table, key in self._band_keys(fingerprint):
+            bucket = table[key]
+            bucket.discard(fingerprint)
+            if not bucket:
+                del table[key]
+
+    def put(self, fingerprint: int, value: Value) -> None:
+        if fingerprint not in self._entries:
+            for table, key in self._band_keys(fingerprint):
+                table.setdefault(key, set()).add(fingerprint)
+
+        self._entries[fingerprint] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(fingerprint)
+
+        # Evict the least recently used entries
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    def find(self, fingerprint: int) -> Optional[Value]:
+        """Returns the value of the closest fingerprint within the maximum distance."""
+
+        now = time.monotonic()
+        best = None
+        best_distance = self.max_distance + 1
+        expired = set()
+        for table, key in self._band_keys(fingerprint):
+            for candidate in table.get(key, ()):
+                dist = distance(fingerprint, candidate)
+                if dist >= best_distance:
+                    continue
+
+                if self._entries[candidate][0] < now:
+                    expired.add(candidate)
+                else:
+                    best, best_distance = candidate, dist
+
+        for candidate in expired:
+            self._remove(candidate)
+
+        if best is None:
+            return None
+
+        self._entries.move_to_end(best)
+        return self._entries[best][1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        for table in self._tables:
+            table.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,200 @@
+import heapq
+import math
+import random
+import struct
+import sys
+from array import array
+from typing import Any, List, Mapping, MutableMapping, Tuple
+
+# Mersenne prime for universal hashing of 64-bit keys
+_PRIME = (1 << 61) - 1
+# Fixed so that hashes, and thus persisted sketches, are stable across restarts
+_HASH_SEED = 0x5EED
+
+# Width and depth, followed by the little-endian counters
+_HEADER = struct.Struct("<II")
+
+
+class CountMinSketch:
+    """Approximate counts of integer keys in a fixed amount of memory.
+
+    Estimates are never too low. With a width of ⌈e / ε⌉ and a depth of ⌈ln(1 / δ)⌉,
+    each one overestimates by at most ε times the total count with a probability of
+    at least 1 - δ.
+    """
+
+    width: int
+    depth: int
+    total: int
+    _hashes: List[Tuple[int, int]]
+    _counts: "array[int]"
+
+    def __init__(self, width: int, depth: int) -> None:
+        self.width = width
+        self.depth = depth
+        self.total = 0
+
+        rng = random.Random(_HASH_SEED)
+        self._hashes = [
+            (rng.randrange(1, _PRIME), rng.randrange(_PRIME)) for _ in range(depth)
+        ]
+        self._counts = array("q", bytes(8 * width * depth))
+
+    @classmethod
+    def from_error(cls, epsilon: float, delta: float) -> "CountMinSketch":
+        """Creates a sketch with the given relative error and failure probability."""
+
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)))
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def confidence(self) -> float:
+        return 1 - math.exp(-self.depth)
+
+    @property
+    def error_bound(self) -> float:
+        """Returns how much estimates may exceed the true counts, with confidence."""
+
+        return self.epsilon * self.total
+
+    def _indices(self, key: int) -> List[int]:
+        return [
+            row * self.width + ((a * key + b) % _PRIME) % self.width
+            for row, (a, b) in enumerate(self._hashes)
+        ]
+
+    def add(self, key: int, count: int = 1) -> int:
+        """Adds to the count of the given key and returns its new estimate."""
+
+        self.total += count
+        estimate = None
+        for idx in self._indices(key):
+            self._counts[idx] += count
+            value = self._counts[idx]
+            if estimate is None or value < estimate:
+                estimate = value
+
+        return estimate or 0
+
+    def estimate(self, key: int) -> int:
+        return min(self._counts[idx] for idx in self._indices(key))
+
+    def to_bytes(self) -> bytes:
+        counts = self._counts
+        if sys.byteorder != "little":
+            counts = array("q", counts)
+            counts.byteswap()
+
+        return _HEADER.pack(self.width, self.depth) + counts.tobytes()
+
+    def load_bytes(self, data: bytes) -> bool:
+        """Loads counters saved with to_bytes(), unless the dimensions have changed."""
+
+        width, depth = _HEADER.unpack_from(data)
+        if (width, depth) != (self.width, self.depth):
+            return False
+
+        counts = array("q")
+        counts.frombytes(data[_HEADER.size :])
+        if sys.byteorder != "little":
+            counts.byteswap()
+
+        if len(counts) != width * depth:
+            return False
+
+        self._counts = counts
+        # Every row adds up to the total
+        self.total = sum(counts[:width])
+        return True
+
+
+class TopK:
+    """Keys with the highest counts seen, tracked with a min-heap.
+
+    Counts can only grow, so outdated heap entries are skipped lazily instead of
+    being removed right away.
+    """
+
+    k: int
+    counts: MutableMapping[int, int]
+    _heap: List[Tuple[int, int]]
+
+    def __init__(self, k: int) -> None:
+        self.k = k
+        self.counts = {}
+        self._heap = []
+
+    def _compact(self) -> None:
+        self._heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_min(self) -> None:
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                del self.counts[key]
+                return
+
+    def _min(self) -> int:
+        while True:
+            count, key = self._heap[0]
+            if self.counts.get(key) == count:
+                return count
+
+            heapq.heappop(self._heap)
+
+    def update(self, key: int, count: int) -> None:
+        """Records the latest count of the given key."""
+
+        if key in self.counts:
+            self.counts[key] = count
+        elif len(self.counts) < self.k:
+            self.counts[key] = count
+        elif count > self._min():
+            self._pop_min()
+            self.counts[key] = count
+        else:
+            return
+
+        heapq.heappush(self._heap, (count, key))
+        # Bound the number of outdated entries
+        if len(self._heap) > 4 * self.k:
+            self._compact()
+
+    def items(self) -> List[Tuple[int, int]]:
+        """Returns the tracked keys and their counts, highest first."""
+
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+
+    def load_items(self, items: Mapping[int, int]) -> None:
+        self.counts = dict(items)
+        self._compact()
+
+
+class HeavyHitters:
+    """Most frequent integer keys in a stream, counted in bounded memory."""
+
+    sketch: CountMinSketch
+    top: TopK
+
+    def __init__(self, k: int, epsilon: float, delta: float) -> None:
+        self.sketch = CountMinSketch.from_error(epsilon, delta)
+        self.top = TopK(k)
+
+    def add(self, key: int, count: int = 1) -> None:
+        self.top.update(key, self.sketch.add(key, count))
+
+    def items(self) -> List[Tuple[int, int]]:
+        return self.top.items()
+
+    def to_dict(self) -> Mapping[str, Any]:
+        return {"sketch": self.sketch.to_bytes(), "top": list(self.top.counts.items())}
+
+    def load_dict(self, data: Mapping[str, Any]) -> None:
+        """Loads counts saved with to_dict(), unless the sketch's layout has changed."""
+
+        if self.sketch.load_bytes(data["sketch"]):
+            self.top.load_items(dict(data["top"]))
@@ -1,15 +1,44 @@
 import asyncio
+import codecs
 import os
-from datetime import datetime
-from typing import Any, Optional, Tuple, Type, Union
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 
 import bprint
 import telethon as tg
 
 from .. import command
+from .async_helpers import run_sync
+
+ChunkConsumer = Callable[[bytes], Awaitable[None]]
+DownloadDest = Union[str, os.PathLike, IO[bytes], ChunkConsumer, Type[bytes]]
 
 MESSAGE_CHAR_LIMIT = 4096
 TRUNCATION_SUFFIX = "... (truncated)"
+CONTINUATION = "..."
+CODE_FENCE = "```"
+
+# Largest request size Telegram allows for file downloads
+DOWNLOAD_CHUNK_SIZE = 512 * 1024
+# Files at least this large are downloaded with several requests in flight
+PARALLEL_DOWNLOAD_THRESHOLD = 4 * 1024 * 1024
+PARALLEL_DOWNLOAD_REQUESTS = 4
+# Number of downloaded chunks to buffer ahead of a slower stream consumer
+STREAM_BUFFER_CHUNKS = 8
 
 SKIP_ATTR_NAMES = (
     "CONSTRUCTOR_ID",
@@ -67,35 +96,194 @@ def pretty_print_entity(entity: tg.tl.TLObject) -> str:
     return bprint.bprint(entity, stream=str, skip_predicate=_bprint_skip_predicate)
 
 
+async def iter_download(
+    msg: tg.custom.Message, *, parallel: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """Yields the file embedded in the given message in order, in bounded-size chunks."""
+
+    client = msg.client
+    size = msg.file.size if msg.file else None
+    if parallel is None:
+        large = size is not None and size >= PARALLEL_DOWNLOAD_THRESHOLD
+        parallel = PARALLEL_DOWNLOAD_REQUESTS if large else 1
+
+    if parallel <= 1 or size is None:
+        async for chunk in client.iter_download(
+            msg.media, request_size=DOWNLOAD_CHUNK_SIZE
+        ):
+            # Telethon's generic path can hand out memoryviews of its buffer
+            yield bytes(chunk)
+
+        return
+
+    # Each worker fetches every n-th chunk, so chunks can be yielded in order by
+    # taking one from each worker in turn
+    total_chunks = (size + DOWNLOAD_CHUNK_SIZE - 1) // DOWNLOAD_CHUNK_SIZE
+    queues: List["asyncio.Queue[Union[bytes, BaseException, None]]"] = [
+        asyncio.Queue(maxsize=1) for _ in range(parallel)
+    ]
+
+    async def worker(idx: int) -> None:
+        try:
+            async for chunk in client.iter_download(
+                msg.media,
+                offset=idx * DOWNLOAD_CHUNK_SIZE,
+                stride=parallel * DOWNLOAD_CHUNK_SIZE,
+                limit=(total_chunks - idx + parallel - 1) // parallel,
+                request_size=DOWNLOAD_CHUNK_SIZE,
+                file_size=size,
+            ):
+                await queues[idx].put(bytes(chunk))
+        except Exception as e:
+            await queues[idx].put(e)
+        else:
+            await queues[idx].put(None)
+
+    tasks = [asyncio.create_task(worker(idx)) for idx in range(parallel)]
+    try:
+        idx = 0
+        while True:
+            item = await queues[idx].get()
+            # The first worker to run out of chunks marks the end of the file
+            if item is None:
+                break
+            if isinstance(item, BaseException):
+                raise item
+
+            yield item
+            idx = (idx + 1) % parallel
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
 async def download_file(
-    ctx: command.Context,
+    ctx: Optional[command.Context],
     msg: tg.custom.Message,
-    dest: Union[tg.hints.FileLike, os.PathLike, Type[bytes]] = bytes,
+    dest: DownloadDest = bytes,
     file_type: str = "file",
 ) -> Any:
-    """Downloads the file embedded in the given message with live progress updates."""
+    """Downloads the file embedded in the given message with live progress updates.
+
+    The destination can be a path, a writable file or pipe, an async function
+    that consumes chunks, or bytes to return the file's contents.
+    """
+
+    progress = ctx.progress() if ctx else None
+    total_bytes = msg.file.size if msg.file else None
+    current_bytes = 0
+
+    chunks: List[bytes] = []
+    if dest is bytes:
+        write: ChunkConsumer = _async_write(chunks.append)
+        path = None
+    elif isinstance(dest, (str, os.PathLike)):
+        path = Path(dest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file = path.open("wb")
+        write = _async_write(file.write, blocking=True)
+    elif callable(dest):
+        # bytes is callable too, but it was handled above
+        write = cast(ChunkConsumer, dest)
+        path = None
+    else:
+        write = _async_write(dest.write, drain=getattr(dest, "drain", None))
+        path = None
 
-    last_update_time = None
+    try:
+        async for chunk in iter_download(msg):
+            await write(chunk)
+            current_bytes += len(chunk)
 
-    def prog_func(current_bytes: int, total_bytes: int) -> None:
-        nonlocal last_update_time
+            # The progress channel coalesces these into rate-limited edits
+            if progress is not None and total_bytes:
+                percent = int((current_bytes / total_bytes) * 100)
+                progress.update(f"Downloading {file_type}... {percent}% complete")
+    finally:
+        if path is not None:
+            file.close()
+        if progress is not None:
+            await progress.close()
 
-        if not ctx:
-            return
+    if dest is bytes:
+        return b"".join(chunks)
+    if path is not None:
+        return str(path)
 
-        # Only edit message once every 5 seconds to avoid ratelimits
-        percent = int((current_bytes / total_bytes) * 100)
-        now = datetime.now()
-        if last_update_time is None or (now - last_update_time).total_seconds() >= 5:
-            # Python 3.14+: use get_running_loop() to get the current event loop
-            loop = asyncio.get_running_loop()
-            loop.create_task(
-                ctx.respond(f"Downloading {file_type}... {percent}% complete")
-            )
+    return dest
 
-            last_update_time = now
 
-    return await msg.download_media(file=dest, progress_callback=prog_func)
+async def download_text(ctx: Optional[command.Context], msg: tg.custom.Message) -> str:
+    """Downloads the file embedded in the given message and decodes it as text."""
+
+    # Decode as chunks arrive to avoid keeping a raw copy of the file around
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parts: List[str] = []
+
+    async def consume(chunk: bytes) -> None:
+        parts.append(decoder.decode(chunk))
+
+    await download_file(ctx, msg, consume)
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+
+async def stream_download(
+    ctx: Optional[command.Context],
+    msg: tg.custom.Message,
+    file_type: str = "file",
+    buffer_chunks: int = STREAM_BUFFER_CHUNKS,
+) -> AsyncGenerator[bytes, None]:
+    """Yields the file embedded in the given message while downloading ahead of the consumer.
+
+    Up to buffer_chunks chunks are downloaded ahead of the consumer, so the
+    download overlaps with slow consumers such as uploads without holding the
+    entire file in memory.
+    """
+
+    queue: "asyncio.Queue[Union[bytes, BaseException, None]]" = asyncio.Queue(
+        maxsize=buffer_chunks
+    )
+
+    async def produce() -> None:
+        try:
+            await download_file(ctx, msg, queue.put, file_type=file_type)
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(None)
+
+    task = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            if isinstance(item, BaseException):
+                raise item
+
+            yield item
+    finally:
+        task.cancel()
+
+
+def _async_write(
+    func: Callable[[bytes], Any],
+    *,
+    blocking: bool = False,
+    drain: Optional[Callable[[], Awaitable[None]]] = None,
+) -> ChunkConsumer:
+    async def write(chunk: bytes) -> None:
+        if blocking:
+            await run_sync(func, chunk)
+        else:
+            func(chunk)
+
+        # Apply backpressure from pipes such as asyncio.StreamWriter
+        if drain is not None:
+            await drain()
+
+    return write
 
 
 def truncate(text: str) -> str:
@@ -107,22 +295,96 @@ def truncate(text: str) -> str:
     return text
 
 
+def _find_page_break(text: str, start: int, end: int) -> int:
+    # Prefer paragraph, line, and word boundaries in the latter half of the page
+    min_end = start + (end - start) // 2
+    for sep in ("\n\n", "\n", " "):
+        idx = text.rfind(sep, min_end, end)
+        if idx != -1:
+            end = idx + len(sep)
+            break
+
+    # Don't cut through a run of backticks, which would mangle code delimiters
+    while end > min_end and text[end - 1] == "`" and text[end] == "`":
+        end -= 1
+
+    # Don't cut through Markdown links, but ignore other brackets like [INFO]
+    link_start = text.rfind("[", min_end, end)
+    if link_start != -1:
+        label_end = text.find("]", link_start, end + (end - start))
+        if label_end != -1 and text.startswith("(", label_end + 1):
+            url_start = label_end + 1
+            if url_start >= end or text.find(")", url_start, end) == -1:
+                end = link_start
+
+    return end
+
+
+def paginate(
+    text: str,
+    max_pages: Optional[int] = None,
+    limit: int = MESSAGE_CHAR_LIMIT,
+    truncation_suffix: str = TRUNCATION_SUFFIX,
+) -> Iterator[Tuple[str, int]]:
+    """Lazily splits the given text into pages, yielding each page and its end offset.
+
+    The last allowed page ends with truncation_suffix if the text doesn't fit.
+    """
+
+    length = len(text)
+    pos = 0
+    page_count = 0
+    in_code_block = False
+
+    while pos < length:
+        page_count += 1
+
+        # Reopen code blocks that were closed at the end of the last page
+        prefix = CONTINUATION if pos else ""
+        if in_code_block:
+            prefix += CODE_FENCE
+
+        # The rest of the text fits, so no boundary handling is needed
+        budget = limit - len(prefix)
+        if length - pos <= budget:
+            yield prefix + text[pos:], length
+            return
+
+        last_page = max_pages is not None and page_count >= max_pages
+        suffix = truncation_suffix if last_page else CONTINUATION
+
+        # Always reserve space to close a code block that might be left open
+        budget -= len(CODE_FENCE) + len(suffix)
+        end = _find_page_break(text, pos, pos + budget)
+        page = text[pos:end]
+
+        # Rebalance code blocks left open at the page boundary
+        if page.count(CODE_FENCE) % 2 == 1:
+            in_code_block = not in_code_block
+        if in_code_block:
+            page += CODE_FENCE
+
+        yield prefix + page + suffix, end
+        if last_page:
+            return
+
+        pos = end
+
+
 async def get_text_input(
     ctx: command.Context, input_arg: Optional[str]
 ) -> Tuple[bool, Optional[Union[str, bytes]]]:
     """Returns input text from various sources in the given command context."""
 
     if ctx.msg.document:
-        bin_data = await download_file(ctx, ctx.msg)
-        text = bin_data.decode(errors="replace")
+        text = await download_text(ctx, ctx.msg)
     elif input_arg:
         text = filter_code_block(input_arg)
     elif ctx.msg.is_reply:
         reply_msg = await ctx.msg.get_reply_message()
 
         if reply_msg.document:
-            bin_data = await download_file(ctx, reply_msg)
-            text = bin_data.decode(errors="replace")
+            text = await download_text(ctx, reply_msg)
         elif reply_msg.text:
             text = filter_code_block(reply_msg.text)
         else:
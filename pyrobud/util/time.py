@@ -1,5 +1,16 @@
+import re
 import time
-from typing import Union
+from typing import Optional, Union
+
+DURATION_UNITS = {
+    "s": 1,
+    "m": 60,
+    "h": 60 * 60,
+    "d": 24 * 60 * 60,
+    "w": 7 * 24 * 60 * 60,
+    "y": 365 * 24 * 60 * 60,
+}
+DURATION_PATTERN = re.compile(r"(\d+)\s*([smhdwy])")
 
 
 def usec() -> int:
@@ -50,3 +61,15 @@ def format_duration_us(t_us: Union[int, float]) -> str:
         return "%d ms" % t_ms
 
     return "%d μs" % t_us
+
+
+def parse_duration(text: str) -> Optional[int]:
+    """Parses a duration such as "90m" or "1d 12h" into seconds."""
+
+    text = text.strip().lower()
+    matches = list(DURATION_PATTERN.finditer(text))
+    # Everything other than whitespace must be part of a component
+    if not matches or DURATION_PATTERN.sub("", text).strip():
+        return None
+
+    return sum(int(match[1]) * DURATION_UNITS[match[2]] for match in matches)
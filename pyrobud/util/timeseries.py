@@ -0,0 +1,161 @@
+import math
+import struct
+import sys
+import time
+from array import array
+from typing import List, Optional, Sequence, Tuple
+
+# Bucket widths in seconds and bucket counts of each tier: minutes for a day, hours
+# for 90 days, and days for 10 years
+DEFAULT_TIERS = ((60, 24 * 60), (60 * 60, 90 * 24), (24 * 60 * 60, 10 * 365))
+
+# Newest bucket and bucket count, followed by the little-endian counts
+_HEADER = struct.Struct("<qI")
+
+
+class RingSeries:
+    """Event counts in a fixed number of consecutive, equally wide time buckets.
+
+    Buckets are stored in a ring, so the oldest ones are reused as time passes and
+    memory use never grows.
+    """
+
+    width: int
+    slots: int
+    # Absolute index of the newest bucket, i.e. its start time divided by its width
+    head: int
+    _counts: "array[int]"
+
+    def __init__(self, width: int, slots: int) -> None:
+        self.width = width
+        self.slots = slots
+        self.head = 0
+        self._counts = array("q", bytes(8 * slots))
+
+    def _advance(self, bucket: int) -> None:
+        # Clear the buckets that are reused for the newer times
+        if bucket - self.head >= self.slots:
+            self._counts = array("q", bytes(8 * self.slots))
+        else:
+            for idx in range(self.head + 1, bucket + 1):
+                self._counts[idx % self.slots] = 0
+
+        self.head = bucket
+
+    def add(self, t: float, count: int = 1) -> None:
+        bucket = int(t // self.width)
+        if bucket > self.head:
+            self._advance(bucket)
+        elif bucket <= self.head - self.slots:
+            # Too old to be tracked anymore
+            return
+
+        self._counts[bucket % self.slots] += count
+
+    def get(self, bucket: int) -> int:
+        """Returns the count of the bucket with the given absolute index."""
+
+        if self.head - self.slots < bucket <= self.head:
+            return self._counts[bucket % self.slots]
+
+        return 0
+
+    def set(self, bucket: int, count: int) -> None:
+        """Sets the count of the bucket with the given absolute index."""
+
+        if bucket > self.head:
+            self._advance(bucket)
+        elif bucket <= self.head - self.slots:
+            return
+
+        self._counts[bucket % self.slots] = count
+
+    def values(self, now: float, window: float) -> List[int]:
+        """Returns the counts of the buckets covering the given window, oldest first."""
+
+        end = int(now // self.width)
+        start = end - math.ceil(window / self.width) + 1
+        return [self.get(idx) for idx in range(start, end + 1)]
+
+    def to_bytes(self) -> bytes:
+        counts = self._counts
+        if sys.byteorder != "little":
+            counts = array("q", counts)
+            counts.byteswap()
+
+        return _HEADER.pack(self.head, self.slots) + counts.tobytes()
+
+    def load_bytes(self, data: bytes) -> bool:
+        """Loads counts saved with to_bytes(), unless the bucket count has changed."""
+
+        head, slots = _HEADER.unpack_from(data)
+        if slots != self.slots or len(data) != _HEADER.size + 8 * slots:
+            return False
+
+        counts = array("q")
+        counts.frombytes(data[_HEADER.size :])
+        if sys.byteorder != "little":
+            counts.byteswap()
+
+        self.head = head
+        self._counts = counts
+        return True
+
+
+class TimeSeries:
+    """Event counts over time, rolled up into tiers of increasingly wide buckets.
+
+    Each event is added to every tier, so writes take constant time, and queries
+    read the finest tier that covers the requested window. Each tier's bucket width
+    must be a multiple of the previous one's.
+    """
+
+    tiers: List[RingSeries]
+
+    def __init__(self, tiers: Sequence[Tuple[int, int]] = DEFAULT_TIERS) -> None:
+        self.tiers = [RingSeries(width, slots) for width, slots in tiers]
+
+    def add(self, count: int = 1, t: Optional[float] = None) -> None:
+        if t is None:
+            t = time.time()
+
+        for tier in self.tiers:
+            tier.add(t, count)
+
+    def tier_for(self, window: float) -> RingSeries:
+        for tier in self.tiers:
+            if tier.width * tier.slots >= window:
+                return tier
+
+        return self.tiers[-1]
+
+    def values(
+        self, window: float, now: Optional[float] = None
+    ) -> Tuple[int, List[int]]:
+        """Returns the bucket width and counts covering the given window up to now."""
+
+        if now is None:
+            now = time.time()
+
+        tier = self.tier_for(window)
+        return tier.width, tier.values(now, window)
+
+    def total(self, window: float, now: Optional[float] = None) -> int:
+        return sum(self.values(window, now)[1])
+
+    def resync(self) -> None:
+        """Recomputes the newest buckets of each tier from the next finer tier.
+
+        This restores counts that coarser tiers are missing because they were saved
+        less often than finer ones.
+        """
+
+        for finer, tier in zip(self.tiers, self.tiers[1:]):
+            ratio = tier.width // finer.width
+            # Only buckets that the finer tier still covers entirely can be rebuilt
+            oldest = -(-(finer.head - finer.slots + 1) // ratio)
+            newest = finer.head // ratio
+            for bucket in range(max(tier.head, oldest), newest + 1):
+                first = bucket * ratio
+                count = sum(finer.get(idx) for idx in range(first, first + ratio))
+                tier.set(bucket, count)
@@ -0,0 +1,60 @@
+import abc
+from typing import Any, AsyncIterable, Optional
+
+import aiohttp
+
+
+class UploadError(Exception):
+    pass
+
+
+class UploadTarget(abc.ABC):
+    """Destination for streamed file uploads. Subclasses implement the upload itself."""
+
+    name: str = "Unknown"
+
+    @abc.abstractmethod
+    async def upload(
+        self,
+        http: aiohttp.ClientSession,
+        stream: AsyncIterable[bytes],
+        file_name: Optional[str],
+        **options: Any,
+    ) -> str:
+        """Uploads the given stream of chunks and returns a link to the file."""
+
+        raise NotImplementedError()
+
+
+class FileIOTarget(UploadTarget):
+    name = "file.io"
+    url: str
+
+    def __init__(self, url: str = "https://file.io/") -> None:
+        self.url = url
+
+    async def upload(
+        self,
+        http: aiohttp.ClientSession,
+        stream: AsyncIterable[bytes],
+        file_name: Optional[str],
+        *,
+        expires: str = "2d",
+        **options: Any,
+    ) -> str:
+        # Chunks are sent as they're produced using chunked transfer encoding
+        form = aiohttp.FormData()
+        form.add_field(
+            "file",
+            stream,
+            filename=file_name or "file",
+            content_type="application/octet-stream",
+        )
+
+        async with http.post(self.url, params={"expires": expires}, data=form) as resp:
+            resp_data = await resp.json(content_type=None)
+
+            if not resp_data.get("success"):
+                raise UploadError(f"status code {resp.status}")
+
+            return str(resp_data["link"])